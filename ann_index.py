@@ -0,0 +1,158 @@
+import copy
+import os
+import numpy as np
+
+import mmap_gallery
+from config import ANN_N_LISTS, ANN_N_PROBE, GALLERY_THRESHOLD
+from gallery_index import l2_normalize
+
+# ----------------------------
+# Approximate Nearest-Neighbour Index (IVF)
+# ----------------------------
+# For institution-scale galleries the rows are partitioned into n_lists clusters
+# with spherical k-means. A query is only compared with the rows of the n_probe
+# clusters whose centroids are closest to it: raising n_probe trades latency for
+# recall, n_probe == n_lists is an exact search.
+#
+# The index is saved as a memory-mapped gallery directory (mmap_gallery.py) with
+# the centroids and the list of every row stored next to the rows. Loading maps
+# the normalized rows instead of reading them into each process, and the lists
+# are not recomputed. Indexes saved as .npz by older versions still load.
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """Clusters unit vectors by cosine similarity. Returns the (n_clusters, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~np.any(sums, axis=1)
+        # Re-seed empty clusters with random rows so every list stays in use
+        sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+        centroids = l2_normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalized embeddings with the same search() contract as
+    GalleryIndex. Rows can be added and identities removed without rebuilding the clusters.
+    """
+
+    def __init__(self, centroids, vectors, labels, n_probe=ANN_N_PROBE, threshold=GALLERY_THRESHOLD, assignment=None):
+        self.centroids = np.ascontiguousarray(centroids, dtype='float32')
+        self.vectors = np.ascontiguousarray(vectors, dtype='float32').reshape(-1, self.centroids.shape[1])
+        self.labels = np.asarray(labels, dtype=object)
+        self.n_probe = n_probe
+        self.threshold = threshold
+        if assignment is None:
+            self._assign_lists()
+        else:
+            self._build_lists(np.asarray(assignment, dtype=np.int64))
+
+    @classmethod
+    def build(cls, embeddings, labels, n_lists=ANN_N_LISTS, n_probe=ANN_N_PROBE, threshold=GALLERY_THRESHOLD):
+        """Clusters the gallery rows into n_lists inverted lists (0 picks about sqrt(rows))."""
+        vectors = l2_normalize(embeddings)
+        if n_lists <= 0:
+            n_lists = int(np.sqrt(len(vectors)))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        return cls(spherical_kmeans(vectors, n_lists), vectors, labels, n_probe, threshold)
+
+    @classmethod
+    def from_gallery(cls, gallery, n_lists=ANN_N_LISTS, n_probe=ANN_N_PROBE):
+        """Builds an index over the rows of a GalleryIndex, keeping its threshold."""
+        return cls.build(gallery.float_vectors(), gallery.labels, n_lists, n_probe, gallery.threshold)
+
+    @classmethod
+    def load(cls, path, n_probe=ANN_N_PROBE, threshold=GALLERY_THRESHOLD):
+        if not mmap_gallery.is_gallery(path):
+            data = np.load(path, allow_pickle=False)  # Saved as .npz before the memory-mapped format
+            return cls(data['centroids'], data['vectors'], data['labels'].astype(object), n_probe, threshold)
+        vectors, labels = mmap_gallery.load(path)
+        return cls(mmap_gallery.load_extra(path, "centroids"), vectors, labels, n_probe, threshold,
+                   mmap_gallery.load_extra(path, "assignment"))
+
+    def save(self, path):
+        """Writes the index as a memory-mapped gallery directory at path, replacing an older one."""
+        if os.path.isfile(path):
+            os.remove(path)  # An .npz of an older version
+        mmap_gallery.save(path, self.vectors, self.labels.astype(str),
+                          extra={"centroids": self.centroids, "assignment": self.assignment.astype('int32')})
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def copy(self):
+        """A copy whose add() and remove() leave this index unchanged; the rows are shared until then."""
+        index = copy.copy(self)
+        index.lists = list(self.lists)
+        return index
+
+    def _assign_lists(self):
+        if len(self.vectors):
+            assignment = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        else:
+            assignment = np.empty(0, dtype=np.int64)
+        self._build_lists(assignment)
+
+    def _build_lists(self, assignment):
+        self.assignment = assignment
+        order = np.argsort(self.assignment, kind='stable')
+        bounds = np.searchsorted(self.assignment[order], np.arange(self.n_lists + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+
+    def add(self, embeddings, labels):
+        """Appends rows for new (or re-enrolled) identities to their nearest lists."""
+        vectors = l2_normalize(embeddings).reshape(-1, self.centroids.shape[1])
+        first = len(self.vectors)
+        # Only the new rows are compared with the centroids
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1) if len(vectors) else np.empty(0, dtype=np.int64)
+        self.vectors = np.ascontiguousarray(np.concatenate([self.vectors, vectors]))
+        self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=object)])
+        self.assignment = np.concatenate([self.assignment, assignment])
+        rows = first + np.arange(len(vectors))
+        for list_id in np.unique(assignment):
+            self.lists[list_id] = np.concatenate([self.lists[list_id], rows[assignment == list_id]])
+
+    def remove(self, label):
+        """Drops every row of an identity. Returns how many rows were removed."""
+        keep = self.labels != label
+        removed = int(len(keep) - keep.sum())
+        if removed:
+            # Row IDs after the removed rows shift down; no row is reassigned
+            new_ids = np.cumsum(keep) - 1
+            self.vectors = np.ascontiguousarray(self.vectors[keep])
+            self.labels = self.labels[keep]
+            self.assignment = self.assignment[keep]
+            self.lists = [new_ids[rows[keep[rows]]] for rows in self.lists]
+        return removed
+
+    def search(self, embeddings):
+        """
+        Matches a batch of embeddings against the rows of the n_probe closest lists. Returns
+        (labels, scores) like GalleryIndex.search.
+        """
+        queries = l2_normalize(embeddings).reshape(-1, self.centroids.shape[1])
+        labels = ["Unknown"] * len(queries)
+        scores = np.zeros(len(queries), dtype='float32')
+        if len(self) == 0:
+            return labels, scores
+        n_probe = max(1, min(self.n_probe, self.n_lists))
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :n_probe]
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[p] for p in probes[i]])
+            if len(candidates) == 0:
+                continue
+            sims = self.vectors[candidates] @ query
+            best = int(np.argmax(sims))
+            scores[i] = sims[best]
+            if sims[best] >= self.threshold:
+                labels[i] = str(self.labels[candidates[best]])
+        return labels, scores
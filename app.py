@@ -1,29 +1,36 @@
 import streamlit as st
-from streamlit_webrtc import webrtc_streamer,VideoTransformerBase
+from streamlit_webrtc import webrtc_streamer
 import cv2 as cv
 import numpy
-import av
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 import os
 import requests
 import json
 import time
-import base64
-import io
 import pandas as pd
 import pytz
-import csv
 
 # Import necessary modules for image processing and prediction
-import pickle
 import numpy as np
 from PIL import Image
 
 # Import your classifier prediction function (assuming this function is defined in classifier_model_for_testing.py)
-from classifier_model_for_testing import predict_person  # This function should encapsulate all pre-processing steps as in your classifier code
+from classifier_model_for_testing import warm_up  # These functions encapsulate all pre-processing steps as in your classifier code
+from attendance_queue import AttendanceQueue
+from attendance_history import HistoryCache
+from image_store import ImageStore
+from enrollment import enroll_student, reload_if_changed
+from video_transformer import FaceDetectionTransformer  # Live video processing, see video_transformer.py
+import bulk_attendance
+import face_quality
+import attendance_aggregates
+from attendance_slots import RecentlyMarked, attendance_doc_id
+from config import INSTRUCTOR_EMAILS, LECTURE_TIMEZONE, RECOGNIZER
+import tempfile
+import metrics
 
 # Load API Key from .env file
 load_dotenv()
@@ -46,17 +53,40 @@ if not firebase_admin._apps:
 db = firestore.client()
 st.write("Firebase Initialized Successfully ✅")
 
-# Function to convert image to base64 string
-def image_to_base64(img):
-    # Ensure image is in RGB mode (not RGBA) to prevent JPEG encoding issues
-    if img.mode == 'RGBA':
-        img = img.convert('RGB')
-    
-    # Use BytesIO for in-memory file handling
-    buffered = io.BytesIO()
-    img.save(buffered, format="JPEG", quality=85)  # Reduce quality to keep size manageable
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return img_str
+# Attendance records are queued on local disk and committed to Firestore in the
+# background, so a slow or unreachable database never blocks "Submit Attendance".
+# New records also update the report counters of attendance_aggregates.py
+@st.cache_resource
+def get_attendance_queue():
+    queue = AttendanceQueue(db, aggregate=True).start()
+    metrics.set_gauge("attendance_queue_depth", queue.pending_count)
+    return queue
+
+attendance_queue = get_attendance_queue()
+
+# Stage latencies and counters on a local Prometheus endpoint, when METRICS_ENABLED is set
+metrics.start()
+
+# Per-user attendance history, shared by all sessions of this process
+@st.cache_resource
+def get_history_cache():
+    return HistoryCache(db)
+
+history_cache = get_history_cache()
+
+# Attendance keys submitted recently in this process; repeated submissions stop here
+@st.cache_resource
+def get_recently_marked():
+    return RecentlyMarked()
+
+recently_marked = get_recently_marked()
+
+# Profile images live in a content-addressed store; user documents keep only the hash
+@st.cache_resource
+def get_image_store():
+    return ImageStore()
+
+image_store = get_image_store()
 
 # Define Firebase user registration function
 def create_user(email, password, first_name, middle_name, last_name, prn_no, phone_number, 
@@ -71,13 +101,13 @@ def create_user(email, password, first_name, middle_name, last_name, prn_no, pho
 
         try:
             # Process the profile image
-            image = Image.open(profile_image)
+            upload = Image.open(profile_image)
             
             # Resize to reduce storage size (300x300 pixels is reasonable for a profile)
-            image = image.resize((300, 300))
+            image = upload.resize((300, 300))
             
-            # Convert image to base64 string for Firestore storage
-            profile_image_b64 = image_to_base64(image)
+            # Store the image (and its thumbnail) outside Firestore, keyed by its content hash
+            profile_image_hash = image_store.put(image)
             
             # Save all user details in Firestore
             user_doc = {
@@ -93,15 +123,32 @@ def create_user(email, password, first_name, middle_name, last_name, prn_no, pho
                 "year_of_graduation": year_of_graduation,
                 "parent_name": parent_name,
                 "parent_phone_number": parent_phone_number,
-                "profile_image": profile_image_b64,  # Store base64 image directly in Firestore
+                "profile_image_hash": profile_image_hash,  # Image itself is in the image store
                 "branch": branch
             }
             db.collection("users").document(uid).set(user_doc)
-            return f"Account for {email} created successfully! ✅"
-
+            
         except Exception as e:
             return f"Firestore Error: {e}"
         
+        if RECOGNIZER not in ("gallery", "ann"):
+            # best_model.pkl only learns new students when it is retrained
+            return f"Account for {email} created successfully! ✅"
+        
+        # Enroll the face right away so the student can mark attendance without a retrain. The
+        # account exists at this point, so an enrollment failure is reported, not undone.
+        full_name = f"{first_name} {middle_name} {last_name}".strip()
+        try:
+            # The uploaded photo at full resolution, not the stored 300x300 copy
+            enroll_student(full_name, [np.array(upload.convert('RGB'))])
+            enrollment_status = "Face enrolled for recognition."
+        except ValueError:
+            enrollment_status = "No face found in the profile image; contact Admin to activate facial recognition."
+        except Exception as e:
+            print(f"Enrollment of {email} failed: {e}")
+            enrollment_status = f"Face enrollment failed ({e}); contact Admin to activate facial recognition."
+        return f"Account for {email} created successfully! ✅ {enrollment_status}"
+        
     except Exception as e:
         return f"Error: {e}"
 
@@ -112,48 +159,6 @@ def login_user(email, password):
     response = requests.post(url, data=json.dumps(payload))
     return response.json()
 
-# Logic added by Taha Sayyed ----------------------------------------
-# ------------------- Live Video Transformer -------------------
-
-class FaceDetectionTransformer(VideoTransformerBase):
-    def __init__(self):
-        self.current_prediction = "No face detected"
-        self.all_predictions = []
-    
-    def transform(self, frame: av.VideoFrame) -> np.ndarray:
-        # Get frame as numpy array in BGR format
-        img = frame.to_ndarray(format="bgr24")
-        # Convert to PIL image (RGB) for classifier input
-        pil_img = Image.fromarray(cv.cvtColor(img, cv.COLOR_BGR2RGB))
-        
-        # Process the image with our face recognition function
-        result = predict_person(pil_img)
-        
-        # If result is a string (error message), overlay text on original frame
-        if isinstance(result, str):
-            cv.putText(img, result, (10, 30), cv.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            self.current_prediction = result
-            self.all_predictions = []
-            return img
-        
-        # Otherwise, the result is an annotated image
-        # Convert annotated PIL image back to BGR numpy array
-        annotated_np = cv.cvtColor(np.array(result), cv.COLOR_RGB2BGR)
-        
-        # Import the last_predictions variable from the classifier module
-        from classifier_model_for_testing import last_predictions
-        
-        # Update our predictions
-        if last_predictions:
-            self.all_predictions = last_predictions  # Store all recognized faces
-            self.current_prediction = last_predictions[0] if last_predictions else "Unknown"  # Default to first face
-        else:
-            self.all_predictions = []
-            self.current_prediction = "Unknown"
-            
-        return annotated_np
-# Logic added by Taha Sayyed ----------------------------------------
-
 
 #Main Page [Landing page]
 if st.session_state["page"] == "main":
@@ -197,7 +202,10 @@ if st.session_state["page"] == "main":
 # Registeration Page
 elif st.session_state["page"] == "Register":
     st.title("Welcome to Registration Page")
-    st.warning("Once the registeration is done, Contact Admin to active your Facial Recognition to mark attendance")
+    if RECOGNIZER in ("gallery", "ann"):
+        st.warning("Upload a clear, front-facing profile image: it is used to activate your Facial Recognition to mark attendance")
+    else:
+        st.warning("Once the registeration is done, Contact Admin to active your Facial Recognition to mark attendance")
     st.warning("Register with a valid Email ID for future updates.")
     st.button("Back to main page", on_click=lambda: navigate("main"))
 
@@ -305,6 +313,16 @@ elif st.session_state["page"] == "Login":
 
 # Home Page
 elif st.session_state["page"] == "home":
+    # Start loading the recognition models in the background so they are ready
+    # by the time the user opens the camera; they are shared by all sessions
+    if not st.session_state.get("models_warming"):
+        warm_up(background=True)
+        st.session_state["models_warming"] = True
+    
+    # Pick up students enrolled or removed with the enrollment command line
+    if RECOGNIZER in ("gallery", "ann"):
+        reload_if_changed()
+    
     # Show balloons on successful login
     if st.session_state.get("show_balloons", False):
         st.balloons()
@@ -332,7 +350,7 @@ elif st.session_state["page"] == "home":
         
         # Query Firestore to get user details
         # First check if we already have user details in session
-        if "profile_image" in st.session_state["user"]:
+        if "uid" in st.session_state["user"]:
             user_info = st.session_state["user"]
             has_user_info = True
         else:
@@ -367,14 +385,18 @@ elif st.session_state["page"] == "home":
             st.markdown('<div style="background-color: #f0f7fa; padding: 15px; border-radius: 0 0 8px 8px; margin-bottom: 20px;">', unsafe_allow_html=True)
             
             # Display profile image at the top of sidebar if available
-            if has_user_info and "profile_image" in user_info:
+            if has_user_info and ("profile_image_hash" in user_info or "profile_image" in user_info):
                 try:
-                    # Decode the base64 string to display the image
-                    img_data = user_info["profile_image"]
+                    if "profile_image_hash" in user_info:
+                        # Thumbnail served from the image store's in-memory cache
+                        img_src = image_store.data_uri(user_info["profile_image_hash"], thumbnail=True)
+                    else:
+                        # Older accounts still carry the base64 image in their user document
+                        img_src = f"data:image/jpeg;base64,{user_info['profile_image']}"
                     # Use HTML for reliable image display from base64
                     st.markdown(f"""
                     <div style="display: flex; justify-content: center; margin-bottom: 20px;">
-                        <img src="data:image/jpeg;base64,{img_data}" 
+                        <img src="{img_src}" 
                             style="max-width: 100%; border-radius: 50%; box-shadow: 0 4px 8px rgba(0,0,0,0.1); width: 150px; height: 150px; object-fit: cover;">
                     </div>
                     """, unsafe_allow_html=True)
@@ -407,8 +429,10 @@ elif st.session_state["page"] == "home":
         
         # Main content area
         with main_container:
-            # Create tabs for different functionality
-            tab1, tab2 = st.tabs(["Mark Attendance", "Attendance History"])
+            # Create tabs for different functionality; instructors also get the bulk mode and reports
+            is_instructor = user_email.lower() in INSTRUCTOR_EMAILS
+            tab_names = ["Mark Attendance", "Attendance History"] + (["Bulk Attendance", "Reports"] if is_instructor else [])
+            tab1, tab2, *instructor_tabs = st.tabs(tab_names)
             
             with tab1:
                 st.markdown("""
@@ -433,8 +457,6 @@ elif st.session_state["page"] == "home":
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    from streamlit_webrtc import webrtc_streamer
-                    
                     # Create a shared variable to store the current prediction
                     if "current_face" not in st.session_state:
                         st.session_state["current_face"] = "No face detected"
@@ -463,23 +485,34 @@ elif st.session_state["page"] == "home":
                                     # Check if no faces were detected or the user's face is not among them
                                     if not all_predictions or all_predictions[0] == "No face detected":
                                         st.error("No face detected. Please ensure your face is clearly visible in the camera.")
+                                    elif all(face_quality.is_rejected(label) for label in all_predictions):
+                                        # Every face was rejected by the quality gate before recognition
+                                        st.warning(f"{all_predictions[0]}. Please face the camera in good light and hold still.")
                                     elif user_full_name not in all_predictions:
                                         st.error(f"Your face was not recognized. Only {user_full_name} can mark attendance with this account.")
                                     else:
                                         # User's face is recognized - mark attendance
                                         st.success(f"{user_full_name} has been marked present!")
                                         
-                                        try:
-                                            # Add attendance record to Firestore
-                                            attendance_data = {
-                                                "user_email": st.session_state["user"]["email"],
-                                                "name": user_full_name,
-                                                "timestamp": firestore.SERVER_TIMESTAMP
-                                            }
-                                            db.collection("attendance").add(attendance_data)
-                                            st.info("Attendance recorded successfully in the database.")
-                                        except Exception as e:
-                                            st.warning(f"Could not record attendance in database: {e}")
+                                        # One record per student and lecture slot
+                                        attendance_data = {
+                                            "user_email": st.session_state["user"]["email"],
+                                            "name": user_full_name,
+                                            "branch": st.session_state["user"].get("branch", ""),
+                                            "timestamp": datetime.now(pytz.utc)
+                                        }
+                                        doc_id = attendance_doc_id(attendance_data["user_email"], attendance_data["timestamp"])
+                                        if not recently_marked.add(doc_id):
+                                            st.info("Your attendance for this lecture has already been recorded.")
+                                        else:
+                                            try:
+                                                # Queue the attendance record; the background flusher writes it to Firestore
+                                                attendance_queue.enqueue("attendance", attendance_data, doc_id=doc_id)
+                                                history_cache.add(doc_id, attendance_data)
+                                                st.info("Attendance recorded successfully. It will be synced to the database shortly.")
+                                            except Exception as e:
+                                                recently_marked.discard(doc_id)
+                                                st.warning(f"Could not record attendance in database: {e}")
                                         
                                         # Reset the mark_attendance_active flag to stop the video stream
                                         st.session_state["mark_attendance_active"] = False
@@ -505,111 +538,72 @@ elif st.session_state["page"] == "home":
                 if st.session_state["user"]:
                     user_email = st.session_state["user"]["email"]
                     
-                    # Create a query to get attendance records for the current user
-                    # Removed the order_by to avoid requiring composite index
-                    attendance_query = db.collection("attendance").where(field_path="user_email", op_string="==", value=user_email)
-                    
                     try:
-                        # Execute the query
-                        attendance_docs = attendance_query.stream()
+                        # Cached per user; only records newer than the cached ones are read from Firestore
+                        df = history_cache.get(user_email)
                         
-                        # Convert to a list to check if there are any records
-                        attendance_records = []
-                        timezone = pytz.timezone('Asia/Kolkata')
+                        skipped = history_cache.skipped(user_email)
+                        if skipped:
+                            st.warning(f"Found {skipped} record(s) without timestamp data, skipping.")
                         
-                        for doc in attendance_docs:
-                            record = doc.to_dict()
-                            # Convert Firestore timestamp to datetime
-                            if record.get('timestamp'):
-                                # The timestamp from Firestore is already a datetime-like object
-                                timestamp = record['timestamp']
-                                
-                                # Convert to regular Python datetime
-                                # DatetimeWithNanoseconds doesn't have datetime attribute,
-                                # it's already a datetime-like object
-                                dt = timestamp
-                                
-                                # Convert to local timezone
-                                local_dt = dt.astimezone(timezone)
-                                
-                                # Format day, date and time
-                                day = local_dt.strftime('%A')
-                                date_str = local_dt.strftime('%d-%m-%Y')
-                                time_str = local_dt.strftime('%I:%M:%S %p')
-                                
-                                # Add to record
-                                record['day'] = day
-                                record['date'] = date_str
-                                record['time'] = time_str
-                                record['datetime'] = local_dt
-                                
-                                # Include record only if it has valid timestamp data
-                                attendance_records.append(record)
-                            else:
-                                # Skip records without timestamps
-                                st.warning(f"Found record without timestamp data, skipping.")
-                        
-                        if attendance_records:
-                            # Sort records by timestamp (descending) in Python
-                            attendance_records.sort(key=lambda x: x.get('datetime', datetime.min), reverse=True)
-                            
+                        if len(df):
                             # Display attendance records in a nice table
                             st.subheader("Your Attendance Records")
                             
-                            # Convert to DataFrame for better display
-                            df = pd.DataFrame(attendance_records)
+                            display_df = df[['day', 'date', 'time', 'name']].rename(
+                                columns={
+                                    'day': 'Day',
+                                    'date': 'Date',
+                                    'time': 'Time',
+                                    'name': 'Recognized As'
+                                }
+                            )
                             
-                            # Display in a table with selected columns and formatting
-                            if 'day' in df.columns and 'date' in df.columns and 'time' in df.columns:
-                                display_df = df[['day', 'date', 'time', 'name']].rename(
-                                    columns={
-                                        'day': 'Day',
-                                        'date': 'Date',
-                                        'time': 'Time',
-                                        'name': 'Recognized As'
-                                    }
-                                )
-                                st.dataframe(display_df, use_container_width=True)
-                                
-                                # Function to convert DataFrame to CSV
-                                def convert_df_to_csv(df):
-                                    return df.to_csv(index=False).encode('utf-8')
-                                
-                                # Add CSV download button
-                                csv_data = convert_df_to_csv(display_df)
-                                
-                                st.download_button(
-                                    label="Download Attendance Records as CSV",
-                                    data=csv_data,
-                                    file_name=f"attendance_records_{datetime.now().strftime('%Y%m%d')}.csv",
-                                    mime="text/csv",
-                                    help="Download your attendance history as a CSV file",
-                                    use_container_width=True
-                                )
-                                
-                                # Display attendance statistics
-                                st.subheader("Attendance Statistics")
-                                
-                                # Calculate statistics
-                                total_records = len(df)
-                                current_month = datetime.now().month
-                                current_year = datetime.now().year
-                                
-                                # Count records for current month
-                                month_records = df[df['datetime'].dt.month == current_month]
-                                month_count = len(month_records)
-                                
-                                # Create columns for statistics display
-                                stat_col1, stat_col2 = st.columns(2)
-                                
-                                with stat_col1:
-                                    st.metric("Total Attendance Records", total_records)
-                                
-                                with stat_col2:
-                                    st.metric(f"Attendance in {datetime.now().strftime('%B %Y')}", month_count)
-                                
-                            else:
-                                st.info("Attendance records are available but missing some timestamp information.")
+                            # Show one page of records at a time
+                            page_col1, page_col2 = st.columns(2)
+                            with page_col1:
+                                page_size = st.selectbox("Records per page", [10, 25, 50, 100], index=1)
+                            page_count = (len(display_df) - 1) // page_size + 1
+                            with page_col2:
+                                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+                            start = (page - 1) * page_size
+                            st.dataframe(display_df.iloc[start:start + page_size], use_container_width=True, hide_index=True)
+                            st.caption(f"Showing records {start + 1}-{min(start + page_size, len(display_df))} of {len(display_df)}")
+                            
+                            # Function to convert DataFrame to CSV
+                            def convert_df_to_csv(df):
+                                return df.to_csv(index=False).encode('utf-8')
+                            
+                            # Add CSV download button
+                            csv_data = convert_df_to_csv(display_df)
+                            
+                            st.download_button(
+                                label="Download Attendance Records as CSV",
+                                data=csv_data,
+                                file_name=f"attendance_records_{datetime.now().strftime('%Y%m%d')}.csv",
+                                mime="text/csv",
+                                help="Download your attendance history as a CSV file",
+                                use_container_width=True
+                            )
+                            
+                            # Display attendance statistics
+                            st.subheader("Attendance Statistics")
+                            
+                            # Calculate statistics
+                            total_records = len(df)
+                            current_month = datetime.now().month
+                            
+                            # Count records for current month
+                            month_count = int((df['datetime'].dt.month == current_month).sum())
+                            
+                            # Create columns for statistics display
+                            stat_col1, stat_col2 = st.columns(2)
+                            
+                            with stat_col1:
+                                st.metric("Total Attendance Records", total_records)
+                            
+                            with stat_col2:
+                                st.metric(f"Attendance in {datetime.now().strftime('%B %Y')}", month_count)
                         else:
                             st.info("You haven't marked any attendance yet.")
                             
@@ -630,4 +624,122 @@ elif st.session_state["page"] == "home":
                         """)
                 else:
                     st.error("User information not available. Please log in again.")
+            
+            if instructor_tabs:
+                tab3, tab4 = instructor_tabs
+                with tab3:
+                    st.markdown("""
+                    <div style="background-color: #f0f7fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+                        <h3 style="color: #1e88e5;">Bulk Attendance</h3>
+                        <p>Upload a group photo or a lecture recording to mark every recognized student at once.</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    media = st.file_uploader("Group photo or lecture recording", type=["jpg", "jpeg", "png", "mp4", "avi", "mov", "mkv"])
+                    lecture = st.text_input("Lecture", placeholder="e.g. DBMS - Lecture 12")
+                    # Records are keyed by lecture slot, so use the time the lecture took place
+                    lecture_now = datetime.now(pytz.timezone(LECTURE_TIMEZONE))
+                    lecture_col1, lecture_col2 = st.columns(2)
+                    with lecture_col1:
+                        lecture_date = st.date_input("Lecture date", value=lecture_now.date())
+                    with lecture_col2:
+                        lecture_time = st.time_input("Lecture time", value=lecture_now.time().replace(second=0, microsecond=0))
+                    
+                    if media is not None and st.button("Scan", use_container_width=True):
+                        with st.spinner("Recognizing students..."):
+                            if media.type.startswith("image/"):
+                                image = np.array(Image.open(media).convert('RGB'))
+                                scan = bulk_attendance.scan_photo(cv.cvtColor(image, cv.COLOR_RGB2BGR))
+                            else:
+                                # OpenCV reads videos from a file path
+                                suffix = os.path.splitext(media.name)[1]
+                                with tempfile.NamedTemporaryFile(suffix=suffix) as video_file:
+                                    video_file.write(media.getbuffer())
+                                    video_file.flush()
+                                    scan = bulk_attendance.scan_video(video_file.name)
+                        st.session_state["bulk_scan"] = scan
+                    
+                    scan = st.session_state.get("bulk_scan")
+                    if scan is not None:
+                        present = scan.present()
+                        st.caption(f"Scanned {scan.frames_scanned} frame(s) in {scan.elapsed:.1f}s "
+                                   f"({scan.faces_seen} faces, {scan.unknown_faces} unknown, {scan.rejected_faces} low quality)")
+                        st.dataframe(pd.DataFrame([
+                            {"Name": name, "Frames": sighting.frames, "Best Score": round(sighting.best_score, 2),
+                             "Present": name in present}
+                            for name, sighting in sorted(scan.sightings.items())
+                        ]), use_container_width=True, hide_index=True)
+                        
+                        if present and st.button(f"Mark {len(present)} students present", type="primary", use_container_width=True):
+                            try:
+                                users = bulk_attendance.users_by_name(db, present)
+                                lecture_start = pytz.timezone(LECTURE_TIMEZONE).localize(
+                                    datetime.combine(lecture_date, lecture_time))
+                                doc_ids, unmatched = bulk_attendance.mark_present(
+                                    attendance_queue, present, users, lecture, lecture_start, recent=recently_marked)
+                                st.success(f"Queued attendance for {len(doc_ids)} students.")
+                                if unmatched:
+                                    st.warning(f"No account found for: {', '.join(unmatched)}")
+                                st.session_state["bulk_scan"] = None
+                            except Exception as e:
+                                st.warning(f"Could not record attendance in database: {e}")
+                
+                with tab4:
+                    st.markdown("""
+                    <div style="background-color: #f0f7fa; padding: 20px; border-radius: 10px; margin-bottom: 20px;">
+                        <h3 style="color: #1e88e5;">Attendance Reports</h3>
+                        <p>Attendance counts per student, branch and lecture, read from precomputed counters.</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    report_kinds = {
+                        "Students per day": "student_day", "Students per month": "student_month",
+                        "Branches per day": "branch_day", "Branches per month": "branch_month",
+                        "Lectures": "lecture",
+                    }
+                    report_label = st.selectbox("Report", list(report_kinds))
+                    today = datetime.now(pytz.timezone(LECTURE_TIMEZONE)).date()
+                    date_range = st.date_input("Date range", value=(today.replace(day=1), today))
+                    
+                    if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+                        start_day, end_day = date_range
+                        kind = report_kinds[report_label]
+                        period_format = "%Y-%m" if kind.endswith("_month") else "%Y-%m-%d"
+                        try:
+                            rows = attendance_aggregates.report(db, kind, start_day.strftime(period_format),
+                                                                end_day.strftime(period_format))
+                            if rows:
+                                report_df = pd.DataFrame(rows).drop(columns=["kind"], errors="ignore")
+                                st.dataframe(report_df, use_container_width=True, hide_index=True)
+                            else:
+                                st.info("No attendance counted in this date range.")
+                        except Exception as e:
+                            st.error(f"Error loading report: {e}")
+                        
+                        # Full record export, streamed page by page into a temporary file. Only
+                        # its path is kept in the session; the file is read when it is downloaded.
+                        previous = st.session_state.get("attendance_export")
+                        if st.button("Prepare CSV export", use_container_width=True):
+                            if previous is not None and os.path.exists(previous["path"]):
+                                os.remove(previous["path"])
+                            st.session_state.pop("attendance_export", None)
+                            with st.spinner("Exporting attendance records..."):
+                                timezone = pytz.timezone(LECTURE_TIMEZONE)
+                                start = timezone.localize(datetime.combine(start_day, datetime.min.time()))
+                                end = timezone.localize(datetime.combine(end_day + timedelta(days=1), datetime.min.time()))
+                                with tempfile.NamedTemporaryFile(mode="w", newline="", suffix=".csv", delete=False) as export_file:
+                                    written = attendance_aggregates.export_csv(db, start, end, export_file)
+                                st.session_state["attendance_export"] = {
+                                    "path": export_file.name, "records": written, "range": (start_day, end_day)}
+                        
+                        export = st.session_state.get("attendance_export")
+                        if export is not None and export["range"] == (start_day, end_day) and os.path.exists(export["path"]):
+                            with open(export["path"], "rb") as export_file:
+                                st.download_button(
+                                    label=f"Download {export['records']} records as CSV",
+                                    data=export_file,
+                                    file_name=f"attendance_{start_day}_{end_day}.csv",
+                                    mime="text/csv",
+                                    use_container_width=True
+                                )
 #Logic added By Taha Sayyed --------------------------------------------------------------------------
@@ -0,0 +1,173 @@
+import argparse
+import csv
+from datetime import datetime, timedelta
+import pytz
+
+from attendance_slots import slot_start, user_key
+from config import LECTURE_TIMEZONE
+
+# ----------------------------
+# Materialized Attendance Aggregates
+# ----------------------------
+# Reports used to stream every attendance record into pandas. Instead, each new
+# attendance record increments a handful of counter documents in the
+# "attendance_aggregates" collection, in the same write batch as the record
+# itself (see AttendanceQueue.flush):
+#
+#   student_day    per student and local day      student_month  per student and month
+#   branch_day     per branch and day             branch_month   per branch and month
+#   lecture        per lecture: slot (the attendance key, see attendance_slots.py),
+#                  branch and the lecture name when bulk attendance gave one, so
+#                  two lectures in the same slot keep separate counters
+#
+# Every counter document carries `kind` and `period` ("YYYY-MM-DD" or "YYYY-MM"),
+# so a report over a date range reads one document per group, not per record.
+# Attendance IDs are deterministic (attendance_slots.py), and the queue only
+# counts records whose document did not exist before, so rewrites are not counted
+# twice.
+
+COLLECTION = "attendance_aggregates"
+KINDS = ("student_day", "student_month", "branch_day", "branch_month", "lecture")
+
+
+def _increment(value):
+    try:
+        from google.cloud.firestore import Increment
+    except ImportError:
+        from local_firestore import Increment
+    return Increment(value)
+
+
+def _safe(value):
+    # Document IDs may not contain "/"
+    return str(value).replace("/", "_") or "-"
+
+
+def groups(record):
+    """Returns {aggregate doc_id: identifying fields} for the counters one attendance record feeds."""
+    local = record["timestamp"].astimezone(pytz.timezone(LECTURE_TIMEZONE))
+    day, month = local.strftime("%Y-%m-%d"), local.strftime("%Y-%m")
+    student = {"user_email": record["user_email"], "name": record.get("name", "")}
+    branch = record.get("branch") or "Unknown"
+    slot = f"{slot_start(record['timestamp']):%Y-%m-%d %H:%M}"
+    title = record.get("lecture") or ""
+    lecture = {"kind": "lecture", "period": day, "lecture": slot, "branch": branch}
+    if title:
+        lecture["title"] = title
+    student_key = user_key(record["user_email"])
+    return {
+        f"student_day:{student_key}:{day}": {"kind": "student_day", "period": day, **student},
+        f"student_month:{student_key}:{month}": {"kind": "student_month", "period": month, **student},
+        f"branch_day:{_safe(branch)}:{day}": {"kind": "branch_day", "period": day, "branch": branch},
+        f"branch_month:{_safe(branch)}:{month}": {"kind": "branch_month", "period": month, "branch": branch},
+        f"lecture:{slot.replace(' ', 'T')}:{_safe(branch)}:{_safe(title)}": lecture,
+    }
+
+
+class AggregateBatch:
+    """
+    Collects the counter increments of the new records of one write batch, one write per
+    counter document. add() refuses a record whose counters would exceed `max_writes`.
+    """
+
+    def __init__(self, client, max_writes):
+        self.client = client
+        self.max_writes = max_writes
+        self.counts = {}
+        self.fields = {}
+
+    def add(self, record):
+        record_groups = groups(record)
+        new = [doc_id for doc_id in record_groups if doc_id not in self.counts]
+        if len(self.counts) + len(new) > self.max_writes:
+            return False
+        for doc_id, fields in record_groups.items():
+            self.fields[doc_id] = fields
+            self.counts[doc_id] = self.counts.get(doc_id, 0) + 1
+        return True
+
+    def write(self, batch):
+        collection = self.client.collection(COLLECTION)
+        for doc_id, count in self.counts.items():
+            batch.set(collection.document(doc_id), {**self.fields[doc_id], "count": _increment(count)}, merge=True)
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def existing_ids(client, collection, doc_ids):
+    """IDs among doc_ids that already exist, read in one round trip."""
+    references = [client.collection(collection).document(doc_id) for doc_id in doc_ids]
+    return {snapshot.id for snapshot in client.get_all(references) if snapshot.exists}
+
+
+# ---------- reading ----------
+def report(client, kind, start, end):
+    """
+    Returns the counter documents of `kind` whose period lies in [start, end] (strings like
+    "2026-10-01" or "2026-10"), sorted by period. Reads one document per group.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown aggregate kind: {kind}")
+    query = client.collection(COLLECTION).where(field_path="kind", op_string="==", value=kind)
+    try:
+        # Equality + range needs the (kind, period) composite index
+        rows = [doc.to_dict() for doc in query.where(field_path="period", op_string=">=", value=start)
+                .where(field_path="period", op_string="<=", value=end).stream()]
+    except Exception as e:
+        print(f"Aggregate range query failed, filtering all {kind} counters instead: {e}")
+        rows = [row for row in (doc.to_dict() for doc in query.stream()) if start <= row["period"] <= end]
+    return sorted(rows, key=lambda row: (row["period"], row.get("lecture", ""), row.get("name") or row.get("branch", ""),
+                                         row.get("title", "")))
+
+
+def export_csv(client, start, end, out, page_size=1000, collection="attendance"):
+    """
+    Writes the attendance records with start <= timestamp < end (aware datetimes) to the text
+    file `out` as CSV, one page of page_size documents at a time, so memory use does not grow
+    with the date range. Returns the number of records written.
+    """
+    writer = csv.writer(out)
+    writer.writerow(["date", "time", "name", "user_email", "branch", "lecture"])
+    timezone = pytz.timezone(LECTURE_TIMEZONE)
+    query = (client.collection(collection)
+             .where(field_path="timestamp", op_string=">=", value=start)
+             .where(field_path="timestamp", op_string="<", value=end)
+             .order_by("timestamp"))
+    written, last = 0, None
+    while True:
+        page = query.start_after(last) if last is not None else query
+        count = 0
+        for doc in page.limit(page_size).stream():
+            record = doc.to_dict()
+            local = record["timestamp"].astimezone(timezone)
+            writer.writerow([local.strftime('%d-%m-%Y'), local.strftime('%I:%M:%S %p'), record.get("name", ""),
+                             record.get("user_email", ""), record.get("branch", ""), record.get("lecture", "")])
+            last = doc
+            count += 1
+        written += count
+        if count < page_size:
+            return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export attendance records as CSV for a date range.")
+    parser.add_argument("start", help="First day, YYYY-MM-DD (local time).")
+    parser.add_argument("end", help="Last day, YYYY-MM-DD (inclusive).")
+    parser.add_argument("out", help="Output CSV file.")
+    parser.add_argument("--key", default="techfusion-firestore-key.json", help="Firebase service account key.")
+    args = parser.parse_args()
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    firebase_admin.initialize_app(credentials.Certificate(args.key))
+    timezone = pytz.timezone(LECTURE_TIMEZONE)
+    start = timezone.localize(datetime.strptime(args.start, "%Y-%m-%d"))
+    end = timezone.localize(datetime.strptime(args.end, "%Y-%m-%d") + timedelta(days=1))
+    with open(args.out, 'w', newline='') as f:
+        written = export_csv(firestore.client(), start, end, f)
+    print(f"Wrote {written} records to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
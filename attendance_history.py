@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+import pandas as pd
+
+from attendance_queue import WRITTEN_AT_FIELD
+from config import HISTORY_TTL, HISTORY_TIMEZONE, HISTORY_CACHE_USERS
+
+# ----------------------------
+# Cached Attendance History
+# ----------------------------
+# Streamlit reruns the whole script on every widget click, and the history tab
+# used to stream every attendance document of the user each time. HistoryCache
+# keeps the records of the HISTORY_CACHE_USERS most recently viewed users in memory
+# for HISTORY_TTL seconds. After that it only asks Firestore for records written
+# after the newest one it already has (the high-water mark) and appends them.
+#
+# The high-water mark is the server commit time the queue stores in "written_at"
+# (attendance_queue.py), not the attendance "timestamp": bulk attendance records
+# carry the lecture start and queued records may be committed minutes after their
+# timestamp, so a timestamp mark would skip them for good. Records written before
+# "written_at" existed are only read by the first, full fetch; Firestore range
+# filters never match documents without the field. Day/date/time columns are
+# computed with vectorized pandas operations on the whole column.
+#
+# Attendance documents are keyed by student and lecture slot (attendance_slots.py)
+# and the queue creates each one once with its written_at, so every document is
+# fetched exactly once and fetched rows are simply appended. Records queued by this
+# process but not yet read back are kept in a small pending overlay, keyed by
+# document ID, until the incremental fetch returns them.
+
+RECORD_COLUMNS = ["doc_id", "user_email", "name", "timestamp"]
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def format_history(records):
+    """
+    Adds local 'datetime', 'day', 'date' and 'time' columns to a frame of raw records and
+    sorts it newest first.
+    """
+    local = pd.to_datetime(records["timestamp"], utc=True).dt.tz_convert(HISTORY_TIMEZONE)
+    formatted = records.assign(
+        datetime=local,
+        day=local.dt.day_name(),
+        date=local.dt.strftime('%d-%m-%Y'),
+        time=local.dt.strftime('%I:%M:%S %p'),
+    )
+    return formatted.sort_values("datetime", ascending=False, ignore_index=True)
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()  # Held while the entry is read, fetched or changed
+        self.records = pd.DataFrame(columns=RECORD_COLUMNS)
+        self.formatted = format_history(self.records)
+        self.pending = {}
+        self.high_water = None
+        self.fetched_at = None  # time.monotonic() of the last fetch
+        self.skipped = 0
+
+    def reformat(self):
+        if self.pending:
+            pending = pd.DataFrame(list(self.pending.values()), columns=RECORD_COLUMNS)
+            self.formatted = format_history(pd.concat([self.records, pending], ignore_index=True))
+        else:
+            self.formatted = format_history(self.records)
+
+
+class HistoryCache:
+    """
+    Per-user attendance history with a TTL, incremental refresh and an LRU bound on the number
+    of users. get() returns the formatted DataFrame; invalidate() forces the next get() to look
+    for new records.
+    """
+
+    def __init__(self, client, ttl=HISTORY_TTL, collection="attendance", max_users=HISTORY_CACHE_USERS):
+        self.client = client
+        self.ttl = ttl
+        self.collection = collection
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Guards _entries; each entry has its own lock
+
+    def _entry(self, user_email, create=False):
+        with self._lock:
+            entry = self._entries.get(user_email)
+            if entry is None and create:
+                entry = self._entries[user_email] = _Entry()
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+            elif entry is not None:
+                self._entries.move_to_end(user_email)
+            return entry
+
+    def invalidate(self, user_email):
+        entry = self._entry(user_email)
+        if entry is not None:
+            with entry.lock:
+                if entry.fetched_at is not None:
+                    entry.fetched_at = float('-inf')
+
+    def add(self, doc_id, record):
+        """
+        Shows a record the app just queued in its user's cached history before the queue has
+        written it to Firestore. It is dropped from the overlay once a fetch returns its doc_id.
+        """
+        entry = self._entry(record["user_email"])
+        if entry is None:
+            return  # Not cached; the first get() reads everything anyway
+        with entry.lock:
+            if entry.fetched_at is None:
+                return
+            if (entry.records["doc_id"] == doc_id).any():
+                return  # Already recorded; the queue keeps the first record
+            entry.pending[doc_id] = {**{column: record.get(column) for column in RECORD_COLUMNS}, "doc_id": doc_id}
+            entry.reformat()
+
+    def get(self, user_email):
+        entry = self._entry(user_email, create=True)
+        with entry.lock:
+            if entry.fetched_at is not None and time.monotonic() - entry.fetched_at < self.ttl:
+                return entry.formatted
+            new_rows = self._fetch(user_email, entry.high_water)
+            written = [row[WRITTEN_AT_FIELD] for row in new_rows if row[WRITTEN_AT_FIELD] is not None]
+            # After the first fetch the mark is at least EPOCH, so older records without
+            # written_at are not read again
+            entry.high_water = max([entry.high_water or EPOCH] + written)
+            fresh = pd.DataFrame(new_rows, columns=RECORD_COLUMNS)
+            entry.skipped += int(fresh["timestamp"].isna().sum())
+            fresh = fresh.dropna(subset=["timestamp"])
+            if len(fresh):
+                entry.records = pd.concat([entry.records, fresh], ignore_index=True)
+                for doc_id in fresh["doc_id"]:
+                    entry.pending.pop(doc_id, None)
+                entry.reformat()
+            entry.fetched_at = time.monotonic()
+            return entry.formatted
+
+    def skipped(self, user_email):
+        """Number of records of the user that had no timestamp and were left out."""
+        entry = self._entry(user_email)
+        return entry.skipped if entry is not None else 0
+
+    def _fetch(self, user_email, high_water):
+        query = self.client.collection(self.collection).where(field_path="user_email", op_string="==", value=user_email)
+        if high_water is not None:
+            try:
+                # Equality + range needs the (user_email, written_at) composite index
+                return self._rows(query.where(field_path=WRITTEN_AT_FIELD, op_string=">", value=high_water).stream())
+            except Exception as e:
+                print(f"Incremental history query failed, reading all records instead: {e}")
+                return [row for row in self._rows(query.stream())
+                        if row[WRITTEN_AT_FIELD] is not None and row[WRITTEN_AT_FIELD] > high_water]
+        return self._rows(query.stream())
+
+    @staticmethod
+    def _rows(documents):
+        rows = []
+        for doc in documents:
+            record = doc.to_dict()
+            rows.append({"doc_id": doc.id, "user_email": record.get("user_email"), "name": record.get("name"),
+                         "timestamp": record.get("timestamp"), WRITTEN_AT_FIELD: record.get(WRITTEN_AT_FIELD)})
+        return rows
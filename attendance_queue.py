@@ -0,0 +1,215 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import attendance_aggregates
+from config import ATTENDANCE_QUEUE_PATH, ATTENDANCE_BATCH_SIZE, ATTENDANCE_FLUSH_INTERVAL, ATTENDANCE_MAX_BACKOFF
+
+# ----------------------------
+# Durable Attendance Write Queue
+# ----------------------------
+# "Submit Attendance" must not block on Firestore. Records are first written to a
+# local SQLite database in WAL mode (durable once enqueue() returns) and a
+# background flusher commits them to Firestore in write batches. Every record
+# carries its document ID from the moment it is queued, so a batch that is
+# retried after a partial failure overwrites the same documents instead of
+# creating duplicates. Failed batches back off exponentially.
+#
+# The client only needs collection().document(), get_all() and batch();
+# local_firestore.py provides an in-memory stand-in for testing without Firestore.
+#
+# Attendance records are create-only: a record whose document already exists in
+# Firestore (the student was marked in that lecture slot before, by this or another
+# process) is dropped from the queue unwritten, so the first timestamp is kept.
+# Each attendance record is written with a server timestamp in "written_at", the
+# time Firestore committed it (unlike "timestamp", which bulk attendance sets to
+# the lecture start), so readers can ask for the records written since they last
+# looked (attendance_history.py). With aggregate=True, the new attendance records
+# also increment their counters in attendance_aggregates.py, in the same write
+# batch, so counters and records are committed together.
+
+CREATE_ONLY_COLLECTIONS = ("attendance",)
+
+FIRESTORE_BATCH_LIMIT = 500  # Maximum writes Firestore accepts in one batch
+WRITTEN_AT_FIELD = "written_at"
+
+
+def _server_timestamp():
+    try:
+        from google.cloud.firestore import SERVER_TIMESTAMP
+    except ImportError:
+        from local_firestore import SERVER_TIMESTAMP
+    return SERVER_TIMESTAMP
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot queue value of type {type(value).__name__}")
+
+
+def _decode(obj):
+    if set(obj) == {"__datetime__"}:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class AttendanceQueue:
+    """
+    Local write-ahead queue in front of a Firestore client. enqueue() returns as soon as the
+    record is on disk; start() runs the flusher thread that commits pending records in batches.
+    """
+
+    def __init__(self, client, path=ATTENDANCE_QUEUE_PATH, batch_size=ATTENDANCE_BATCH_SIZE,
+                 flush_interval=ATTENDANCE_FLUSH_INTERVAL, max_backoff=ATTENDANCE_MAX_BACKOFF, aggregate=False):
+        self.client = client
+        self.aggregate = aggregate
+        self.batch_size = max(1, min(batch_size, FIRESTORE_BATCH_LIMIT))
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.committed = 0
+        self.failed_batches = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                doc_id TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0
+            )""")
+
+    def enqueue(self, collection, data, doc_id=None):
+        """
+        Durably queues `data` for collection/doc_id and returns the document ID. Queuing the
+        same doc_id again while it is still pending keeps the first record.
+        """
+        doc_id = doc_id or uuid.uuid4().hex
+        payload = json.dumps(data, default=_encode)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO pending (doc_id, collection, payload, created) VALUES (?, ?, ?, ?)",
+                               (doc_id, collection, payload, time.time()))
+        self._wake.set()
+        return doc_id
+
+    def enqueue_many(self, collection, records):
+        """
+        Durably queues several records in one SQLite transaction. `records` is a list of
+        (data, doc_id) pairs, doc_id may be None. Returns the document IDs in order.
+        """
+        doc_ids = [doc_id or uuid.uuid4().hex for _, doc_id in records]
+        now = time.time()
+        rows = [(doc_id, collection, json.dumps(data, default=_encode), now) for doc_id, (data, _) in zip(doc_ids, records)]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO pending (doc_id, collection, payload, created) VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._wake.set()
+        return doc_ids
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def flush(self):
+        """Commits the due records in batches until none are left. Returns how many were committed."""
+        committed = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT doc_id, collection, payload, attempts FROM pending WHERE next_attempt <= ? "
+                    "ORDER BY created LIMIT ?", (time.time(), self.batch_size)).fetchall()
+            if not rows:
+                return committed
+            try:
+                batch = self.client.batch()
+                rows, writes = self._fill_batch(batch, rows)
+                if writes:
+                    batch.commit()
+            except Exception as e:
+                self.failed_batches += 1
+                print(f"Attendance flush failed, will retry: {e}")
+                self._schedule_retry(rows)
+                return committed
+            with self._lock:
+                self._conn.executemany("DELETE FROM pending WHERE doc_id = ?", [(row[0],) for row in rows])
+            committed += len(rows)
+            self.committed += len(rows)
+
+    def _fill_batch(self, batch, rows):
+        """
+        Adds the writes of as many rows as fit in one Firestore batch. Returns (rows handled, writes
+        added); the rows handled include create-only rows skipped because their document exists.
+        """
+        existing = set()
+        for collection in CREATE_ONLY_COLLECTIONS:
+            doc_ids = [row[0] for row in rows if row[1] == collection]
+            if doc_ids:
+                existing |= {(collection, doc_id) for doc_id in attendance_aggregates.existing_ids(self.client, collection, doc_ids)}
+        counters = attendance_aggregates.AggregateBatch(self.client, FIRESTORE_BATCH_LIMIT) if self.aggregate else None
+        handled, writes = [], 0
+        for row in rows:
+            doc_id, collection, payload, _ = row
+            if (collection, doc_id) in existing:
+                handled.append(row)  # Already recorded; keep the first record
+                continue
+            data = json.loads(payload, object_hook=_decode)
+            if counters is not None and collection == "attendance":
+                counters.max_writes = FIRESTORE_BATCH_LIMIT - writes - 1
+                if not counters.add(data):
+                    break  # The counters of this record go into the next batch
+            if collection == "attendance":
+                data[WRITTEN_AT_FIELD] = _server_timestamp()
+            batch.set(self.client.collection(collection).document(doc_id), data)
+            handled.append(row)
+            writes += 1
+        if counters is not None:
+            counters.write(batch)
+            writes += len(counters)
+        return handled, writes
+
+    def _schedule_retry(self, rows):
+        now = time.time()
+        updates = []
+        for doc_id, _, _, attempts in rows:
+            delay = min(self.max_backoff, self.flush_interval * 2 ** attempts)
+            updates.append((now + delay * random.uniform(0.5, 1.0), doc_id))
+        with self._lock:
+            self._conn.executemany("UPDATE pending SET attempts = attempts + 1, next_attempt = ? WHERE doc_id = ?", updates)
+
+    # ---------- background flusher ----------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="attendance-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            # Give a burst of submissions a moment to pile up into one batch
+            time.sleep(min(self.flush_interval, 0.2))
+            self.flush()
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import pytz
+
+from config import LECTURE_SLOT_MINUTES, LECTURE_TIMEZONE, RECENT_MARKS_MAX
+
+# ----------------------------
+# Attendance Keys
+# ----------------------------
+# Attendance documents used to get random IDs, so every extra "Submit Attendance"
+# click or retry added another record. The document ID is now derived from the
+# student and the lecture slot the submission falls in. Bulk attendance uses the
+# same key, taken from the time of the lecture, so a student marked both live and
+# from the group photo of one lecture still has one record. Marking the same
+# student twice in a slot
+# targets the same document, and the attendance queue only creates documents
+# that do not exist yet (keeping the first timestamp), so the attendance
+# collection holds at most one record per student and lecture.
+#
+# RecentlyMarked remembers the keys submitted lately in this process, so a repeated
+# click is answered without touching the queue or Firestore.
+
+
+def user_key(user_email):
+    """Short stable key of a student, used in document IDs instead of the raw email."""
+    return hashlib.sha256(user_email.strip().lower().encode()).hexdigest()[:20]
+
+
+def slot_start(timestamp, minutes=LECTURE_SLOT_MINUTES, timezone=LECTURE_TIMEZONE):
+    """Returns the local start of the lecture slot containing `timestamp` (an aware datetime)."""
+    local = timestamp.astimezone(pytz.timezone(timezone))
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = int((local - midnight).total_seconds() // 60)
+    return midnight + timedelta(minutes=elapsed - elapsed % minutes)
+
+
+def attendance_doc_id(user_email, timestamp=None):
+    """
+    Deterministic attendance document ID for (student, lecture slot), e.g. "3f2a9c...-202610181100".
+    """
+    timestamp = timestamp or datetime.now(pytz.utc)
+    return f"{user_key(user_email)}-{slot_start(timestamp):%Y%m%d%H%M}"
+
+
+class RecentlyMarked:
+    """Bounded, thread-safe set of the most recently submitted attendance keys."""
+
+    def __init__(self, max_entries=RECENT_MARKS_MAX):
+        self.max_entries = max_entries
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Records `key`. Returns False if it was already marked recently."""
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = True
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        """Forgets `key`, e.g. when queuing its record failed."""
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._keys
@@ -0,0 +1,53 @@
+import argparse
+import time
+import numpy as np
+
+from ann_index import IVFIndex
+from benchmark_gallery import synthetic_identities
+from gallery_index import GalleryIndex, l2_normalize
+
+# ----------------------------
+# ANN Recall / Latency Benchmark
+# ----------------------------
+# Builds a synthetic campus-sized gallery and reports, for every n_probe value,
+# the per-frame query latency and recall@1 against the exact GalleryIndex answer.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep IVF n_probe against exact search.")
+    parser.add_argument("--identities", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--n-lists", type=int, default=0, help="0 = about sqrt(rows).")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--faces", type=int, default=40, help="Faces per simulated frame.")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings, labels = synthetic_identities(args.identities, 1, args.dim, rng)
+    queries = l2_normalize(embeddings[rng.integers(0, len(embeddings), size=args.faces)]
+                           + 0.05 * rng.standard_normal((args.faces, args.dim)))
+
+    exact = GalleryIndex(embeddings, labels, threshold=-1.0)
+    start = time.perf_counter()
+    index = IVFIndex.build(embeddings, labels, n_lists=args.n_lists, threshold=-1.0)
+    print(f"Built {index.n_lists} lists over {len(index)} rows in {time.perf_counter() - start:.1f}s")
+
+    def frame_ms(search):
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            result = search(queries)
+        return (time.perf_counter() - start) / args.repeats * 1000, result[0]
+
+    exact_ms, truth = frame_ms(exact.search)
+    print(f"{'n_probe':>8} {'ms/frame':>9} {'recall@1':>9}")
+    print(f"{'exact':>8} {exact_ms:>9.3f} {1.0:>9.3f}")
+    for n_probe in args.n_probe:
+        index.n_probe = n_probe
+        ms, found = frame_ms(index.search)
+        recall = np.mean(np.asarray(found) == np.asarray(truth))
+        print(f"{n_probe:>8} {ms:>9.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
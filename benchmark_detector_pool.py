@@ -0,0 +1,70 @@
+import argparse
+import time
+import cv2 as cv
+import numpy as np
+
+from detector_pool import DetectorPool
+from face_detectors import BACKENDS, create_detector
+
+# ----------------------------
+# Detector Pool Scaling Benchmark
+# ----------------------------
+# Measures detection throughput (frames/sec) in the calling process and with
+# DetectorPool at increasing worker counts, on frames from a recording or on
+# synthetic frames of the requested resolution.
+
+
+def load_frames(video, count, width, height):
+    if video is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(count)]
+    frames = []
+    capture = cv.VideoCapture(video)
+    while len(frames) < count:
+        success, frame = capture.read()
+        if not success:
+            break
+        frames.append(cv.cvtColor(frame, cv.COLOR_BGR2RGB))
+    capture.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark face detection throughput against detector process count.")
+    parser.add_argument("--video", help="Recording to take frames from (synthetic frames if omitted).")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--backend", default="mtcnn", choices=list(BACKENDS))
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    detector = create_detector(args.backend, args.scale)
+    detector.detect_faces(frames[0])
+    start = time.perf_counter()
+    for frame in frames:
+        detector.detect_faces(frame)
+    baseline = len(frames) / (time.perf_counter() - start)
+    print(f"{'workers':>8} {'fps':>8} {'speedup':>8}")
+    print(f"{'inline':>8} {baseline:>8.2f} {1.0:>7.1f}x")
+
+    for workers in args.workers:
+        pool = DetectorPool(workers=workers, threads_per_worker=args.threads_per_worker,
+                            backend=args.backend, scale=args.scale)
+        pool.warm_up()
+        start = time.perf_counter()
+        futures = [pool.submit(frame) for frame in frames]
+        for future in futures:
+            future.result()
+        fps = len(frames) / (time.perf_counter() - start)
+        pool.close()
+        print(f"{workers:>8} {fps:>8.2f} {fps / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
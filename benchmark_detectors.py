@@ -0,0 +1,80 @@
+import argparse
+import os
+import time
+import cv2 as cv
+import numpy as np
+
+from face_detectors import BACKENDS, create_detector
+from face_tracker import iou_matrix
+
+# ----------------------------
+# Detector Backend Benchmark
+# ----------------------------
+# Runs every backend/scale combination on recorded frames and reports mean
+# latency and recall. The reference faces are MTCNN's confident detections at
+# full resolution; a reference face counts as found when a backend box overlaps
+# it with IoU >= 0.5.
+
+
+def load_frames(path, count, every):
+    """Reads up to `count` RGB frames from a video (one every `every` frames) or an image folder."""
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith((".jpg", ".jpeg", ".png")))
+        frames = [cv.imread(os.path.join(path, name)) for name in names[:count]]
+        return [cv.cvtColor(frame, cv.COLOR_BGR2RGB) for frame in frames if frame is not None]
+    frames = []
+    capture = cv.VideoCapture(path)
+    index = 0
+    while len(frames) < count:
+        success, frame = capture.read()
+        if not success:
+            break
+        if index % every == 0:
+            frames.append(cv.cvtColor(frame, cv.COLOR_BGR2RGB))
+        index += 1
+    capture.release()
+    return frames
+
+
+def confident_boxes(faces):
+    return [face['box'] for face in faces if face['confidence'] > 0.95]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detector backends on recorded frames.")
+    parser.add_argument("frames", help="Video file or folder of images.")
+    parser.add_argument("--count", type=int, default=50, help="Frames to evaluate.")
+    parser.add_argument("--every", type=int, default=10, help="Take one video frame out of this many.")
+    parser.add_argument("--backends", nargs="+", default=["mtcnn", "haar"], choices=list(BACKENDS))
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5])
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.count, args.every)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.frames}")
+    reference_detector = create_detector("mtcnn", 1.0)
+    reference = [confident_boxes(reference_detector.detect_faces(frame)) for frame in frames]
+    n_reference = sum(len(boxes) for boxes in reference)
+    print(f"{len(frames)} frames, {n_reference} reference faces")
+
+    print(f"{'backend':>8} {'scale':>6} {'ms/frame':>9} {'recall':>7} {'boxes':>6}")
+    for backend in args.backends:
+        for scale in args.scales:
+            detector = create_detector(backend, scale)
+            detector.detect_faces(frames[0])  # Warm-up
+            found = 0
+            total_boxes = 0
+            elapsed = 0.0
+            for frame, expected in zip(frames, reference):
+                start = time.perf_counter()
+                boxes = confident_boxes(detector.detect_faces(frame))
+                elapsed += time.perf_counter() - start
+                total_boxes += len(boxes)
+                if expected and boxes:
+                    found += int(np.sum(iou_matrix(expected, boxes).max(axis=1) >= 0.5))
+            recall = found / n_reference if n_reference else 0.0
+            print(f"{backend:>8} {scale:>6.2f} {elapsed / len(frames) * 1000:>9.1f} {recall:>7.3f} {total_boxes:>6}")
+
+
+if __name__ == "__main__":
+    main()
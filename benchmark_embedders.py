@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from config import EMBEDDER_MODEL_PATH
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ----------------------------
+# FaceNet Runtime Benchmark and Validation
+# ----------------------------
+# Checks that the ONNX (and int8) FaceNet models of export_facenet.py can replace
+# the Keras model, on the face images of the training dataset (one sub-folder per
+# student, as in Embedding_Training.ipynb):
+#
+#   python benchmark_embedders.py dataset/ --models keras facenet.onnx facenet.int8.onnx
+#
+# Faces are detected and cropped once. Every model then runs in its own child
+# process, so its load time and peak RSS are not mixed with the other models' (or
+# with the detector's). For each model the report shows latency per face and per
+# batch, and peak RSS. It also shows the cosine similarity of each embedding to the
+# Keras embedding of the same face, and the accuracy of best_model.pkl on the
+# embeddings. Accuracy is the share of faces whose predicted class is the folder name.
+
+
+def peak_rss_mb():
+    # Same as benchmark_pipeline.peak_rss_mb, without importing the whole pipeline into the child
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def measure(model, crops_path, out_path, batch_size, repeats):
+    """Child process: embeds the saved crops with `model` and returns timing and memory figures."""
+    from face_embedders import create_embedder
+    faces = np.load(crops_path)
+    start = time.perf_counter()
+    embedder = create_embedder("keras") if model == "keras" else create_embedder("onnx", model_path=model)
+    load_seconds = time.perf_counter() - start
+    embedder.embeddings(faces[:batch_size])  # Warm-up so graph tracing is not timed
+
+    batch_latencies = []
+    for _ in range(repeats):
+        embeddings = []
+        for offset in range(0, len(faces), batch_size):
+            start = time.perf_counter()
+            embeddings.append(embedder.embeddings(faces[offset:offset + batch_size]))
+            batch_latencies.append(time.perf_counter() - start)
+    np.save(out_path, np.concatenate(embeddings).astype(np.float32))
+    batch_latencies = np.asarray(batch_latencies)
+    return {
+        "load_s": load_seconds,
+        "ms_per_face": float(batch_latencies.sum() / (repeats * len(faces)) * 1000),
+        "batch_p50_ms": float(np.percentile(batch_latencies, 50) * 1000),
+        "batch_p95_ms": float(np.percentile(batch_latencies, 95) * 1000),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_child(model, crops_path, out_path, batch_size, repeats):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", model, crops_path, out_path,
+               "--batch-size", str(batch_size), "--repeats", str(repeats)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cosine_agreement(embeddings, reference):
+    a = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    b = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def classify(embeddings):
+    """best_model.pkl's class names for each embedding."""
+    import model_registry
+    model = model_registry.get("model")
+    return model_registry.get("encoder").inverse_transform(model.predict(embeddings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and benchmark FaceNet runtimes against the Keras model.")
+    parser.add_argument("dataset", nargs="?", help="Folder with one sub-folder of face images per student.")
+    parser.add_argument("--models", nargs="+", default=["keras", EMBEDDER_MODEL_PATH],
+                        help='"keras" and/or paths of ONNX models; the first is the reference.')
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many faces.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Faces per embedding call.")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over all faces per model.")
+    parser.add_argument("--out", help="Also write the results as JSON to this file.")
+    parser.add_argument("--worker", nargs=3, metavar=("MODEL", "CROPS", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(*args.worker, args.batch_size, args.repeats)))
+        return
+    if not args.dataset:
+        parser.error("the dataset folder is required")
+
+    from export_facenet import load_face_crops
+    crops, labels = load_face_crops(args.dataset, args.limit)
+    if len(crops) == 0:
+        raise SystemExit(f"No faces found under {args.dataset}")
+    print(f"{len(crops)} faces of {len(set(labels))} students")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        crops_path = os.path.join(tmp, "crops.npy")
+        np.save(crops_path, crops)
+        reference = None
+        for i, model in enumerate(args.models):
+            out_path = os.path.join(tmp, f"embeddings_{i}.npy")
+            result = run_child(model, crops_path, out_path, args.batch_size, args.repeats)
+            embeddings = np.load(out_path)
+            reference = embeddings if reference is None else reference
+            agreement = cosine_agreement(embeddings, reference)
+            result["cosine_mean"] = float(agreement.mean())
+            result["cosine_min"] = float(agreement.min())
+            result["accuracy"] = float(np.mean(classify(embeddings) == np.asarray(labels)))
+            results[model] = result
+
+    print(f"{'model':>24} {'load s':>7} {'ms/face':>8} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>7} "
+          f"{'cos mean':>9} {'cos min':>8} {'accuracy':>9}")
+    for model, r in results.items():
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+        print(f"{os.path.basename(model):>24} {r['load_s']:>7.1f} {r['ms_per_face']:>8.1f} {r['batch_p50_ms']:>8.1f} "
+              f"{r['batch_p95_ms']:>8.1f} {rss:>7} {r['cosine_mean']:>9.4f} {r['cosine_min']:>8.4f} {r['accuracy']:>9.3f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"faces": len(crops), "batch_size": args.batch_size, "models": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
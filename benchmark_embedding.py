@@ -0,0 +1,43 @@
+import argparse
+import time
+import numpy as np
+
+from classifier_model_for_testing import get_embeddings
+
+# ----------------------------
+# Embedding Benchmark
+# ----------------------------
+# Compares one FaceNet call per face (the old predict_person behaviour) with the
+# batched path, for frames containing an increasing number of faces.
+
+
+def time_frames(faces, batch_size, repeats):
+    """Return the frames/sec reached when embedding `faces` as one frame, `repeats` times."""
+    get_embeddings(faces, batch_size=batch_size)  # Warm-up so graph tracing is not timed
+    start = time.perf_counter()
+    for _ in range(repeats):
+        get_embeddings(faces, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return repeats / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FaceNet embedding throughput against face count.")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 5, 10, 20, 40],
+                        help="Numbers of faces per frame to benchmark.")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Max faces per forward pass for the batched run (0 = whole frame).")
+    parser.add_argument("--repeats", type=int, default=10, help="Frames timed per configuration.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'faces':>6} {'per-face fps':>14} {'batched fps':>13} {'speedup':>9}")
+    for n_faces in args.faces:
+        faces = rng.integers(0, 256, size=(n_faces, 160, 160, 3), dtype=np.uint8)
+        single_fps = time_frames(faces, 1, args.repeats)
+        batched_fps = time_frames(faces, args.batch_size, args.repeats)
+        print(f"{n_faces:>6} {single_fps:>14.2f} {batched_fps:>13.2f} {batched_fps / single_fps:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import pickle
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from sklearn.svm import SVC
+
+from gallery_index import GalleryIndex, l2_normalize
+
+# ----------------------------
+# Gallery vs SVC Benchmark
+# ----------------------------
+# Accuracy is measured on the held-out split of the 12-class embeddings, using the
+# same train_test_split(random_state=17) as Embedding_Training.ipynb so best_model.pkl
+# never saw the test faces. Larger galleries are padded with synthetic identities
+# (random unit centroids plus noise) that act as distractors.
+
+
+def synthetic_identities(n_identities, per_identity, dim, rng):
+    """Returns (embeddings, labels) for n_identities fake students around random unit centroids."""
+    centroids = l2_normalize(rng.standard_normal((n_identities, dim)))
+    noise = 0.05 * rng.standard_normal((n_identities, per_identity, dim))
+    embeddings = (centroids[:, None, :] + noise).reshape(-1, dim)
+    labels = np.repeat([f"synthetic_{i}" for i in range(n_identities)], per_identity)
+    return l2_normalize(embeddings), labels
+
+
+def time_per_frame(fn, queries, repeats):
+    """Average milliseconds for fn(queries)."""
+    fn(queries)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(queries)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the gallery recognizer with the SVC across gallery sizes.")
+    parser.add_argument("--embeddings", default="face_embeddig_for_12_class.npz")
+    parser.add_argument("--model", default="best_model.pkl")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 100, 1000, 10000],
+                        help="Total identities in the gallery (real + synthetic).")
+    parser.add_argument("--faces", type=int, default=20, help="Faces per simulated frame.")
+    parser.add_argument("--per-identity", type=int, default=5, help="Synthetic embeddings per extra identity.")
+    parser.add_argument("--svc-max-identities", type=int, default=200,
+                        help="Skip retraining the SVC above this many identities (it does not scale).")
+    parser.add_argument("--mode", default="centroid", choices=["centroid", "exemplar"])
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    data = np.load(args.embeddings)
+    X, names = data['arr_0'], data['arr_1']
+    encoder = LabelEncoder().fit(names)
+    X_train, X_test, Y_train, Y_test = train_test_split(X, encoder.transform(names), shuffle=True, random_state=17)
+    with open(args.model, 'rb') as f:
+        pickled_svc = pickle.load(f)
+
+    rng = np.random.default_rng(0)
+    queries = X_test[rng.integers(0, len(X_test), size=args.faces)]
+
+    print(f"{'identities':>10} {'gallery ms':>11} {'gallery acc':>12} {'svc ms':>9} {'svc acc':>8}")
+    for size in args.sizes:
+        n_extra = max(0, size - len(encoder.classes_))
+        extra_X, extra_y = synthetic_identities(n_extra, args.per_identity, X.shape[1], rng)
+        gallery_X = np.concatenate([X_train, extra_X])
+        gallery_y = np.concatenate([encoder.inverse_transform(Y_train), extra_y])
+
+        gallery = GalleryIndex.from_embeddings(gallery_X, gallery_y, mode=args.mode, threshold=args.threshold)
+        gallery_ms = time_per_frame(gallery.search, queries, args.repeats)
+        predicted, _ = gallery.search(X_test)
+        gallery_acc = np.mean(np.asarray(predicted) == encoder.inverse_transform(Y_test))
+
+        if n_extra == 0:
+            svc = pickled_svc
+        elif size <= args.svc_max_identities:
+            svc = SVC(kernel='linear', probability=True).fit(gallery_X, LabelEncoder().fit_transform(gallery_y))
+        else:
+            svc = None
+        if svc is None:
+            print(f"{size:>10} {gallery_ms:>11.3f} {gallery_acc:>12.3f} {'skipped':>9} {'-':>8}")
+            continue
+        svc_ms = time_per_frame(svc.predict_proba, queries, args.repeats)
+        if n_extra == 0:
+            svc_acc = svc.score(X_test, Y_test)
+        else:
+            svc_labels = LabelEncoder().fit(gallery_y)
+            svc_acc = np.mean(svc_labels.inverse_transform(svc.predict(X_test)) == encoder.inverse_transform(Y_test))
+        print(f"{size:>10} {gallery_ms:>11.3f} {gallery_acc:>12.3f} {svc_ms:>9.3f} {svc_acc:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import cv2 as cv
+import numpy as np
+from PIL import Image
+
+import model_registry
+from benchmark_gallery import synthetic_identities
+from build_dataset import load_label_map, sample_frames, VIDEO_EXTENSIONS
+from classifier_model_for_testing import predict_person
+from config import RECOGNIZER, TRACKING_ENABLED
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ----------------------------
+# End-to-End Pipeline Benchmark
+# ----------------------------
+# Replays recorded videos and image folders through the two entry points the app
+# uses: predict_person() (uploaded photos) and FaceDetectionTransformer.transform()
+# (live video, fed synthetic av.VideoFrames, recognition run synchronously), with
+# no browser or network involved. Every scenario is one combination of
+#
+#   faces per frame  samples tiled side by side into one frame
+#   resolution       frame height the tiled frame is resized to
+#   gallery size     identities in the gallery/ann recognizer, padded with synthetic ones
+#
+# and reports throughput, latency percentiles, peak RSS (of the process so far)
+# and accuracy (share of the expected students found in each frame). Results are
+# written as JSON; with --baseline, scenarios that got slower or less accurate
+# than the earlier run are flagged and the exit code is 1.
+#
+# Expected labels: images under folder/<Student Name>/ are labelled with the
+# sub-folder name, videos with --labels (stem,name CSV) or their file stem.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_samples(paths, label_map, frames_per_video, fps):
+    """Returns a list of (rgb_frame, expected_label) from video files and image folders."""
+    samples = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, files in sorted(os.walk(path)):
+                label = os.path.basename(folder) if os.path.normpath(folder) != os.path.normpath(path) else None
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        image = cv.imread(os.path.join(folder, name))
+                        if image is not None:
+                            samples.append((cv.cvtColor(image, cv.COLOR_BGR2RGB), label))
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            frames = itertools.islice(sample_frames(path, fps), frames_per_video)
+            samples.extend((frame, label_map.get(stem, stem)) for frame in frames)
+        else:
+            print(f"Skipping {path}: not a folder or video")
+    return samples
+
+
+def compose_frames(samples, faces_per_frame, height, count):
+    """Tiles faces_per_frame consecutive samples side by side and resizes to `height`. Returns [(rgb, labels)]."""
+    frames = []
+    for i in range(count):
+        chosen = [samples[(i * faces_per_frame + j) % len(samples)] for j in range(faces_per_frame)]
+        tiles = [cv.resize(image, (int(image.shape[1] * height / image.shape[0]), height)) for image, _ in chosen]
+        frames.append((np.ascontiguousarray(np.hstack(tiles)), {label for _, label in chosen if label}))
+    return frames
+
+
+def pad_gallery(size, originals, rng):
+    """Swaps in a gallery (and ANN index) padded to `size` identities. size 0 restores the originals."""
+    from gallery_index import GalleryIndex
+    from ann_index import IVFIndex
+    if size == 0:
+        for name, component in originals.items():
+            model_registry.replace(name, component)
+        return
+    embeddings, labels = originals["embeddings"]
+    n_extra = max(0, size - len(np.unique(labels)))
+    extra_X, extra_y = synthetic_identities(n_extra, 5, embeddings.shape[1], rng)
+    gallery = GalleryIndex.from_embeddings(np.concatenate([embeddings, extra_X]), np.concatenate([labels, extra_y]))
+    model_registry.replace("gallery", gallery)
+    if RECOGNIZER == "ann":
+        model_registry.replace("ann_index", IVFIndex.from_gallery(gallery))
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def predict_person_runner():
+    return lambda rgb: predict_person(Image.fromarray(rgb)).labels
+
+
+def transform_runner(tracking):
+    import av
+    from video_transformer import FaceDetectionTransformer
+    transformer = FaceDetectionTransformer(inference_mode="sync", tracking=tracking)
+
+    def run(rgb):
+        frame = av.VideoFrame.from_ndarray(cv.cvtColor(rgb, cv.COLOR_RGB2BGR), format="bgr24")
+        transformer.transform(frame)
+        return transformer.all_predictions
+    return run
+
+
+def measure(run, frames):
+    """Runs frames one at a time through `run` and returns (latencies in seconds, predicted labels per frame)."""
+    run(frames[0][0])  # Warm-up, not timed
+    latencies, outputs = [], []
+    for rgb, _ in frames:
+        start = time.perf_counter()
+        outputs.append(run(rgb))
+        latencies.append(time.perf_counter() - start)
+    return np.asarray(latencies), outputs
+
+
+def accuracy(frames, outputs):
+    found, expected = 0, 0
+    for (_, labels), predicted in zip(frames, outputs):
+        found += len(labels & set(predicted))
+        expected += len(labels)
+    return found / expected if expected else None
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regression messages against an earlier results JSON."""
+    previous = {scenario["name"]: scenario for scenario in baseline["scenarios"]}
+    regressions = []
+    for scenario in results["scenarios"]:
+        old = previous.get(scenario["name"])
+        if old is None:
+            continue
+        if scenario["fps"] < old["fps"] * (1 - tolerance):
+            regressions.append(f"{scenario['name']}: throughput {old['fps']:.2f} -> {scenario['fps']:.2f} fps")
+        if scenario["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{scenario['name']}: p95 {old['p95_ms']:.1f} -> {scenario['p95_ms']:.1f} ms")
+        if scenario["accuracy"] is not None and old["accuracy"] is not None and scenario["accuracy"] < old["accuracy"] - 0.01:
+            regressions.append(f"{scenario['name']}: accuracy {old['accuracy']:.3f} -> {scenario['accuracy']:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay videos or image folders through the recognition pipeline.")
+    parser.add_argument("inputs", nargs="+", help="Video files and/or image folders (folder/<Student Name>/*.jpg).")
+    parser.add_argument("--labels", help="CSV mapping video file stem to student name (default: the stem).")
+    parser.add_argument("--frames", type=int, default=30, help="Frames timed per scenario.")
+    parser.add_argument("--frames-per-video", type=int, default=50, help="Frames sampled from each video.")
+    parser.add_argument("--fps", type=float, default=5, help="Frames sampled per second of video.")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 4], help="Faces per frame.")
+    parser.add_argument("--heights", type=int, nargs="+", default=[480, 720, 1080], help="Frame heights.")
+    parser.add_argument("--gallery-sizes", type=int, nargs="+", default=[0, 1000, 10000],
+                        help="Gallery identities (0 = as loaded). Only used with RECOGNIZER=gallery or ann.")
+    parser.add_argument("--paths", nargs="+", default=["predict_person", "transform"],
+                        choices=["predict_person", "transform"])
+    parser.add_argument("--tracking", choices=["on", "off"], default="on" if TRACKING_ENABLED else "off",
+                        help="Face tracking in the transform path.")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to flag regressions against.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown before flagging.")
+    args = parser.parse_args()
+
+    samples = load_samples(args.inputs, load_label_map(args.labels), args.frames_per_video, args.fps)
+    if not samples:
+        raise SystemExit("No frames found in the inputs")
+    model_registry.warm_up()
+
+    gallery_sizes = args.gallery_sizes
+    originals = {}
+    if RECOGNIZER in ("gallery", "ann"):
+        originals = {name: model_registry.get(name) for name in ("embeddings", "gallery")}
+        if RECOGNIZER == "ann":
+            originals["ann_index"] = model_registry.get("ann_index")
+    elif any(gallery_sizes):
+        print(f"RECOGNIZER={RECOGNIZER}: gallery sizes are ignored")
+        gallery_sizes = [0]
+
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "recognizer": RECOGNIZER, "tracking": args.tracking,
+               "python": platform.python_version(), "machine": platform.machine(), "samples": len(samples),
+               "scenarios": []}
+    rng = np.random.default_rng(0)
+    print(f"{'scenario':<44} {'fps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>8} {'acc':>6}")
+    for gallery_size in gallery_sizes:
+        if originals:
+            pad_gallery(gallery_size, originals, rng)
+        for faces, height, path in itertools.product(args.faces, args.heights, args.paths):
+            frames = compose_frames(samples, faces, height, args.frames)
+            run = predict_person_runner() if path == "predict_person" else transform_runner(args.tracking == "on")
+            latencies, outputs = measure(run, frames)
+            name = f"{path}/faces={faces}/h={height}/gallery={gallery_size}"
+            scenario = {"name": name, "path": path, "faces": faces, "height": height, "gallery": gallery_size,
+                        "frames": len(frames), "fps": len(frames) / latencies.sum(),
+                        "mean_ms": latencies.mean() * 1000,
+                        **{f"p{q}_ms": float(np.percentile(latencies, q) * 1000) for q in (50, 95, 99)},
+                        "peak_rss_mb": peak_rss_mb(), "accuracy": accuracy(frames, outputs)}
+            results["scenarios"].append(scenario)
+            acc = f"{scenario['accuracy']:.3f}" if scenario["accuracy"] is not None else "-"
+            rss = f"{scenario['peak_rss_mb']:.0f}" if scenario["peak_rss_mb"] is not None else "-"
+            print(f"{name:<44} {scenario['fps']:>7.2f} {scenario['p50_ms']:>8.1f} {scenario['p95_ms']:>8.1f} "
+                  f"{scenario['p99_ms']:>8.1f} {rss:>8} {acc:>6}")
+    if originals:
+        pad_gallery(0, originals, rng)
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
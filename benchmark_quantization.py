@@ -0,0 +1,65 @@
+import argparse
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from benchmark_gallery import synthetic_identities, time_per_frame
+from gallery_index import DTYPES, GalleryIndex
+from mmap_gallery import load_embedding_file
+
+# ----------------------------
+# Quantized Gallery Benchmark
+# ----------------------------
+# Accuracy, memory and search latency of int16 / int8 galleries against the
+# float32 baseline, on the held-out split of the 12-class embeddings (same
+# train_test_split(random_state=17) as Embedding_Training.ipynb). "agree" is the
+# share of test faces given the same label as float32 and "max |d|" the largest
+# cosine score difference. Latency is measured on galleries padded with synthetic
+# identities, where memory bandwidth starts to matter.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare float32, int16 and int8 gallery storage.")
+    parser.add_argument("--embeddings", default="face_embeddig_for_12_class.npz")
+    parser.add_argument("--mode", default="exemplar", choices=["centroid", "exemplar"])
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 1000, 10000, 50000],
+                        help="Total identities in the latency runs (real + synthetic).")
+    parser.add_argument("--per-identity", type=int, default=5, help="Synthetic embeddings per extra identity.")
+    parser.add_argument("--faces", type=int, default=20, help="Faces per simulated frame.")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    X, names = load_embedding_file(args.embeddings)
+    X_train, X_test, y_train, y_test = train_test_split(np.asarray(X), names, shuffle=True, random_state=17)
+
+    print(f"Accuracy on the 12-class test split ({args.mode} gallery, {len(X_test)} faces)")
+    print(f"{'dtype':>8} {'bytes':>10} {'accuracy':>9} {'agree':>7} {'max |d|':>9}")
+    baseline = GalleryIndex.from_embeddings(X_train, y_train, args.mode, args.threshold, dtype="float32")
+    base_labels, _ = baseline.search(X_test)
+    base_sims = baseline.similarities(X_test)
+    for dtype in DTYPES:
+        gallery = GalleryIndex.from_embeddings(X_train, y_train, args.mode, args.threshold, dtype=dtype)
+        labels, _ = gallery.search(X_test)
+        accuracy = np.mean(np.asarray(labels) == y_test)
+        agree = np.mean(np.asarray(labels) == np.asarray(base_labels))
+        max_diff = np.abs(gallery.similarities(X_test) - base_sims).max()
+        print(f"{dtype:>8} {gallery.nbytes:>10} {accuracy:>9.4f} {agree:>7.4f} {max_diff:>9.5f}")
+
+    rng = np.random.default_rng(0)
+    queries = X_test[rng.integers(0, len(X_test), size=args.faces)]
+    print(f"\nSearch latency per frame of {args.faces} faces (ms) and gallery memory (MB)")
+    print(f"{'identities':>10} " + " ".join(f"{dtype + ' ms':>11} {dtype + ' MB':>11}" for dtype in DTYPES))
+    for size in args.sizes:
+        n_extra = max(0, size - len(np.unique(names)))
+        extra_X, extra_y = synthetic_identities(n_extra, args.per_identity, X.shape[1], rng)
+        gallery_X = np.concatenate([X_train, extra_X])
+        gallery_y = np.concatenate([y_train, extra_y])
+        row = []
+        for dtype in DTYPES:
+            gallery = GalleryIndex.from_embeddings(gallery_X, gallery_y, args.mode, args.threshold, dtype=dtype)
+            row.append(f"{time_per_frame(gallery.search, queries, args.repeats):>11.3f} {gallery.nbytes / 1e6:>11.2f}")
+        print(f"{size:>10} " + " ".join(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2 as cv
+import numpy as np
+
+import enrollment
+from config import DETECTOR_BACKEND, DETECTOR_SCALE, EMBED_BATCH_SIZE, EMBEDDER_BACKEND, EMBEDDER_MODEL_PATH
+
+# ----------------------------
+# Dataset Build Pipeline
+# ----------------------------
+# Command-line replacement for Extraction_Augmentation.ipynb + the embedding part
+# of Embedding_Training.ipynb. For every student video:
+#
+#   1. frames are streamed from the video at ~5 fps by a generator,
+#   2. a process pool pads each frame, crops the face and applies the notebook's
+#      augmentations (each worker holds its own detector),
+#   3. all crops are embedded with FaceNet in large batches and written
+#      incrementally into a .npy file on disk.
+#
+# Crops are appended to a raw uint8 file on disk EMBED_BATCH_SIZE at a time as the
+# workers return them, and stage 3 reads that file memory-mapped, so a long video
+# never has all of its crops in memory.
+#
+# The output of stages 2 and 3 is cached under --cache, keyed by the SHA-256 of the
+# video bytes and of every parameter that affects the result (for the embeddings
+# also the embedder backend and the SHA-256 of its model file), so re-running after
+# adding one student's video only processes that video. The final .npz has the
+# same arr_0 (embeddings) / arr_1 (names) layout as face_embeddig_for_12_class.npz.
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+FACE_SHAPE = enrollment.resize_dim[::-1] + (3,)  # (height, width, RGB) of a crop
+
+# Worker process state
+_detector = None
+
+
+def _init_worker(backend, scale):
+    global _detector
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    from face_detectors import create_detector
+    _detector = create_detector(backend, scale)
+
+
+def _faces_from_frame(frame_rgb):
+    face = enrollment.extract_face(frame_rgb, detector=_detector)
+    if face is None:
+        return None
+    return np.stack(enrollment.augment_face(face))
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_hash(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def embedder_key(backend=EMBEDDER_BACKEND, model_path=EMBEDDER_MODEL_PATH):
+    """Identifies the embedder for the cache: the backend name plus the hash of its model file, if it uses one."""
+    if backend == "keras":
+        return [backend]  # Weights bundled with keras-facenet
+    return [backend, file_hash(model_path)]
+
+
+def sample_frames(video_path, frames_per_second=5):
+    """Yields RGB frames from a video at about frames_per_second."""
+    vid = cv.VideoCapture(video_path)
+    if not vid.isOpened():
+        raise IOError(f"Video file cannot be opened: {video_path}")
+    fps = vid.get(cv.CAP_PROP_FPS) or 30  # Use a default if FPS is not available
+    sample_rate = max(1, int(round(fps / frames_per_second)))
+    frame_counter = 0
+    try:
+        while True:
+            success = vid.grab()
+            if not success:
+                break
+            # grab() still decodes every frame; only every sample_rate-th one is retrieved (converted and copied)
+            if frame_counter % sample_rate == 0:
+                success, frame = vid.retrieve()
+                if success:
+                    yield cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+            frame_counter += 1
+    finally:
+        vid.release()
+
+
+def bounded_map(executor, fn, items, max_in_flight):
+    """Like executor.map, but only keeps max_in_flight items submitted, so a long generator is never buffered."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def extract_faces(video_path, out_path, executor, workers, frames_per_second, chunk_size=EMBED_BATCH_SIZE):
+    """
+    Stage 2: writes every augmented face crop of a video to out_path (raw uint8 crops, see
+    load_faces), chunk_size crops at a time. Returns the crop count.
+    """
+    frames = sample_frames(video_path, frames_per_second)
+    tmp_path = out_path + ".tmp"
+    chunk, buffered, count = [], 0, 0
+    with open(tmp_path, 'wb') as f:
+        for faces in bounded_map(executor, _faces_from_frame, frames, max_in_flight=4 * workers):
+            if faces is None:
+                continue
+            chunk.append(faces)
+            buffered += len(faces)
+            if buffered >= chunk_size:
+                np.concatenate(chunk).astype(np.uint8, copy=False).tofile(f)
+                count += buffered
+                chunk, buffered = [], 0
+        if chunk:
+            np.concatenate(chunk).astype(np.uint8, copy=False).tofile(f)
+            count += buffered
+    os.replace(tmp_path, out_path)
+    return count
+
+
+def load_faces(path):
+    """Returns the crops written by extract_faces as a read-only (N, 160, 160, 3) memmap."""
+    if os.path.getsize(path) == 0:
+        return np.empty((0,) + FACE_SHAPE, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode='r').reshape((-1,) + FACE_SHAPE)
+
+
+def embed_faces(faces_path, out_path, batch_size):
+    """Stage 3: embeds the crops of faces_path in batches, writing each batch straight into out_path (.npy)."""
+    from classifier_model_for_testing import get_embeddings
+    faces = load_faces(faces_path)
+    tmp_path = out_path + ".tmp.npy"
+    embeddings = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(len(faces), 512))
+    for start in range(0, len(faces), batch_size):
+        embeddings[start:start + batch_size] = get_embeddings(faces[start:start + batch_size], batch_size=batch_size)
+    embeddings.flush()
+    del embeddings
+    os.replace(tmp_path, out_path)
+    return len(faces)
+
+
+def load_label_map(path):
+    """Reads an optional CSV of video_file_stem,student_name rows."""
+    if not path:
+        return {}
+    with open(path, newline='') as f:
+        return {row[0]: row[1] for row in csv.reader(f) if len(row) >= 2}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the face embedding dataset from one video per student.")
+    parser.add_argument("videos", help="Folder with one video per student.")
+    parser.add_argument("--out", default="face_embeddings.npz", help="Output .npz (arr_0 embeddings, arr_1 names).")
+    parser.add_argument("--labels", help="CSV mapping video file stem to student name (default: the stem).")
+    parser.add_argument("--cache", default=".dataset_cache", help="Folder for cached stage outputs.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Detection/augmentation processes.")
+    parser.add_argument("--fps", type=float, default=5, help="Frames sampled per second of video.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Faces per FaceNet forward pass.")
+    parser.add_argument("--backend", default=DETECTOR_BACKEND, help="Face detector backend.")
+    parser.add_argument("--scale", type=float, default=DETECTOR_SCALE, help="Detector downscale factor.")
+    args = parser.parse_args()
+
+    label_map = load_label_map(args.labels)
+    videos = sorted(name for name in os.listdir(args.videos) if name.lower().endswith(VIDEO_EXTENSIONS))
+    os.makedirs(os.path.join(args.cache, "faces"), exist_ok=True)
+    os.makedirs(os.path.join(args.cache, "embeddings"), exist_ok=True)
+    augmentation = [enrollment.resize_dim, enrollment.h_shift, enrollment.v_shift, enrollment.brightness_alpha,
+                    enrollment.brightness_beta, enrollment.darkness_alpha, enrollment.darkness_beta,
+                    enrollment.blur_ksize, enrollment.padding]
+
+    embedder = embedder_key()
+
+    all_embeddings, all_names = [], []
+    executor = None
+    try:
+        for name in videos:
+            video_path = os.path.join(args.videos, name)
+            stem = os.path.splitext(name)[0]
+            student = label_map.get(stem, stem)
+            start = time.perf_counter()
+
+            faces_key = params_hash(file_hash(video_path), args.fps, args.backend, args.scale, augmentation)
+            faces_path = os.path.join(args.cache, "faces", faces_key + ".u8")
+            embeddings_path = os.path.join(args.cache, "embeddings", params_hash(faces_key, embedder) + ".npy")
+
+            status = "cached"
+            if not os.path.exists(embeddings_path):
+                if not os.path.exists(faces_path):
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn"),
+                                                       initializer=_init_worker, initargs=(args.backend, args.scale))
+                    extract_faces(video_path, faces_path, executor, args.workers, args.fps)
+                embed_faces(faces_path, embeddings_path, args.batch_size)
+                status = "processed"
+
+            embeddings = np.load(embeddings_path, mmap_mode='r')
+            all_embeddings.append(embeddings)
+            all_names.append(np.full(len(embeddings), student))
+            print(f"{student}: {len(embeddings)} embeddings ({status}, {time.perf_counter() - start:.1f}s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if not all_embeddings:
+        raise SystemExit(f"No videos found in {args.videos}")
+    np.savez(args.out, np.concatenate(all_embeddings), np.concatenate(all_names))
+    print(f"Wrote {sum(len(e) for e in all_embeddings)} embeddings of {len(videos)} students to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
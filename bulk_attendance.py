@@ -0,0 +1,287 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+import cv2 as cv
+import pytz
+
+import model_registry
+from attendance_slots import attendance_doc_id
+from build_dataset import bounded_map
+from classifier_model_for_testing import (confident_face_boxes, crop_faces, face_keypoints, gate_faces,
+                                          get_embeddings, classify_embeddings)
+from face_detectors import create_detector
+from config import BULK_SAMPLE_FPS, BULK_MIN_FRAMES, BULK_WORKERS, EMBED_BATCH_SIZE, LECTURE_TIMEZONE
+
+# ----------------------------
+# Bulk Attendance
+# ----------------------------
+# Instructor-side attendance for a whole class from one group photo or a lecture
+# recording. A recording is sampled sparsely (BULK_SAMPLE_FPS; frames in between
+# are only grab()bed: still decoded, but never converted to BGR or copied out),
+# faces are detected on a few threads, each with its own detector (or on the
+# DetectorPool processes when DETECTOR_PROCESSES is set) and the crops of
+# many frames are embedded and classified together in large batches. Identities
+# are tallied across frames, and a student counts as present once recognized in
+# BULK_MIN_FRAMES sampled frames, which filters out one-off misrecognitions. All
+# present students are then queued in a single transaction and reach Firestore in
+# one write batch.
+#
+# At 0.5 sampled frames per second a 60-minute recording is 1800 frames, well
+# within an hour of CPU time even with MTCNN; DETECTOR_SCALE and the yunet backend
+# make it several times faster again.
+
+
+@dataclass
+class Sighting:
+    frames: int = 0
+    best_score: float = 0.0
+    first_seen: float = 0.0
+    last_seen: float = -1.0
+
+
+@dataclass
+class BulkScan:
+    """Identities recognized in a photo or recording, with how often and when they were seen."""
+    sightings: dict = field(default_factory=dict)
+    frames_scanned: int = 0
+    faces_seen: int = 0
+    unknown_faces: int = 0
+    rejected_faces: int = 0  # Not embedded, see face_quality.py
+    media_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    def present(self, min_frames=BULK_MIN_FRAMES):
+        """Names recognized in at least min_frames frames (capped at the frames scanned), sorted."""
+        needed = min(min_frames, max(1, self.frames_scanned))
+        return sorted(name for name, sighting in self.sightings.items() if sighting.frames >= needed)
+
+    @property
+    def realtime_factor(self):
+        """Seconds of recording processed per second of wall time."""
+        return self.media_seconds / self.elapsed if self.elapsed > 0 else 0.0
+
+
+# Spare per-thread detectors by (backend, scale), kept between scans
+_spare_detectors = {}
+_spare_lock = threading.Lock()
+
+
+def _borrow_detector(shared):
+    """
+    A detector for the calling thread alone. The detectors keep per-call state (YuNet's input
+    size, MTCNN's graph), so threads only share `shared` when it is thread-safe (DetectorPool).
+    """
+    if getattr(shared, "thread_safe", False):
+        return shared
+    with _spare_lock:
+        spares = _spare_detectors.get((shared.name, shared.scale))
+        if spares:
+            return spares.pop()
+    return create_detector(shared.name, shared.scale)
+
+
+def _return_detector(detector, shared):
+    if detector is not shared:
+        with _spare_lock:
+            _spare_detectors.setdefault((detector.name, detector.scale), []).append(detector)
+
+
+def sample_video(path, sample_fps=BULK_SAMPLE_FPS):
+    """Yields (seconds, BGR frame) pairs from a recording, sample_fps frames per second of video."""
+    capture = cv.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Video file cannot be opened: {path}")
+    fps = capture.get(cv.CAP_PROP_FPS) or 30
+    step = max(1, int(round(fps / sample_fps)))
+    index = 0
+    try:
+        while capture.grab():
+            if index % step == 0:
+                success, frame = capture.retrieve()
+                if success:
+                    yield index / fps, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def scan_frames(frames, workers=BULK_WORKERS, batch_size=EMBED_BATCH_SIZE):
+    """
+    Recognizes the faces of (seconds, BGR frame) pairs and tallies them per identity.
+    Returns a BulkScan; media_seconds is the timestamp of the last frame.
+    """
+    shared = model_registry.get("detector")
+    scan = BulkScan()
+    start = time.perf_counter()
+    crops, seen_at = [], []
+    local, borrowed = threading.local(), []
+
+    def detect(item):
+        seconds, frame = item
+        detector = getattr(local, "detector", None)
+        if detector is None:
+            detector = local.detector = _borrow_detector(shared)
+            borrowed.append(detector)
+        faces = detector.detect_faces(frame, color="BGR")
+        boxes = confident_face_boxes(faces)
+        kept_crops, labels = gate_faces(crop_faces(frame, boxes, color="BGR"), boxes, face_keypoints(faces))
+        return seconds, kept_crops, len(labels) - len(kept_crops)
+
+    def classify_pending():
+        labels, scores = classify_embeddings(get_embeddings(crops, batch_size=batch_size))
+        for seconds, label, score in zip(seen_at, labels, scores):
+            if label == "Unknown":
+                scan.unknown_faces += 1
+                continue
+            sighting = scan.sightings.get(label)
+            if sighting is None:
+                sighting = scan.sightings[label] = Sighting(first_seen=seconds)
+            if sighting.last_seen != seconds:  # Count each frame once per person
+                sighting.frames += 1
+                sighting.last_seen = seconds
+            sighting.best_score = max(sighting.best_score, float(score))
+        crops.clear()
+        seen_at.clear()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for seconds, face_crops, rejected in bounded_map(executor, detect, frames, max_in_flight=2 * workers):
+                scan.frames_scanned += 1
+                scan.faces_seen += len(face_crops) + rejected
+                scan.rejected_faces += rejected
+                scan.media_seconds = seconds
+                crops.extend(face_crops)
+                seen_at.extend([seconds] * len(face_crops))
+                if len(crops) >= batch_size:
+                    classify_pending()
+    finally:
+        for detector in borrowed:
+            _return_detector(detector, shared)
+    if crops:
+        classify_pending()
+    scan.elapsed = time.perf_counter() - start
+    return scan
+
+
+def scan_photo(image_bgr):
+    """Recognizes every face of one group photo (a BGR array)."""
+    return scan_frames([(0.0, image_bgr)], workers=1)
+
+
+def scan_video(path, sample_fps=BULK_SAMPLE_FPS, workers=BULK_WORKERS):
+    """Recognizes the students of a lecture recording."""
+    return scan_frames(sample_video(path, sample_fps), workers=workers)
+
+
+FIRESTORE_IN_LIMIT = 30  # Values per "in" filter
+
+
+def full_name(user):
+    return f"{user.get('first_name', '')} {user.get('middle_name', '')} {user.get('last_name', '')}".strip()
+
+
+def users_by_name(db, names):
+    """
+    Maps each of `names` (full names as recognized) that has an account to its users document.
+    Only the users whose first name starts one of the names are read, not the whole collection.
+    """
+    names = set(names)
+    # A first name may itself contain spaces, so every leading run of words is a candidate
+    first_names = sorted({" ".join(words[:i]) for words in (name.split(" ") for name in names)
+                          for i in range(1, len(words) + 1)})
+    users = {}
+    for start in range(0, len(first_names), FIRESTORE_IN_LIMIT):
+        query = db.collection("users").where(field_path="first_name", op_string="in",
+                                             value=first_names[start:start + FIRESTORE_IN_LIMIT])
+        for user in (doc.to_dict() for doc in query.stream()):
+            if full_name(user) in names:
+                users[full_name(user)] = user
+    return users
+
+
+def mark_present(attendance_queue, names, users, lecture=None, timestamp=None, recent=None):
+    """
+    Queues one attendance record per recognized student in a single transaction, so they are
+    committed to Firestore together. Records are keyed by student and the lecture slot of
+    `timestamp` (the lecture's time, default now), the same key live attendance uses, and
+    students already in `recent` (a RecentlyMarked) are skipped. `lecture` is a name stored
+    with each record.
+    Returns (doc_ids queued, names without a registered account).
+    """
+    timestamp = timestamp or datetime.now(pytz.utc)
+    records, unmatched = [], []
+    for name in names:
+        user = users.get(name)
+        if user is None:
+            unmatched.append(name)
+            continue
+        doc_id = attendance_doc_id(user["email"], timestamp)
+        if recent is not None and not recent.add(doc_id):
+            continue
+        data = {"user_email": user["email"], "name": name, "branch": user.get("branch", ""),
+                "timestamp": timestamp, "source": "bulk"}
+        if lecture:
+            data["lecture"] = lecture
+        records.append((data, doc_id))
+    try:
+        doc_ids = attendance_queue.enqueue_many("attendance", records) if records else []
+    except Exception:
+        if recent is not None:
+            for _, doc_id in records:
+                recent.discard(doc_id)
+        raise
+    return doc_ids, unmatched
+
+
+def print_scan(scan, min_frames):
+    present = scan.present(min_frames)
+    print(f"Scanned {scan.frames_scanned} frames ({scan.media_seconds / 60:.1f} min of video) in {scan.elapsed:.1f}s, "
+          f"{scan.realtime_factor:.1f}x real time; {scan.faces_seen} faces, {scan.unknown_faces} unknown, "
+          f"{scan.rejected_faces} rejected as low quality")
+    for name, sighting in sorted(scan.sightings.items()):
+        status = "present" if name in present else "below min frames"
+        print(f"  {name}: {sighting.frames} frames, best score {sighting.best_score:.2f}, "
+              f"first seen at {sighting.first_seen:.0f}s ({status})")
+    return present
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mark attendance for everyone recognized in a group photo or recording.")
+    parser.add_argument("media", help="Group photo or lecture recording.")
+    parser.add_argument("--fps", type=float, default=BULK_SAMPLE_FPS, help="Frames sampled per second of video.")
+    parser.add_argument("--min-frames", type=int, default=BULK_MIN_FRAMES, help="Frames a student must be seen in.")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="Detection threads.")
+    parser.add_argument("--lecture", help="Lecture name stored with each record.")
+    parser.add_argument("--at", help='Local time of the lecture, "YYYY-MM-DD HH:MM" (default: now).')
+    parser.add_argument("--commit", action="store_true", help="Write the attendance to Firestore (default: report only).")
+    parser.add_argument("--key", default="techfusion-firestore-key.json", help="Firebase service account key.")
+    args = parser.parse_args()
+
+    model_registry.warm_up()
+    image = cv.imread(args.media)
+    scan = scan_photo(image) if image is not None else scan_video(args.media, args.fps, args.workers)
+    present = print_scan(scan, args.min_frames)
+    if not args.commit:
+        return
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    from attendance_queue import AttendanceQueue
+    firebase_admin.initialize_app(credentials.Certificate(args.key))
+    db = firestore.client()
+    attendance_queue = AttendanceQueue(db, aggregate=True)
+    timestamp = None
+    if args.at:
+        timestamp = pytz.timezone(LECTURE_TIMEZONE).localize(datetime.strptime(args.at, "%Y-%m-%d %H:%M"))
+    doc_ids, unmatched = mark_present(attendance_queue, present, users_by_name(db, present), args.lecture, timestamp)
+    attendance_queue.flush()
+    print(f"Marked {len(doc_ids)} students present, {attendance_queue.pending_count()} records still queued")
+    if unmatched:
+        print(f"No account found for: {', '.join(unmatched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,35 @@
-import pickle
+import time
+from dataclasses import dataclass, field
 import numpy as np
 import cv2 as cv
-from mtcnn.mtcnn import MTCNN
-from keras_facenet import FaceNet
 from PIL import Image
-from sklearn.preprocessing import LabelEncoder
+import face_quality
+import metrics
+import model_registry
+from config import EMBED_BATCH_SIZE, RECOGNIZER
 
 # ----------------------------
-# Load the Classifier Model
+# Lazily Loaded Components
 # ----------------------------
-model_path = "best_model.pkl"  # Adjust path as necessary
-with open(model_path, 'rb') as f:
-    model = pickle.load(f)
-print("Model loaded successfully!")
+# The classifier model, embeddings, label encoder, gallery, face detector and FaceNet
+# embedder are loaded by model_registry the first time they are used, not at import.
+# They remain reachable as module attributes (classifier_model_for_testing.model, ...).
+_lazy_components = ("model", "encoder", "gallery", "ann_index", "detector", "embedder")
 
-# ----------------------------
-# Load Embeddings from .npz File
-# ----------------------------
-embedding_file = "face_embeddig_for_12_class.npz"  # Path to your .npz file containing the embeddings
-embedding_data = np.load(embedding_file)
-encoder=LabelEncoder()
-
-# Assuming that the .npz file contains two arrays: 'X' (the embeddings) and 'y' (the corresponding labels)
-X_train = embedding_data['arr_0']  # This would be the stored embeddings
-y_train = embedding_data['arr_1']  # These would be the corresponding names/labels
-print("Embeddings loaded successfully!")
-encoder.fit(y_train)
-y_train=encoder.transform(y_train)
-print(y_train)
+def __getattr__(name):
+    if name in _lazy_components:
+        return model_registry.get(name)
+    if name == "X_train":
+        return model_registry.get("training_embeddings")[0]
+    if name == "y_train":
+        return model_registry.get("encoder").transform(model_registry.get("training_embeddings")[1])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up(background=False):
+    """
+    Loads every component the configured pipeline needs and returns the load time of each.
+    """
+    return model_registry.warm_up(background=background)
 
 # ---------------------------
 
@@ -37,18 +39,12 @@ def inverse_transform(final_predictions):
         if pred == "Unknown":
             Y_pred_name.append("Unknown")
         else:
-            Y_pred_name.append(str(encoder.inverse_transform([pred])[0]))
+            Y_pred_name.append(str(model_registry.get("encoder").inverse_transform([pred])[0]))
     return Y_pred_name
     # print(Y_pred_name)
 
 
 
-# ----------------------------
-# Initialize Face Detector and Embedder
-# ----------------------------
-detector = MTCNN()
-embedder = FaceNet()
-
 # ----------------------------
 # Define the get_embedding Function
 # ----------------------------
@@ -57,71 +53,161 @@ def get_embedding(face_img):
     Given a face image (as a NumPy array of shape 160x160x3), convert it to float32,
     expand dimensions, and compute the 512D embedding using the FaceNet embedder.
     """
-    face_img = face_img.astype('float32')
-    face_img = np.expand_dims(face_img, axis=0)  # Shape becomes (1, 160, 160, 3)
-    yhat = embedder.embeddings(face_img)
-    return yhat[0]  # Return the embedding vector (512D)
+    return get_embeddings([face_img], batch_size=1)[0]  # Return the embedding vector (512D)
+
+def get_embeddings(face_imgs, batch_size=EMBED_BATCH_SIZE):
+    """
+    Given a list of face images (each a NumPy array of shape 160x160x3), stack them into
+    one (N, 160, 160, 3) float32 tensor and compute all N embeddings with a single FaceNet
+    forward pass, or one pass per batch_size faces when N is larger than batch_size.
+    The returned (N, 512) array keeps the order of face_imgs.
+    """
+    if len(face_imgs) == 0:
+        return np.empty((0, 512), dtype='float32')
+    faces = np.asarray(face_imgs, dtype='float32')  # Shape becomes (N, 160, 160, 3)
+    if batch_size is None or batch_size <= 0:
+        batch_size = len(faces)
+    embedder = model_registry.get("embedder")
+    chunks = [embedder.embeddings(faces[start:start + batch_size])
+              for start in range(0, len(faces), batch_size)]
+    return np.concatenate(chunks, axis=0)
 
 # ----------------------------
 # Prediction Function
 # ----------------------------
-# This variable will store the latest predictions for access by the video processor
-last_predictions = []
+@dataclass
+class RecognitionResult:
+    """
+    Outcome of recognizing one frame. boxes, labels and scores hold one entry per classified
+    face; message is None when at least one face was classified, otherwise it explains why
+    nothing was recognized. timings maps each pipeline stage to its duration in seconds.
+    """
+    boxes: list = field(default_factory=list)
+    labels: list = field(default_factory=list)
+    scores: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+    message: str = None
+    image: object = None  # Annotated PIL image, only set by predict_person
 
-def predict_person(pil_image):
+def confident_faces(faces):
     """
-    Accepts a PIL image, detects faces using MTCNN, and for each face with confidence > 0.95,
-    crops and resizes the face to 160x160, obtains its embedding, and uses the classifier model
-    to predict the identity. If multiple faces are detected, returns a comma-separated string of predictions.
+    Returns the detections with confidence > 0.95.
+    """
+    return [face for face in faces if face['confidence'] > 0.95]
+
+def confident_face_boxes(faces):
+    """
+    Returns the (x, y, w, h) boxes of the detections with confidence > 0.95.
+    """
+    face_boxes = []
+    for face in confident_faces(faces):
+        x, y, w, h = face['box']
+        x, y = abs(x), abs(y)  # Ensure positive coordinates
+        face_boxes.append((x, y, w, h))
+    return face_boxes
+
+def face_keypoints(faces):
+    """
+    Returns the keypoints of the detections with confidence > 0.95, in confident_face_boxes order.
+    """
+    return [face.get('keypoints') for face in confident_faces(faces)]
+
+def detect_faces(image_np, color="RGB"):
+    """
+    Detects faces in an RGB (or BGR) NumPy image with the configured detector (MTCNN by default)
+    and returns the boxes of the confident ones.
+    """
+    return confident_face_boxes(model_registry.get("detector").detect_faces(image_np, color))
+
+def crop_faces(image_np, face_boxes, color="RGB"):
+    """
+    Crops every (x, y, w, h) box out of image_np and resizes it to the 160x160 FaceNet input.
+    Crops of a BGR image are converted to RGB one by one, so the full frame is never converted.
+    """
+    face_crops = []
+    for x, y, w, h in face_boxes:
+        # Crop the face region
+        face_crop = image_np[y:y+h, x:x+w]
+        # Resize the cropped face to 160x160
+        face_crop = cv.resize(face_crop, (160, 160))
+        if color == "BGR":
+            face_crop = cv.cvtColor(face_crop, cv.COLOR_BGR2RGB)
+        face_crops.append(face_crop)
+    return face_crops
+
+def gate_faces(face_crops, face_boxes, keypoints=None):
+    """
+    Runs the quality gate (face_quality.py) on the crops of one frame. Returns (kept_crops, labels):
+    labels holds "Low quality: <reason>" for every rejected face and None for the kept ones,
+    to be filled in with fill_labels once the kept crops are classified.
+    """
+    reasons = face_quality.gate(face_crops, face_boxes, keypoints)
+    kept_crops = [crop for crop, reason in zip(face_crops, reasons) if reason is None]
+    return kept_crops, [face_quality.rejected_label(reason) if reason else None for reason in reasons]
+
+def fill_labels(labels, predicted_labels, predicted_scores):
     """
-    global last_predictions  # Make the variable accessible
+    Replaces the None entries of gate_faces' labels with the predictions of the kept faces, in order.
+    Returns (labels, scores); rejected faces score 0.0.
+    """
+    predicted_labels, predicted_scores = iter(predicted_labels), iter(predicted_scores)
+    scores = [float(next(predicted_scores)) if label is None else 0.0 for label in labels]
+    return [next(predicted_labels) if label is None else label for label in labels], scores
+
+def classify_faces(image_np, face_boxes, timings=None, color="RGB", keypoints=None):
+    """
+    Crops and resizes every box of face_boxes to 160x160, embeds all faces that pass the quality
+    gate in one batch, and uses the classifier model to predict the identities. Returns (labels,
+    scores) with one entry per box. Stage durations are added to `timings` when a dict is given.
+    keypoints (the detector's, one dict per box) enable the gate's pose check.
+    """
+    if not face_boxes:
+        return [], []
+    timings = {} if timings is None else timings
     
-    # Convert PIL image to a NumPy array (RGB format)
-    image_np = np.array(pil_image)
+    start = time.perf_counter()
+    face_crops = crop_faces(image_np, face_boxes, color)
+    timings["crop"] = time.perf_counter() - start
     
-    # If the image is not in RGB (e.g. grayscale), convert it
-    if image_np.ndim == 2 or (image_np.ndim == 3 and image_np.shape[2] != 3):
-        image_np = cv.cvtColor(image_np, cv.COLOR_GRAY2RGB)
+    # Faces too small, blurred, badly lit or turned away are not worth a FaceNet pass
+    if face_quality.enabled:
+        start = time.perf_counter()
+        face_crops, labels = gate_faces(face_crops, face_boxes, keypoints)
+        timings["quality"] = time.perf_counter() - start
+    else:
+        labels = [None] * len(face_crops)
+    if not face_crops:
+        return fill_labels(labels, [], [])
     
-    # Detect faces in the image
-    faces = detector.detect_faces(image_np)
+    # Embed every face of the frame in one batched FaceNet call, in detection order
+    start = time.perf_counter()
+    test_embeddings = get_embeddings(face_crops)
+    timings["embed"] = time.perf_counter() - start
     
-    if len(faces) == 0:
-        last_predictions = ["No face detected"]
-        return "No face detected"
+    start = time.perf_counter()
+    final_predictions, scores = classify_embeddings(test_embeddings)
+    timings["classify"] = time.perf_counter() - start
+    return fill_labels(labels, final_predictions, scores)
+
+def classify_embeddings(test_embeddings):
+    """
+    Predicts one identity name per embedding with the configured recognizer.
+    Returns (labels, scores): the SVC score is the class probability, the gallery and ANN
+    scores are cosine similarities. Faces scoring below the recognizer's threshold are labelled "Unknown".
+    """
+    if RECOGNIZER == "gallery":
+        return model_registry.get("gallery").search(test_embeddings)
+    if RECOGNIZER == "ann":
+        return model_registry.get("ann_index").search(test_embeddings)
     
-    test_embeddings = []
     final_predictions = []
-    face_boxes=[]
     threshold = 0.80  # Define threshold for classification confidence
-
-    # Loop over detected faces
-    for face in faces:
-        if face['confidence'] > 0.95:
-            x, y, w, h = face['box']
-            x, y = abs(x), abs(y)  # Ensure positive coordinates
-            face_boxes.append((x,y,w,h))
-            # Crop the face region
-            face_crop = image_np[y:y+h, x:x+w]
-            # Resize the cropped face to 160x160
-            face_resized = cv.resize(face_crop, (160, 160))
-            # Get the embedding for the face
-            embedding = get_embedding(face_resized)
-            test_embeddings.append(embedding)
-    
-    # If no face met the confidence threshold
-    if not test_embeddings:
-        last_predictions = ["No high-confidence face detected"]
-        return "No high-confidence face detected"
     
-    # Convert list of embeddings to a NumPy array
-    test_embeddings = np.array(test_embeddings)
-    
-    # Get prediction probabilities and predicted labels from the classifier
+    # Get prediction probabilities from the classifier; the predicted label is the most
+    # probable class, so the kernel is evaluated once instead of again in model.predict
+    model = model_registry.get("model")
     predictions_proba = model.predict_proba(test_embeddings)
-    print(predictions_proba)
-    predictions = model.predict(test_embeddings)
-    print(predictions)
+    predictions = model.classes_[np.argmax(predictions_proba, axis=1)]
     
     # Apply threshold logic for each face
     for i, probs in enumerate(predictions_proba):
@@ -131,17 +217,67 @@ def predict_person(pil_image):
         else:
             # print(y_train[predictions[i]])
             final_predictions.append(predictions[i])  # Use the label from the embeddings
-    print(final_predictions)
-    final_predictions=inverse_transform(final_predictions)
+    return inverse_transform(final_predictions), np.max(predictions_proba, axis=1)
+
+def recognize_faces(image_np, color="RGB"):
+    """
+    Runs face detection and classify_faces on an RGB NumPy image (or a BGR one with
+    color="BGR", e.g. a camera frame) and returns a RecognitionResult.
+    """
+    result = RecognitionResult()
     
-    # Store the predictions for access by the video processor
-    last_predictions = final_predictions
+    # Detect faces in the image
+    start = time.perf_counter()
+    faces = model_registry.get("detector").detect_faces(image_np, color)
+    face_boxes = confident_face_boxes(faces)
+    result.timings["detect"] = time.perf_counter() - start
     
-    # Draw bounding boxes and labels on the image
-    for (x, y, w, h), label in zip(face_boxes, final_predictions):
+    if len(faces) == 0:
+        result.message = "No face detected"
+    elif not face_boxes:
+        # No face met the confidence threshold
+        result.message = "No high-confidence face detected"
+    else:
+        result.boxes = face_boxes
+        result.labels, result.scores = classify_faces(image_np, face_boxes, result.timings, color,
+                                                      keypoints=face_keypoints(faces))
+    return result
+
+def draw_predictions(image_np, face_boxes, labels):
+    """
+    Draws a bounding box and label for every recognized face onto image_np, in place.
+    """
+    for (x, y, w, h), label in zip(face_boxes, labels):
         cv.rectangle(image_np, (x, y), (x+w, y+h), (0, 255, 0), 2)
         cv.putText(image_np, label, (x, y-10), cv.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-    
-    annotated_image = Image.fromarray(image_np)
-    return annotated_image
+    return image_np
 
+def predict_frame(image_np, color="BGR"):
+    """
+    ndarray-native entry point: recognizes the faces of a BGR (or RGB) frame and, when faces
+    were recognized, draws the boxes and names onto that same array. Only the face crops
+    are color-converted; the frame itself is never copied. Returns the RecognitionResult.
+    """
+    result = recognize_faces(image_np, color)
+    if result.message is None:
+        # Draw bounding boxes and labels on the image
+        start = time.perf_counter()
+        draw_predictions(image_np, result.boxes, result.labels)
+        result.timings["draw"] = time.perf_counter() - start
+    metrics.record_result(result)
+    return result
+
+def predict_person(pil_image):
+    """
+    Accepts a PIL image and runs predict_frame on it. Returns the RecognitionResult, whose
+    image is the input annotated with bounding boxes and predicted names when faces were recognized.
+    """
+    # One writable RGB copy of the image; grayscale or RGBA images are converted by PIL first
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+    image_np = np.array(pil_image)
+    
+    result = predict_frame(image_np, color="RGB")
+    if result.message is None:
+        result.image = Image.fromarray(image_np)
+    return result
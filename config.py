@@ -0,0 +1,154 @@
+import os
+from dotenv import load_dotenv
+
+# ----------------------------
+# Runtime Settings
+# ----------------------------
+# Every setting can be overridden from the environment or the .env file,
+# the same way app.py reads API_KEY.
+load_dotenv()
+
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _float_env(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Trained classifier and the embeddings it was trained on (an .npz, or a
+# memory-mapped gallery directory made with mmap_gallery.py)
+MODEL_PATH = os.getenv("MODEL_PATH", "best_model.pkl")
+EMBEDDING_FILE = os.getenv("EMBEDDING_FILE", "face_embeddig_for_12_class.npz")
+
+# Maximum number of face crops sent to FaceNet in one forward pass.
+# 0 means "all faces of the frame in a single pass".
+EMBED_BATCH_SIZE = _int_env("EMBED_BATCH_SIZE", 32)
+
+# FaceNet runtime (see face_embedders.py): "keras" for keras_facenet's TensorFlow model,
+# "onnx" for the exported model in EMBEDDER_MODEL_PATH run by ONNX Runtime (the int8
+# model written by export_facenet.py works the same way), with EMBEDDER_THREADS
+# intra-op threads (0 = runtime default).
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", "keras").lower()
+EMBEDDER_MODEL_PATH = os.getenv("EMBEDDER_MODEL_PATH", "facenet.onnx")
+EMBEDDER_THREADS = _int_env("EMBEDDER_THREADS", 0)
+
+# Live video inference mode for FaceDetectionTransformer: "sync" runs recognition
+# inside every frame callback, "async" hands frames to a background worker and
+# draws the last known boxes on the current frame.
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "async").lower()
+
+# In async mode, only every N-th frame is offered to the inference worker.
+INFERENCE_EVERY_N_FRAMES = max(1, _int_env("INFERENCE_EVERY_N_FRAMES", 1))
+
+# In async mode, upper bound on recognitions per second (0 = as fast as possible).
+INFERENCE_TARGET_FPS = _int_env("INFERENCE_TARGET_FPS", 5)
+
+# Track-then-recognize: run full MTCNN detection only every N frames (or as soon
+# as a track is lost) and follow faces with template matching in between.
+TRACKING_ENABLED = os.getenv("TRACKING_ENABLED", "true").lower() in ("1", "true", "yes")
+DETECT_EVERY_N_FRAMES = max(1, _int_env("DETECT_EVERY_N_FRAMES", 10))
+
+# A tracked face keeps its cached identity and is only re-embedded this often.
+TRACK_REVERIFY_FRAMES = max(1, _int_env("TRACK_REVERIFY_FRAMES", 90))
+
+# Identity recognizer used after FaceNet: "svc" for best_model.pkl, "gallery" for
+# cosine-similarity nearest neighbour search over the stored embeddings, "ann" for
+# the approximate index in ann_index.py.
+RECOGNIZER = os.getenv("RECOGNIZER", "svc").lower()
+
+# Gallery rows: "centroid" (one mean vector per identity) or "exemplar" (every embedding).
+GALLERY_MODE = os.getenv("GALLERY_MODE", "centroid").lower()
+
+# Faces whose best cosine similarity is below this value are reported as "Unknown".
+GALLERY_THRESHOLD = _float_env("GALLERY_THRESHOLD", 0.5)
+
+# In-memory precision of the gallery rows: "float32", "int16" (half the memory) or
+# "int8" (a quarter); both integer types add one float32 scale per row. "float16"
+# is accepted as an alias of int16.
+GALLERY_DTYPE = os.getenv("GALLERY_DTYPE", "float32").lower()
+
+# Approximate nearest-neighbour index, used when RECOGNIZER=ann. The index is loaded
+# (memory-mapped) from the ANN_INDEX_PATH directory if it exists, otherwise built
+# from the gallery and saved there. An .npz index of an older version still loads.
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", "ann_index")
+# Number of inverted lists (0 = about sqrt(gallery rows)) and lists searched per query.
+ANN_N_LISTS = _int_env("ANN_N_LISTS", 0)
+ANN_N_PROBE = _int_env("ANN_N_PROBE", 8)
+
+# Face detector backend ("mtcnn", "haar" or "yunet", see face_detectors.py) and the
+# factor frames are downscaled by before detection (1.0 = full resolution).
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "mtcnn").lower()
+DETECTOR_SCALE = _float_env("DETECTOR_SCALE", 1.0)
+YUNET_MODEL_PATH = os.getenv("YUNET_MODEL_PATH", "face_detection_yunet_2023mar.onnx")
+
+# Run face detection in this many worker processes (0 = in the calling process),
+# each limited to DETECTOR_THREADS_PER_PROCESS TensorFlow threads (0 = TF default).
+DETECTOR_PROCESSES = _int_env("DETECTOR_PROCESSES", 0)
+DETECTOR_THREADS_PER_PROCESS = _int_env("DETECTOR_THREADS_PER_PROCESS", 1)
+
+# Local write-ahead queue for attendance records (see attendance_queue.py): SQLite
+# file, records per Firestore batch, seconds between flushes and the retry backoff cap.
+ATTENDANCE_QUEUE_PATH = os.getenv("ATTENDANCE_QUEUE_PATH", "attendance_queue.sqlite3")
+ATTENDANCE_BATCH_SIZE = _int_env("ATTENDANCE_BATCH_SIZE", 200)
+ATTENDANCE_FLUSH_INTERVAL = _float_env("ATTENDANCE_FLUSH_INTERVAL", 1.0)
+ATTENDANCE_MAX_BACKOFF = _float_env("ATTENDANCE_MAX_BACKOFF", 60.0)
+
+# Attendance history: seconds a user's cached records are served before checking
+# Firestore for newer ones, the timezone they are displayed in and how many users'
+# histories are kept (least recently viewed ones are dropped first).
+HISTORY_TTL = _float_env("HISTORY_TTL", 60.0)
+HISTORY_TIMEZONE = os.getenv("HISTORY_TIMEZONE", "Asia/Kolkata")
+HISTORY_CACHE_USERS = _int_env("HISTORY_CACHE_USERS", 1000)
+
+# Content-addressed profile image store (see image_store.py): directory, thumbnail
+# edge length in pixels and number of data URIs kept in the in-process LRU cache.
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "profile_images")
+IMAGE_THUMB_SIZE = _int_env("IMAGE_THUMB_SIZE", 160)
+IMAGE_CACHE_ENTRIES = _int_env("IMAGE_CACHE_ENTRIES", 512)
+
+# Versioned gallery written by online enrollment (see gallery_store.py).
+GALLERY_DIR = os.getenv("GALLERY_DIR", "gallery")
+
+# Pipeline metrics (see metrics.py). When enabled, stage latencies and counters are
+# served as Prometheus text on 127.0.0.1:METRICS_PORT/metrics (0 = no endpoint) and,
+# if METRICS_LOG_PATH is set, appended there as one JSON line every METRICS_LOG_INTERVAL
+# seconds. Percentiles are computed over the last METRICS_WINDOW samples of each stage.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+METRICS_PORT = _int_env("METRICS_PORT", 9108)
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "")
+METRICS_LOG_INTERVAL = _float_env("METRICS_LOG_INTERVAL", 10.0)
+METRICS_WINDOW = _int_env("METRICS_WINDOW", 2048)
+
+# Bulk attendance from a group photo or lecture recording (see bulk_attendance.py):
+# frames sampled per second of video, frames a student must be recognized in to be
+# marked present, detection threads, and the accounts allowed to use the bulk mode
+# in the app (comma separated emails).
+BULK_SAMPLE_FPS = _float_env("BULK_SAMPLE_FPS", 0.5)
+BULK_MIN_FRAMES = max(1, _int_env("BULK_MIN_FRAMES", 2))
+BULK_WORKERS = max(1, _int_env("BULK_WORKERS", 4))
+INSTRUCTOR_EMAILS = {email.strip().lower() for email in os.getenv("INSTRUCTOR_EMAILS", "").split(",") if email.strip()}
+
+# Attendance is unique per student and lecture slot (see attendance_slots.py): the
+# day is divided into slots of LECTURE_SLOT_MINUTES starting at local midnight in
+# LECTURE_TIMEZONE, and RECENT_MARKS_MAX keys of recent submissions are remembered
+# in-process to short-circuit repeated clicks.
+LECTURE_SLOT_MINUTES = max(1, _int_env("LECTURE_SLOT_MINUTES", 60))
+LECTURE_TIMEZONE = os.getenv("LECTURE_TIMEZONE", HISTORY_TIMEZONE)
+RECENT_MARKS_MAX = _int_env("RECENT_MARKS_MAX", 10000)
+
+# Face quality gate before embedding (see face_quality.py). Faces whose shorter box
+# side is below QUALITY_MIN_FACE_SIZE pixels, whose Laplacian variance is below
+# QUALITY_MIN_SHARPNESS, whose mean brightness (0-255) is outside
+# QUALITY_MIN_BRIGHTNESS..QUALITY_MAX_BRIGHTNESS or whose nose is more than
+# QUALITY_MAX_YAW inter-eye distances off-centre are reported as low quality
+# instead of being sent to FaceNet.
+QUALITY_GATE_ENABLED = os.getenv("QUALITY_GATE_ENABLED", "false").lower() in ("1", "true", "yes")
+QUALITY_MIN_FACE_SIZE = _int_env("QUALITY_MIN_FACE_SIZE", 40)
+QUALITY_MIN_SHARPNESS = _float_env("QUALITY_MIN_SHARPNESS", 20.0)
+QUALITY_MIN_BRIGHTNESS = _float_env("QUALITY_MIN_BRIGHTNESS", 40.0)
+QUALITY_MAX_BRIGHTNESS = _float_env("QUALITY_MAX_BRIGHTNESS", 220.0)
+QUALITY_MAX_YAW = _float_env("QUALITY_MAX_YAW", 0.4)
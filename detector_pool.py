@@ -0,0 +1,135 @@
+import os
+import queue
+import threading
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from config import DETECTOR_PROCESSES, DETECTOR_THREADS_PER_PROCESS, DETECTOR_BACKEND, DETECTOR_SCALE
+
+# ----------------------------
+# Process Pool for Face Detection
+# ----------------------------
+# MTCNN is CPU bound and a single Python process cannot keep a many-core server
+# busy. DetectorPool runs detection in worker processes, each holding its own warm
+# detector (the configured face_detectors.py backend). Frames are not pickled: the
+# parent copies each frame once into a shared memory slot and only sends the slot
+# name, shape and dtype; the worker wraps the same memory in an ndarray and returns
+# the small detection dicts. Workers keep one attachment per slot and close it when
+# the parent replaces the slot's segment with a larger one.
+
+# Worker process state
+_detector = None
+_attached = {}  # slot index -> SharedMemory
+
+
+def _init_worker(threads, backend, scale, ready=None):
+    global _detector
+    if threads > 0:
+        # Must be set before TensorFlow is imported by MTCNN
+        os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+        os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import cv2 as cv
+    if threads > 0:
+        cv.setNumThreads(threads)
+    if backend == "mtcnn":
+        import tensorflow as tf
+        if threads > 0:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+    from face_detectors import create_detector
+    _detector = create_detector(backend, scale)
+    if ready is not None:
+        ready.release()  # Counted by DetectorPool.warm_up
+
+
+def _detect_shared(slot, slot_name, shape, dtype, color):
+    shm = _attached.get(slot)
+    if shm is None or shm.name != slot_name:
+        if shm is not None:
+            shm.close()  # The slot was reallocated; drop the old segment's mapping
+        shm = _attached[slot] = shared_memory.SharedMemory(name=slot_name)
+    image_np = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return _detector.detect_faces(image_np, color)
+
+
+def _warm(_):
+    return os.getpid()
+
+
+class DetectorPool:
+    """
+    Face detection on `workers` processes with the same detect_faces(image_np, color) contract as the detectors.
+    Up to `slots` frames can be in flight at once; detect_faces may be called from many threads.
+    """
+    thread_safe = True
+
+    def __init__(self, workers=DETECTOR_PROCESSES, threads_per_worker=DETECTOR_THREADS_PER_PROCESS,
+                 backend=DETECTOR_BACKEND, scale=DETECTOR_SCALE, slots=None):
+        self.workers = max(1, workers)
+        context = mp.get_context("spawn")
+        self._ready = context.Semaphore(0)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                             initargs=(threads_per_worker, backend, scale, self._ready))
+        self._slots = [None] * (slots or 2 * self.workers)
+        self._free = queue.Queue()
+        for index in range(len(self._slots)):
+            self._free.put(index)
+        self._lock = threading.Lock()
+
+    def warm_up(self, timeout=300):
+        """Starts every worker process and waits until each has built its detector."""
+        # While no worker is idle, every submit starts another process
+        futures = [self._executor.submit(_warm, i) for i in range(self.workers)]
+        deadline = time.monotonic() + timeout
+        started = 0
+        while started < self.workers:
+            if self._ready.acquire(timeout=1):
+                started += 1
+                continue
+            for future in futures:
+                if future.done():
+                    future.result()  # A worker whose detector failed to load breaks the pool; raise its error
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Detector workers did not start within {timeout} s")
+        for future in futures:
+            future.result()
+
+    def _slot_for(self, index, nbytes):
+        with self._lock:
+            shm = self._slots[index]
+            if shm is None or shm.size < nbytes:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+                shm = self._slots[index] = shared_memory.SharedMemory(create=True, size=nbytes)
+            return shm
+
+    def submit(self, image_np, color="RGB"):
+        """Copies the frame into a free shared memory slot and returns a Future of its detections."""
+        image_np = np.ascontiguousarray(image_np)
+        index = self._free.get()
+        try:
+            shm = self._slot_for(index, image_np.nbytes)
+            np.ndarray(image_np.shape, dtype=image_np.dtype, buffer=shm.buf)[...] = image_np
+            future = self._executor.submit(_detect_shared, index, shm.name, image_np.shape, image_np.dtype.str, color)
+        except Exception:
+            self._free.put(index)
+            raise
+        future.add_done_callback(lambda _: self._free.put(index))
+        return future
+
+    def detect_faces(self, image_np, color="RGB"):
+        return self.submit(image_np, color).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for shm in self._slots:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._slots = []
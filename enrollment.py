@@ -0,0 +1,219 @@
+import argparse
+import threading
+import cv2 as cv
+import numpy as np
+
+import mmap_gallery
+import model_registry
+from classifier_model_for_testing import get_embeddings
+from config import ANN_INDEX_PATH, RECOGNIZER
+from gallery_store import GalleryStore
+
+# ----------------------------
+# Online Enrollment
+# ----------------------------
+# New students become recognizable without re-running Embedding_Training.ipynb:
+# their uploaded photos go through the same padding + face crop + augmentation
+# steps as Extraction_Augmentation.ipynb, are embedded with FaceNet in one batch,
+# and are appended to a versioned gallery on disk. The in-memory gallery (and
+# the ANN index, if loaded) is then rebuilt and swapped in the model registry in
+# one assignment, so frames being recognized concurrently see either the old or
+# the new gallery, never a half-updated one.
+#
+# Only the "gallery" and "ann" recognizers pick up enrollments; best_model.pkl
+# still needs the offline retrain. The swap applies to the process doing the
+# enrollment (the Streamlit app when a student registers). Changes made by other
+# processes, like the command line below, are picked up by reload_if_changed(),
+# which the app calls on every rerun: it only reads the small CURRENT file unless
+# the version changed.
+
+# Augmentation parameters, as in Extraction_Augmentation.ipynb
+resize_dim = (160, 160)
+h_shift = 20
+v_shift = 20
+brightness_alpha = 1.2
+brightness_beta = 30
+darkness_alpha = 0.7
+darkness_beta = -30
+blur_ksize = (7, 7)
+padding = 20  # padding in pixels
+
+
+def augment_face(face):
+    """
+    Returns the resized face followed by its horizontal shift, vertical shift, brightened,
+    darkened, blurred and flipped variants.
+    """
+    # 1. Horizontal Shift with Black Padding.
+    h_shifted = np.roll(face, h_shift, axis=1)
+    if h_shift > 0:
+        h_shifted[:, :h_shift] = 0
+    else:
+        h_shifted[:, h_shift:] = 0
+
+    # 2. Vertical Shift with Black Padding.
+    v_shifted = np.roll(face, v_shift, axis=0)
+    if v_shift > 0:
+        v_shifted[:v_shift, :] = 0
+    else:
+        v_shifted[v_shift:, :] = 0
+
+    # 3. Brightness Adjustment.
+    bright = cv.convertScaleAbs(face, alpha=brightness_alpha, beta=brightness_beta)
+
+    # 4. Darkness Adjustment.
+    dark = cv.convertScaleAbs(face, alpha=darkness_alpha, beta=darkness_beta)
+
+    # 5. Blurring.
+    blur = cv.GaussianBlur(face, blur_ksize, 0)
+
+    # 6. Flipping (Horizontal).
+    flip = cv.flip(face, 1)
+
+    return [face, h_shifted, v_shifted, bright, dark, blur, flip]
+
+
+def extract_face(image_np, detector=None):
+    """
+    Pads an RGB image, detects faces and returns the most confident one resized to 160x160,
+    or None if no face was found.
+    """
+    detector = detector or model_registry.get("detector")
+    padded = cv.copyMakeBorder(image_np, padding, padding, padding, padding, cv.BORDER_CONSTANT, value=[0, 0, 0])
+    detections = detector.detect_faces(padded)
+    if len(detections) == 0:
+        return None
+    detection = max(detections, key=lambda face: face['confidence'])
+    x, y, w, h = detection['box']
+    # Ensure coordinates are positive.
+    x, y = max(0, x), max(0, y)
+    face = padded[y:y+h, x:x+w]
+    if face.size == 0:
+        return None
+    return cv.resize(face, resize_dim)
+
+
+_write_lock = threading.Lock()
+
+
+def _activate(store, embeddings, labels, changed):
+    """Commits a new gallery version and hot-swaps the in-memory recognizers. `changed` names the students edited."""
+    version = store.commit(embeddings, labels)
+    _swap(store, version, changed)
+    if RECOGNIZER == "svc":
+        print("Note: RECOGNIZER=svc, enrolled students are only recognized with the gallery or ann recognizer.")
+    return version
+
+
+def _swap(store, version, changed=None):
+    """
+    Replaces the in-memory embeddings, gallery and (if loaded) ANN index with a committed gallery
+    version. The embeddings are reopened memory-mapped from the store rather than kept from the
+    arrays that were written, so the gallery keeps sharing the version's pages. Only the rows of
+    the `changed` names are updated in the ANN index; with changed=None it is rebuilt.
+    """
+    from gallery_index import GalleryIndex
+    from ann_index import IVFIndex
+    embeddings, labels = store.load()
+    model_registry.replace("embeddings", (embeddings, labels))
+    model_registry.versions["embeddings"] = version
+    gallery = GalleryIndex.from_embeddings(embeddings, labels)
+    model_registry.replace("gallery", gallery)
+    if model_registry.is_loaded("ann_index"):
+        old_index = model_registry.get("ann_index")
+        if changed is None:
+            # Keep the trained clusters; only the rows are reassigned
+            ann_index = IVFIndex(old_index.centroids, gallery.float_vectors(), gallery.labels, old_index.n_probe,
+                                 gallery.threshold)
+        else:
+            # Searches continue on the old index while the copy drops and re-adds the changed students
+            ann_index = old_index.copy()
+            for name in changed:
+                ann_index.remove(name)
+            ann_index.add(*gallery.rows_of(changed))
+        ann_index.save(ANN_INDEX_PATH)
+        model_registry.replace("ann_index", IVFIndex.load(ANN_INDEX_PATH, ann_index.n_probe, ann_index.threshold))
+    else:
+        # The saved index no longer matches the gallery; it is rebuilt on next load
+        mmap_gallery.remove(ANN_INDEX_PATH)
+
+
+def _changed_names(old_labels, new_labels):
+    """Names whose number of rows differs between two versions; every enrollment or removal changes it."""
+    old = set(zip(*np.unique(np.asarray(old_labels).astype(str), return_counts=True)))
+    new = set(zip(*np.unique(np.asarray(new_labels).astype(str), return_counts=True)))
+    return {str(name) for name, _ in old ^ new}
+
+
+def reload_if_changed(store=None):
+    """
+    Swaps in the active gallery version if another process committed a newer one since this
+    process loaded the gallery. Returns True if it reloaded.
+    """
+    if not model_registry.is_loaded("embeddings"):
+        return False  # Not loaded yet; the first load reads the active version
+    store = store or GalleryStore()
+    if store.current_version() == model_registry.versions.get("embeddings"):
+        return False
+    with _write_lock, store.locked():
+        version = store.current_version()
+        if version == model_registry.versions.get("embeddings"):
+            return False
+        _, old_labels = model_registry.get("embeddings")
+        _swap(store, version, _changed_names(old_labels, store.load()[1]))
+    print(f"Loaded gallery {version} committed by another process")
+    return True
+
+
+def enroll_student(name, images, store=None, augment=True):
+    """
+    Adds a student from one or more RGB images (NumPy arrays). Returns (version, faces_used);
+    raises ValueError if no face was found in any image.
+    """
+    store = store or GalleryStore()
+    faces = [face for face in (extract_face(image) for image in images) if face is not None]
+    if not faces:
+        raise ValueError(f"No face found in the images of {name}")
+    crops = [variant for face in faces for variant in (augment_face(face) if augment else [face])]
+    new_embeddings = get_embeddings(crops)
+    with _write_lock, store.locked():
+        embeddings, labels = store.load()
+        embeddings = np.concatenate([embeddings, new_embeddings])
+        labels = np.concatenate([labels, np.full(len(new_embeddings), name, dtype=object)]).astype(str)
+        version = _activate(store, embeddings, labels, {name})
+    print(f"Enrolled {name}: {len(new_embeddings)} embeddings from {len(faces)} face(s), gallery {version}")
+    return version, len(faces)
+
+
+def remove_student(name, store=None):
+    """Removes every embedding of a student. Returns the new version, or None if the name was not enrolled."""
+    store = store or GalleryStore()
+    with _write_lock, store.locked():
+        embeddings, labels = store.load()
+        keep = labels != name
+        if keep.all():
+            return None
+        version = _activate(store, embeddings[keep], labels[keep], {name})
+    print(f"Removed {name}, gallery {version}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll or remove students in the recognition gallery.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_parser = subparsers.add_parser("add", help="Enroll a student from image files.")
+    add_parser.add_argument("name", help="Full name, as used for attendance (first middle last).")
+    add_parser.add_argument("images", nargs="+")
+    remove_parser = subparsers.add_parser("remove", help="Remove a student.")
+    remove_parser.add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        images = [cv.cvtColor(cv.imread(path), cv.COLOR_BGR2RGB) for path in args.images]
+        enroll_student(args.name, images)
+    elif remove_student(args.name) is None:
+        print(f"{args.name} is not enrolled")
+
+
+if __name__ == "__main__":
+    main()
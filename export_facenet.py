@@ -0,0 +1,108 @@
+import argparse
+import os
+import tempfile
+import cv2 as cv
+import numpy as np
+
+from face_embedders import FACENET_INPUT_SIZE, standardize
+
+# ----------------------------
+# FaceNet ONNX Export and int8 Quantization
+# ----------------------------
+# Writes keras_facenet's FaceNet network as an ONNX model for the "onnx" embedder
+# backend (face_embedders.py) and optionally an int8 copy of it, both generated
+# locally from the weights keras_facenet already downloaded:
+#
+#   python export_facenet.py facenet.onnx
+#   python export_facenet.py facenet.onnx --int8 facenet.int8.onnx --calibration dataset/
+#
+# With --calibration (a folder of face images, e.g. the dataset/<Student Name>/
+# training folders) the int8 model is quantized statically: weights and
+# activations are int8, with activation ranges measured on those faces. Without
+# it only the weights are quantized (dynamic quantization), which needs no data
+# but leaves most of the convolution work in float. Check the result with
+# benchmark_embedders.py before switching EMBEDDER_MODEL_PATH to it.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_face_crops(folder, limit=None):
+    """
+    Detects the first confident face of every image under `folder` and returns (crops, labels):
+    a (N, 160, 160, 3) uint8 RGB array and each image's sub-folder name (the student's name).
+    """
+    from classifier_model_for_testing import crop_faces, detect_faces
+    paths = [os.path.join(directory, name) for directory, _, files in sorted(os.walk(folder))
+             for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS)]
+    crops, labels = [], []
+    for path in paths:
+        if limit is not None and len(crops) >= limit:
+            break
+        image = cv.imread(path)
+        boxes = detect_faces(image, color="BGR") if image is not None else []
+        if boxes:
+            crops.extend(crop_faces(image, boxes[:1], color="BGR"))
+            labels.append(os.path.basename(os.path.dirname(path)))
+    return np.asarray(crops, dtype=np.uint8).reshape(-1, FACENET_INPUT_SIZE, FACENET_INPUT_SIZE, 3), labels
+
+
+def export_onnx(path, opset=13):
+    """Converts keras_facenet's Keras model to ONNX with a dynamic batch dimension."""
+    import tensorflow as tf
+    import tf2onnx
+    from keras_facenet import FaceNet
+    signature = (tf.TensorSpec((None, FACENET_INPUT_SIZE, FACENET_INPUT_SIZE, 3), tf.float32, name="faces"),)
+    tf2onnx.convert.from_keras(FaceNet().model, input_signature=signature, opset=opset, output_path=path)
+
+
+class _CalibrationReader:
+    """Feeds standardized calibration faces to the ONNX Runtime quantizer, batch_size at a time."""
+
+    def __init__(self, input_name, faces, batch_size=16):
+        self.batches = iter([{input_name: standardize(faces[start:start + batch_size])}
+                             for start in range(0, len(faces), batch_size)])
+
+    def get_next(self):
+        return next(self.batches, None)
+
+
+def quantize_onnx(path, int8_path, calibration_faces=None):
+    """Writes an int8 copy of the ONNX model at `path`: static with calibration faces, else dynamic."""
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    if calibration_faces is None or len(calibration_faces) == 0:
+        quantize_dynamic(path, int8_path, weight_type=QuantType.QInt8)
+        return
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    input_name = ort.InferenceSession(path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(path, prepared)  # Shape inference and graph cleanup the quantizer expects
+        quantize_static(prepared, int8_path, _CalibrationReader(input_name, calibration_faces),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export FaceNet to ONNX and optionally quantize it to int8.")
+    parser.add_argument("out", help="Output ONNX model, e.g. facenet.onnx.")
+    parser.add_argument("--int8", help="Also write an int8-quantized model to this path.")
+    parser.add_argument("--calibration", help="Folder of face images for static int8 quantization.")
+    parser.add_argument("--calibration-faces", type=int, default=200, help="Faces used for calibration.")
+    parser.add_argument("--opset", type=int, default=13)
+    args = parser.parse_args()
+
+    export_onnx(args.out, args.opset)
+    print(f"Wrote {args.out} ({os.path.getsize(args.out) / 1024 ** 2:.1f} MB)")
+    if args.int8:
+        faces = None
+        if args.calibration:
+            faces, _ = load_face_crops(args.calibration, args.calibration_faces)
+            print(f"Calibrating on {len(faces)} faces")
+        quantize_onnx(args.out, args.int8, faces)
+        print(f"Wrote {args.int8} ({os.path.getsize(args.int8) / 1024 ** 2:.1f} MB, "
+              f"{'static' if faces is not None and len(faces) else 'dynamic'} quantization)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import cv2 as cv
+
+from config import DETECTOR_BACKEND, DETECTOR_SCALE, YUNET_MODEL_PATH
+
+# ----------------------------
+# Pluggable Face Detectors
+# ----------------------------
+# Every backend exposes detect_faces(image_np, color="RGB") and returns MTCNN's
+# output format: a list of {'box': [x, y, w, h], 'confidence': float, 'keypoints': {...}}
+# in full-resolution coordinates. `scale` < 1 runs the backend on a downscaled copy
+# of the frame, which is much faster on 720p/1080p input. Frames may be given in
+# RGB or BGR order; each backend converts (after downscaling) only if it needs the
+# other order, so a BGR camera frame reaches YuNet and Haar without any conversion.
+#
+#   mtcnn - the original three-stage cascade (default)
+#   haar  - OpenCV's frontal-face Haar cascade, shipped with opencv-python
+#   yunet - OpenCV's DNN YuNet detector, needs the face_detection_yunet .onnx file locally
+
+
+class FaceDetector:
+    name = None
+    thread_safe = False  # Instances keep per-call state, so each thread needs its own
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+
+    def detect_faces(self, image_np, color="RGB"):
+        if self.scale == 1.0:
+            return self._detect(image_np, color)
+        height, width = image_np.shape[:2]
+        small = cv.resize(image_np, (max(1, int(width * self.scale)), max(1, int(height * self.scale))),
+                          interpolation=cv.INTER_AREA)
+        faces = self._detect(small, color)
+        factor = 1.0 / self.scale
+        for face in faces:
+            face['box'] = [int(round(v * factor)) for v in face['box']]
+            face['keypoints'] = {name: (int(round(x * factor)), int(round(y * factor)))
+                                 for name, (x, y) in face.get('keypoints', {}).items()}
+        return faces
+
+    def _detect(self, image_np, color):
+        raise NotImplementedError
+
+
+class MTCNNDetector(FaceDetector):
+    name = "mtcnn"
+
+    def __init__(self, scale=1.0):
+        super().__init__(scale)
+        from mtcnn.mtcnn import MTCNN
+        self.mtcnn = MTCNN()
+
+    def _detect(self, image_np, color):
+        if color == "BGR":
+            image_np = cv.cvtColor(image_np, cv.COLOR_BGR2RGB)
+        return self.mtcnn.detect_faces(image_np)
+
+
+class HaarCascadeDetector(FaceDetector):
+    """
+    Haar cascades do not produce a score; min_neighbors is the strictness knob and every
+    returned face gets confidence 1.0 so it passes the usual confidence filter.
+    """
+    name = "haar"
+
+    def __init__(self, scale=1.0, min_neighbors=5, min_size=40):
+        super().__init__(scale)
+        self.cascade = cv.CascadeClassifier(os.path.join(cv.data.haarcascades, "haarcascade_frontalface_default.xml"))
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def _detect(self, image_np, color):
+        gray = cv.equalizeHist(cv.cvtColor(image_np, cv.COLOR_BGR2GRAY if color == "BGR" else cv.COLOR_RGB2GRAY))
+        min_size = max(1, int(self.min_size * self.scale))
+        boxes = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=self.min_neighbors,
+                                              minSize=(min_size, min_size))
+        return [{'box': [int(x), int(y), int(w), int(h)], 'confidence': 1.0, 'keypoints': {}}
+                for x, y, w, h in boxes]
+
+
+class YuNetDetector(FaceDetector):
+    name = "yunet"
+    # YuNet landmarks are the subject's right eye, left eye, nose tip, right and left mouth
+    # corners; MTCNN names points by image side, so the subject's right eye is 'left_eye'
+    keypoint_names = ('left_eye', 'right_eye', 'nose', 'mouth_left', 'mouth_right')
+
+    def __init__(self, scale=1.0, model_path=YUNET_MODEL_PATH, score_threshold=0.6):
+        super().__init__(scale)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found at {model_path}; set YUNET_MODEL_PATH")
+        self.model = cv.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+
+    def _detect(self, image_np, color):
+        height, width = image_np.shape[:2]
+        self.model.setInputSize((width, height))
+        _, detections = self.model.detect(image_np if color == "BGR" else cv.cvtColor(image_np, cv.COLOR_RGB2BGR))
+        faces = []
+        for row in detections if detections is not None else []:
+            points = row[4:14].reshape(5, 2)
+            faces.append({
+                'box': [int(v) for v in row[:4]],
+                'confidence': float(row[14]),
+                'keypoints': {name: (int(x), int(y)) for name, (x, y) in zip(self.keypoint_names, points)},
+            })
+        return faces
+
+
+BACKENDS = {cls.name: cls for cls in (MTCNNDetector, HaarCascadeDetector, YuNetDetector)}
+
+
+def create_detector(backend=DETECTOR_BACKEND, scale=DETECTOR_SCALE):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {backend} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[backend](scale=scale)
@@ -0,0 +1,64 @@
+import os
+import cv2 as cv
+import numpy as np
+
+from config import EMBEDDER_BACKEND, EMBEDDER_MODEL_PATH, EMBEDDER_THREADS
+
+# ----------------------------
+# Pluggable FaceNet Runtimes
+# ----------------------------
+# Every backend exposes embeddings(faces) like keras_facenet.FaceNet: `faces` is a
+# batch of RGB face crops (N, 160, 160, 3) and the result an (N, 512) float32 array
+# of L2-normalized embeddings. Both backends run the same FaceNet weights
+# (keras_facenet's 20180402-114759 model):
+#
+#   keras - keras_facenet's float32 TensorFlow model (default)
+#   onnx  - the same network exported by export_facenet.py and run by ONNX Runtime
+#           on the CPU; point EMBEDDER_MODEL_PATH at the int8 file export_facenet.py
+#           quantizes to run the quantized model
+#
+# The onnx backend only needs onnxruntime, so with DETECTOR_BACKEND=yunet or haar
+# the recognition pipeline never imports TensorFlow.
+
+FACENET_INPUT_SIZE = 160
+
+
+def standardize(faces):
+    """keras_facenet's fixed image standardization ((x - 127.5) / 127.5), for the whole batch at once."""
+    return (np.asarray(faces, dtype=np.float32) - 127.5) / 127.5
+
+
+class OnnxFaceNet:
+    name = "onnx"
+
+    def __init__(self, model_path=EMBEDDER_MODEL_PATH, threads=EMBEDDER_THREADS):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"FaceNet ONNX model not found at {model_path}; create it with export_facenet.py")
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def embeddings(self, faces):
+        faces = np.asarray(faces)
+        if faces.shape[1:3] != (FACENET_INPUT_SIZE, FACENET_INPUT_SIZE):
+            # keras_facenet resizes its input too
+            faces = np.stack([cv.resize(face, (FACENET_INPUT_SIZE, FACENET_INPUT_SIZE)) for face in faces])
+        return self.session.run(None, {self.input_name: standardize(faces)})[0]
+
+
+def _keras_facenet(model_path=None, threads=None):
+    from keras_facenet import FaceNet
+    return FaceNet()
+
+
+BACKENDS = {"keras": _keras_facenet, OnnxFaceNet.name: OnnxFaceNet}
+
+
+def create_embedder(backend=EMBEDDER_BACKEND, model_path=EMBEDDER_MODEL_PATH, threads=EMBEDDER_THREADS):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedder backend: {backend} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[backend](model_path=model_path, threads=threads)
@@ -0,0 +1,104 @@
+import numpy as np
+
+import metrics
+from config import (QUALITY_GATE_ENABLED, QUALITY_MIN_FACE_SIZE, QUALITY_MIN_SHARPNESS,
+                    QUALITY_MIN_BRIGHTNESS, QUALITY_MAX_BRIGHTNESS, QUALITY_MAX_YAW)
+
+# ----------------------------
+# Face Quality Gate
+# ----------------------------
+# Every confident detection used to go through FaceNet, including faces that are
+# too small, blurred, badly lit or turned away to be recognized. Those usually come
+# back as "Unknown" after a full embedding pass. The gate checks the 160x160 crops
+# before embedding. It is cheap: the whole batch is converted to grayscale, and
+# brightness and sharpness are computed for all crops at once with NumPy.
+#
+#   too small    shorter box side below QUALITY_MIN_FACE_SIZE pixels (in the frame)
+#   too dark     mean brightness below QUALITY_MIN_BRIGHTNESS (0-255)
+#   too bright   mean brightness above QUALITY_MAX_BRIGHTNESS
+#   blurry       variance of the Laplacian below QUALITY_MIN_SHARPNESS
+#   turned away  nose offset from the eyes' midpoint above QUALITY_MAX_YAW inter-eye
+#                distances (needs keypoints, so it is skipped for the haar backend)
+#
+# Rejected faces are labelled "Low quality: <reason>" instead of being embedded.
+# The faces_quality_checked, embeddings_skipped and faces_rejected_<reason>
+# counters in metrics.py show how much FaceNet work was saved.
+
+enabled = QUALITY_GATE_ENABLED
+
+REJECTED_PREFIX = "Low quality: "
+
+_GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)  # RGB to luma
+
+
+def rejected_label(reason):
+    return REJECTED_PREFIX + reason
+
+
+def is_rejected(label):
+    return isinstance(label, str) and label.startswith(REJECTED_PREFIX)
+
+
+def sharpness(gray):
+    """Variance of the 4-neighbour Laplacian of each crop of an (N, H, W) grayscale batch."""
+    laplacian = (gray[:, :-2, 1:-1] + gray[:, 2:, 1:-1] + gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:]
+                 - 4 * gray[:, 1:-1, 1:-1])
+    return laplacian.reshape(len(gray), -1).var(axis=1)
+
+
+def yaw(keypoints):
+    """Horizontal nose offset from the midpoint of the eyes, in inter-eye distances (0 = frontal)."""
+    try:
+        (left_x, _), (right_x, _), (nose_x, _) = keypoints['left_eye'], keypoints['right_eye'], keypoints['nose']
+    except (KeyError, TypeError):
+        return None
+    eye_distance = abs(right_x - left_x)
+    if eye_distance == 0:
+        return float('inf')  # Eyes on top of each other: a profile view
+    return abs(nose_x - (left_x + right_x) / 2) / eye_distance
+
+
+def assess(face_crops, face_boxes, keypoints=None, min_size=QUALITY_MIN_FACE_SIZE, min_sharpness=QUALITY_MIN_SHARPNESS,
+           min_brightness=QUALITY_MIN_BRIGHTNESS, max_brightness=QUALITY_MAX_BRIGHTNESS, max_yaw=QUALITY_MAX_YAW):
+    """
+    Returns one rejection reason per face, or None for faces worth embedding. face_crops are the
+    RGB crops, face_boxes their (x, y, w, h) boxes in the frame and keypoints the detector's
+    keypoint dicts (optional).
+    """
+    n_faces = len(face_crops)
+    if n_faces == 0:
+        return []
+    gray = np.asarray(face_crops, dtype=np.float32) @ _GRAY_WEIGHTS
+    brightness = gray.reshape(n_faces, -1).mean(axis=1)
+    sharp = sharpness(gray)
+    sizes = [min(w, h) for _, _, w, h in face_boxes]
+    yaws = [yaw(points) for points in keypoints] if keypoints is not None else [None] * n_faces
+
+    reasons = []
+    for size, light, edges, turn in zip(sizes, brightness, sharp, yaws):
+        if size < min_size:
+            reasons.append("too small")
+        elif light < min_brightness:
+            reasons.append("too dark")
+        elif light > max_brightness:
+            reasons.append("too bright")
+        elif edges < min_sharpness:
+            reasons.append("blurry")
+        elif turn is not None and turn > max_yaw:
+            reasons.append("turned away")
+        else:
+            reasons.append(None)
+    return reasons
+
+
+def gate(face_crops, face_boxes, keypoints=None):
+    """assess() when the gate is enabled (every face passes otherwise), recording the rejection counters."""
+    if not enabled:
+        return [None] * len(face_crops)
+    reasons = assess(face_crops, face_boxes, keypoints)
+    rejected = [reason for reason in reasons if reason is not None]
+    metrics.inc("faces_quality_checked", len(reasons))
+    metrics.inc("embeddings_skipped", len(rejected))
+    for reason in rejected:
+        metrics.inc(f"faces_rejected_{reason.replace(' ', '_')}")
+    return reasons
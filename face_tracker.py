@@ -0,0 +1,159 @@
+import time
+import cv2 as cv
+import numpy as np
+
+import face_quality
+import model_registry
+from classifier_model_for_testing import RecognitionResult, confident_face_boxes, classify_faces, face_keypoints
+from config import DETECT_EVERY_N_FRAMES, TRACK_REVERIFY_FRAMES
+
+# ----------------------------
+# Track-then-Recognize
+# ----------------------------
+# MTCNN + FaceNet only run on detection frames. In between, every face is followed
+# by matching its grayscale template inside a small window around its last box,
+# and the identity found for a track is reused until it is due for re-verification.
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Returns the (len(boxes_a), len(boxes_b)) intersection-over-union matrix of two lists of (x, y, w, h) boxes."""
+    a = np.asarray(boxes_a, dtype='float32').reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype='float32').reshape(-1, 4)
+    ax1, ay1, ax2, ay2 = a[:, 0:1], a[:, 1:2], a[:, 0:1] + a[:, 2:3], a[:, 1:2] + a[:, 3:4]
+    bx1, by1, bx2, by2 = b[:, 0], b[:, 1], b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = inter_w * inter_h
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def clip_box(box, shape):
+    """Clips an (x, y, w, h) box to an image of the given shape."""
+    x, y, w, h = box
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(shape[1], x + w), min(shape[0], y + h)
+    return x1, y1, max(0, x2 - x1), max(0, y2 - y1)
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.template = None
+        self.keypoints = None
+        self.label = None
+        self.score = 0.0
+        self.last_verified = None
+
+
+class FaceTracker:
+    """
+    Stateful replacement for recognize_faces on a stream of frames. update() takes RGB
+    (or BGR) frames in order and returns a RecognitionResult like recognize_faces.
+    """
+
+    def __init__(self, detect_every=DETECT_EVERY_N_FRAMES, reverify_every=TRACK_REVERIFY_FRAMES,
+                 iou_threshold=0.3, match_threshold=0.6, search_margin=0.5):
+        self.detect_every = detect_every
+        self.reverify_every = reverify_every
+        self.iou_threshold = iou_threshold
+        self.match_threshold = match_threshold
+        self.search_margin = search_margin
+        self.tracks = []
+        self.message = "No face detected"
+        self.frame_index = 0
+        self.last_detection = None
+        self.next_track_id = 0
+        # Counters showing how much work tracking saved
+        self.detections_run = 0
+        self.faces_classified = 0
+
+    def update(self, image_np, color="RGB"):
+        """Tracks, and when due detects and recognizes, the faces of an RGB or BGR frame."""
+        result = RecognitionResult()
+        start = time.perf_counter()
+        gray = cv.cvtColor(image_np, cv.COLOR_BGR2GRAY if color == "BGR" else cv.COLOR_RGB2GRAY)
+        need_detection = (self.last_detection is None or not self.tracks
+                          or self.frame_index - self.last_detection >= self.detect_every)
+        if not need_detection and not self._follow(gray):
+            need_detection = True  # A track was lost, detect again right away
+        result.timings["track"] = time.perf_counter() - start
+        if need_detection:
+            self._detect(image_np, color, gray, result.timings)
+        self.frame_index += 1
+
+        if not self.tracks:
+            result.message = self.message
+            return result
+        result.boxes = [track.box for track in self.tracks]
+        result.labels = [track.label for track in self.tracks]
+        result.scores = [track.score for track in self.tracks]
+        return result
+
+    def _follow(self, gray):
+        """Moves every track to its best template match. Returns False if any track was lost."""
+        for track in self.tracks:
+            x, y, w, h = track.box
+            margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+            sx, sy, sw, sh = clip_box((x - margin_x, y - margin_y, w + 2 * margin_x, h + 2 * margin_y), gray.shape)
+            th, tw = track.template.shape
+            if sw < tw or sh < th:
+                return False
+            scores = cv.matchTemplate(gray[sy:sy+sh, sx:sx+sw], track.template, cv.TM_CCOEFF_NORMED)
+            _, best, _, (dx, dy) = cv.minMaxLoc(scores)
+            if best < self.match_threshold:
+                return False
+            track.box = (sx + dx, sy + dy, w, h)
+        return True
+
+    def _detect(self, image_np, color, gray, timings):
+        self.detections_run += 1
+        self.last_detection = self.frame_index
+        start = time.perf_counter()
+        faces = model_registry.get("detector").detect_faces(image_np, color)
+        face_boxes = confident_face_boxes(faces)
+        keypoints = face_keypoints(faces)
+        timings["detect"] = time.perf_counter() - start
+        if not face_boxes:
+            self.tracks = []
+            self.message = "No face detected" if len(faces) == 0 else "No high-confidence face detected"
+            return
+
+        # Greedily pair each detection with the free track it overlaps most
+        overlaps = iou_matrix(face_boxes, [track.box for track in self.tracks])
+        matched = set()
+        tracks = []
+        for i, box in enumerate(face_boxes):
+            track = None
+            if self.tracks:
+                for j in np.argsort(-overlaps[i]):
+                    if overlaps[i, j] < self.iou_threshold:
+                        break
+                    if j not in matched:
+                        matched.add(j)
+                        track = self.tracks[j]
+                        break
+            if track is None:
+                track = Track(self.next_track_id, box)
+                self.next_track_id += 1
+            track.box = box
+            track.keypoints = keypoints[i]
+            bx, by, bw, bh = clip_box(box, gray.shape)
+            track.template = gray[by:by+bh, bx:bx+bw].copy()
+            tracks.append(track)
+        self.tracks = [track for track in tracks if track.template.size > 0]
+
+        # Only new tracks and tracks due for re-verification go through FaceNet
+        stale = [track for track in self.tracks if track.last_verified is None
+                 or self.frame_index - track.last_verified >= self.reverify_every]
+        if stale:
+            labels, scores = classify_faces(image_np, [clip_box(track.box, gray.shape) for track in stale], timings, color,
+                                            keypoints=[track.keypoints for track in stale])
+            for track, label, score in zip(stale, labels, scores):
+                track.label = label
+                track.score = score
+                # A face rejected by the quality gate is tried again on the next detection frame
+                if not face_quality.is_rejected(label):
+                    track.last_verified = self.frame_index
+            self.faces_classified += len(stale)
@@ -0,0 +1,161 @@
+import numpy as np
+
+from config import GALLERY_MODE, GALLERY_THRESHOLD, GALLERY_DTYPE
+
+# ----------------------------
+# Nearest-Neighbour Gallery
+# ----------------------------
+# Alternative to the pickled SVC: every identity is represented by L2-normalized
+# FaceNet embeddings stored in one contiguous float32 matrix, and a whole batch
+# of faces is matched with a single matrix multiply (cosine similarity).
+# Adding a student only means adding rows, no retraining.
+#
+# With GALLERY_DTYPE=int16 or int8 the rows are kept quantized, as integers with
+# one float32 scale per row (max |value| / 32767 or / 127). Queries stay float32
+# and are compared with the gallery a block of rows at a time: each block is
+# widened into one reused, cache-sized float32 scratch buffer, so the full matrix
+# keeps its reduced size and no temporaries are allocated per block, and the row
+# scales are applied once to the finished similarity matrix. The 16-bit option
+# used to store float16, but the float16 -> float32 cast costs several times the
+# matrix multiply itself; int16 halves the memory just the same, is more precise
+# for unit vectors and widens about as fast as int8. "float16" is still accepted
+# and means int16.
+#
+# float32 rows that are already unit length, like the memory-mapped galleries
+# written by mmap_gallery.py, are searched in place: every process shares the
+# mapped pages instead of holding its own normalized copy.
+
+DTYPES = ("float32", "int16", "int8")
+DTYPE_ALIASES = {"float16": "int16"}
+SEARCH_BLOCK_ROWS = 1024  # 1024 x 512 float32 rows = 2 MB of scratch, stays in L2/L3
+_INT_MAX = {"int16": 32767, "int8": 127}
+
+
+def l2_normalize(vectors):
+    """Returns a float32 copy of `vectors` with every row scaled to unit length."""
+    vectors = np.asarray(vectors, dtype='float32')
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def is_normalized(vectors, tolerance=1e-4):
+    """True if `vectors` is a C-contiguous float32 matrix whose rows all have unit length."""
+    if not isinstance(vectors, np.ndarray) or vectors.dtype != np.float32 or vectors.ndim != 2:
+        return False
+    if not vectors.flags.c_contiguous:
+        return False
+    # einsum reads the rows without materializing an (N, dim) temporary
+    norms = np.einsum('ij,ij->i', vectors, vectors)
+    return bool(np.all(np.abs(norms - 1.0) <= tolerance))
+
+
+def resolve_dtype(dtype):
+    """The storage dtype a GALLERY_DTYPE value stands for."""
+    dtype = DTYPE_ALIASES.get(dtype, dtype)
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown gallery dtype: {dtype}")
+    return dtype
+
+
+def quantize(vectors, dtype):
+    """Returns (data, scales) for float32 rows stored as dtype; scales is None for float32."""
+    dtype = resolve_dtype(dtype)
+    vectors = np.asarray(vectors, dtype='float32')
+    if dtype == "float32":
+        return np.ascontiguousarray(vectors), None
+    limit = _INT_MAX[dtype]
+    scales = np.maximum(np.abs(vectors).max(axis=-1, initial=0.0), 1e-12) / limit
+    data = np.clip(np.rint(vectors / scales[:, None]), -limit, limit).astype(dtype)
+    return np.ascontiguousarray(data), scales.astype('float32')
+
+
+def dequantize(data, scales=None):
+    """Inverse of quantize(): returns the rows as float32."""
+    vectors = np.asarray(data, dtype='float32')
+    return vectors * scales[:, None] if scales is not None else vectors
+
+
+class GalleryIndex:
+    """
+    Holds one row per exemplar (or per identity centroid) and the name of each row.
+    search() labels a face "Unknown" when its best cosine similarity is below threshold.
+    """
+
+    def __init__(self, vectors, labels, threshold=GALLERY_THRESHOLD, dtype=GALLERY_DTYPE):
+        dtype = resolve_dtype(dtype)
+        if dtype == "float32" and is_normalized(vectors):
+            self.vectors, self.scales = vectors, None  # Searched in place, e.g. a memmap
+        else:
+            self.vectors, self.scales = quantize(l2_normalize(vectors), dtype)
+        self.labels = np.asarray(labels)
+        self.threshold = threshold
+        self.dtype = dtype
+
+    @classmethod
+    def from_embeddings(cls, embeddings, labels, mode=GALLERY_MODE, threshold=GALLERY_THRESHOLD, dtype=GALLERY_DTYPE):
+        """
+        Builds a gallery from training embeddings. mode="centroid" keeps the mean of the
+        normalized embeddings of each identity, mode="exemplar" keeps every embedding (without
+        copying float32 rows that are already normalized).
+        """
+        labels = np.asarray(labels)
+        if mode == "exemplar":
+            return cls(embeddings, labels, threshold, dtype)
+        if mode != "centroid":
+            raise ValueError(f"Unknown gallery mode: {mode}")
+        names, inverse = np.unique(labels, return_inverse=True)
+        normalized = l2_normalize(embeddings)
+        centroids = np.zeros((len(names), normalized.shape[1]), dtype='float32')
+        np.add.at(centroids, inverse, normalized)
+        return cls(centroids, names, threshold, dtype)
+
+    @classmethod
+    def from_npz(cls, path, mode=GALLERY_MODE, threshold=GALLERY_THRESHOLD, dtype=GALLERY_DTYPE):
+        """Builds a gallery from an .npz file (embeddings in arr_0, names in arr_1) or a memory-mapped gallery."""
+        from mmap_gallery import load_embedding_file
+        return cls.from_embeddings(*load_embedding_file(path), mode, threshold, dtype)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def nbytes(self):
+        """Memory held by the gallery rows (and their scales)."""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def float_vectors(self):
+        """The rows as float32, e.g. to build an ANN index from this gallery."""
+        return dequantize(self.vectors, self.scales)
+
+    def rows_of(self, names):
+        """The float32 rows of the given identities and their labels, e.g. to update an ANN index."""
+        mask = np.isin(self.labels, list(names))
+        return dequantize(self.vectors[mask], self.scales[mask] if self.scales is not None else None), self.labels[mask]
+
+    def similarities(self, embeddings):
+        """Returns the (N, len(self)) cosine similarity matrix of a batch of embeddings."""
+        queries = l2_normalize(embeddings).reshape(-1, self.vectors.shape[1])
+        if self.vectors.dtype == np.float32:
+            return queries @ self.vectors.T
+        sims = np.empty((len(queries), len(self.vectors)), dtype='float32')
+        scratch = np.empty((min(SEARCH_BLOCK_ROWS, len(self.vectors)), self.vectors.shape[1]), dtype='float32')
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+            rows = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+            widened = scratch[:len(rows)]
+            widened[...] = rows
+            np.matmul(queries, widened.T, out=sims[:, start:start + len(rows)])
+        sims *= self.scales
+        return sims
+
+    def search(self, embeddings):
+        """
+        Matches a batch of embeddings against the gallery. Returns (labels, scores) where
+        labels[i] is the best identity name or "Unknown" and scores[i] its cosine similarity.
+        """
+        if len(self) == 0:
+            return ["Unknown"] * len(embeddings), np.zeros(len(embeddings), dtype='float32')
+        sims = self.similarities(embeddings)
+        best = np.argmax(sims, axis=1)
+        scores = sims[np.arange(len(best)), best]
+        labels = [str(self.labels[b]) if s >= self.threshold else "Unknown" for b, s in zip(best, scores)]
+        return labels, scores
@@ -0,0 +1,138 @@
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+
+import mmap_gallery
+from config import GALLERY_DIR, EMBEDDING_FILE
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ----------------------------
+# Versioned Gallery Store
+# ----------------------------
+# The embeddings and names the gallery recognizers are built from. Until the
+# first enrollment this is the seed face_embeddig_for_12_class.npz; every
+# enrollment or removal writes a complete new version and then switches the
+# CURRENT pointer with an atomic rename, so a crash never leaves a partial gallery
+# and older versions remain available for rollback. Versions are written in the
+# memory-mapped format of mmap_gallery.py; older .npz versions still load.
+#
+# The app and the enrollment command line are separate processes. A change
+# loads the active version, edits it and commits the result while holding an
+# exclusive file lock (root/LOCK), so neither can overwrite the other's change.
+# A new version is numbered after the highest one on disk. Versions left behind
+# by a commit that crashed before switching CURRENT are removed first.
+
+_VERSION = re.compile(r"^v(\d{6})(\.npz|\.tmp)?$")
+
+
+class GalleryStore:
+    """
+    Versioned embeddings on disk: root/v000001/, root/v000002/, ... plus a CURRENT file
+    naming the active version. Versions are written in full and activated with a rename.
+    """
+
+    def __init__(self, root=GALLERY_DIR, seed_file=EMBEDDING_FILE):
+        self.root = root
+        self.seed_file = seed_file
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Returns (embeddings, labels) of the active version, or of the seed file before the first commit."""
+        version = self.current_version()
+        if version is None:
+            return mmap_gallery.load_embedding_file(self.seed_file)
+        path = os.path.join(self.root, version)
+        if not os.path.isdir(path):
+            path += ".npz"  # Written before the memory-mapped format
+        return mmap_gallery.load_embedding_file(path)
+
+    @contextmanager
+    def locked(self):
+        """
+        Holds the store's exclusive lock, across processes, for a load-edit-commit sequence.
+        Re-entrant within one GalleryStore, so commit() can be called while holding it.
+        """
+        with self._thread_lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self
+                finally:
+                    self._depth -= 1
+                return
+            with self._file_lock():
+                self._depth = 1
+                try:
+                    yield self
+                finally:
+                    self._depth = 0
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "LOCK"), "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _next_version(self):
+        """Removes versions newer than CURRENT (left by a crashed commit) and returns the next free name."""
+        current = self.current_version()
+        current_number = int(current[1:]) if current else 0
+        highest = current_number
+        for entry in os.listdir(self.root):
+            match = _VERSION.match(entry)
+            if match is None:
+                continue
+            number = int(match.group(1))
+            if number > current_number:
+                path = os.path.join(self.root, entry)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            else:
+                highest = max(highest, number)
+        return f"v{highest + 1:06d}"
+
+    def commit(self, embeddings, labels):
+        """
+        Writes a new version and makes it the active one. Returns the version name. Callers that
+        loaded the gallery they are changing should hold locked() from the load to the commit.
+        """
+        with self.locked():
+            version = self._next_version()
+            self._write(version, embeddings, labels)
+        return version
+
+    def _write(self, version, embeddings, labels):
+        mmap_gallery.save(os.path.join(self.root, version), embeddings, labels)
+        pointer = os.path.join(self.root, "CURRENT.tmp")
+        with open(pointer, 'w') as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
@@ -0,0 +1,126 @@
+import argparse
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+from config import IMAGE_STORE_DIR, IMAGE_THUMB_SIZE, IMAGE_CACHE_ENTRIES
+
+# ----------------------------
+# Content-Addressed Profile Image Store
+# ----------------------------
+# Profile photos used to live as base64 strings inside the users documents, so
+# every user lookup downloaded the whole image. Now the JPEG bytes are written
+# once to IMAGE_STORE_DIR under their SHA-256 hash (a local stand-in for an
+# object store bucket), next to a small pre-generated thumbnail, and the user
+# document only keeps the hash. Identical uploads share one file.
+#
+# Accounts created before the store still carry the base64 image; run
+#   python image_store.py --key techfusion-firestore-key.json
+# once to move those images into the store (the app shows both kinds meanwhile).
+
+
+class ImageStore:
+    """
+    put() stores an image and returns its hash; data_uri() serves the image or its thumbnail
+    as an inline data URI from an in-process LRU cache.
+    """
+
+    def __init__(self, root=IMAGE_STORE_DIR, thumb_size=IMAGE_THUMB_SIZE, cache_entries=IMAGE_CACHE_ENTRIES):
+        self.root = root
+        self.thumb_size = thumb_size
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, image_hash, thumbnail=False):
+        suffix = "_thumb.jpg" if thumbnail else ".jpg"
+        return os.path.join(self.root, image_hash[:2], image_hash + suffix)
+
+    @staticmethod
+    def _encode(image, quality=85):
+        # Ensure image is in RGB mode (not RGBA) to prevent JPEG encoding issues
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=quality)
+        return buffered.getvalue()
+
+    @staticmethod
+    def _write(path, data):
+        # Write to a temporary file and rename, so readers never see half a file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, image):
+        """Stores a PIL image (and its thumbnail) and returns the SHA-256 hex digest of its JPEG bytes."""
+        data = self._encode(image)
+        image_hash = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self._path(image_hash)):
+            thumb = image.copy()
+            thumb.thumbnail((self.thumb_size, self.thumb_size))
+            self._write(self._path(image_hash, thumbnail=True), self._encode(thumb, quality=80))
+            self._write(self._path(image_hash), data)
+        return image_hash
+
+    def put_base64(self, image_b64):
+        """Stores an image given as a base64 JPEG string, as the old user documents hold them."""
+        return self.put(Image.open(io.BytesIO(base64.b64decode(image_b64))))
+
+    def get(self, image_hash, thumbnail=False):
+        """Returns the JPEG bytes of an image or its thumbnail."""
+        with open(self._path(image_hash, thumbnail), 'rb') as f:
+            return f.read()
+
+    def data_uri(self, image_hash, thumbnail=True):
+        """Returns a data:image/jpeg URI for the image, cached so reruns do not re-read or re-encode it."""
+        key = (image_hash, thumbnail)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        uri = "data:image/jpeg;base64," + base64.b64encode(self.get(image_hash, thumbnail)).decode("utf-8")
+        with self._lock:
+            self._cache[key] = uri
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return uri
+
+
+def migrate_user_images(db, store, delete_field):
+    """
+    Moves base64 profile images out of existing users documents into the store. `delete_field`
+    is the client's field deletion sentinel (firestore.DELETE_FIELD). Returns the number migrated.
+    """
+    migrated = 0
+    for doc in db.collection("users").stream():
+        user = doc.to_dict()
+        if user.get("profile_image"):
+            image_hash = store.put_base64(user["profile_image"])
+            db.collection("users").document(doc.id).set(
+                {"profile_image_hash": image_hash, "profile_image": delete_field}, merge=True)
+            migrated += 1
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move base64 profile images from the users documents into the image store.")
+    parser.add_argument("--key", default="techfusion-firestore-key.json", help="Firebase service account key.")
+    parser.add_argument("--root", default=IMAGE_STORE_DIR, help="Image store directory.")
+    args = parser.parse_args()
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    firebase_admin.initialize_app(credentials.Certificate(args.key))
+    migrated = migrate_user_images(firestore.client(), ImageStore(root=args.root), firestore.DELETE_FIELD)
+    print(f"Migrated {migrated} profile images to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import metrics
+
+# ----------------------------
+# Latest-Frame Inference Worker
+# ----------------------------
+# The WebRTC callback must return quickly, so recognition runs on a background
+# thread. The worker only ever keeps the newest submitted frame: if inference is
+# still busy when several frames arrive, the older ones are dropped.
+
+
+class LatestFrameWorker:
+    """
+    Runs `infer(frame)` on a daemon thread for the most recently submitted frame and
+    keeps the last result. `target_fps` caps how often inference runs (0 = no cap).
+    """
+
+    def __init__(self, infer, target_fps=0):
+        self.infer = infer
+        self.min_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self._pending = None
+        self._result = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """Hands a frame to the worker, replacing any frame that has not been picked up yet."""
+        with self._condition:
+            if self._pending is not None:
+                self.frames_dropped += 1
+                metrics.inc("frames_dropped")
+            self._pending = frame
+            self.frames_submitted += 1
+            self._condition.notify()
+
+    def latest(self):
+        """Returns the result of the last finished inference, or None if none finished yet."""
+        with self._condition:
+            return self._result
+
+    def stop(self, timeout=None):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        last_started = 0.0
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            # Respect the target fps before taking the frame, so the newest one is used
+            wait = self.min_interval - (time.perf_counter() - last_started)
+            if wait > 0:
+                time.sleep(wait)
+            with self._condition:
+                frame, self._pending = self._pending, None
+            if frame is None:
+                continue
+            last_started = time.perf_counter()
+            try:
+                result = self.infer(frame)
+            except Exception as e:
+                print(f"Inference worker error: {e}")
+                continue
+            with self._condition:
+                self._result = result
+                self.frames_processed += 1
@@ -0,0 +1,296 @@
+import argparse
+import os
+import queue
+import threading
+import time
+import cv2 as cv
+
+import face_quality
+import metrics
+import model_registry
+from classifier_model_for_testing import (RecognitionResult, confident_face_boxes, crop_faces, face_keypoints,
+                                          gate_faces, fill_labels, get_embeddings, classify_embeddings)
+
+# ----------------------------
+# Multi-Camera Ingestion Service
+# ----------------------------
+# Headless recognition for fixed classroom cameras. One reader thread per source
+# decodes frames with OpenCV and offers them to a single bounded inference queue.
+# A pool of workers drains that queue in batches: MTCNN runs per frame, then the
+# faces of every frame in the batch (from any camera) go through one FaceNet pass
+# and one classifier call.
+#
+# Backpressure is per stream: each camera may only have `per_stream_inflight`
+# frames queued or being processed. Live sources (RTSP/HTTP/webcam) drop frames
+# beyond that limit so they stay current; file sources wait instead, so no frame
+# of a recording is lost.
+
+
+def is_live_source(source):
+    return source.isdigit() or source.split("://", 1)[0].lower() in ("rtsp", "rtsps", "http", "https", "udp", "tcp")
+
+
+class StreamStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.faces_seen = 0
+        self.latency_total = 0.0
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = max(time.perf_counter() - self.started, 1e-9)
+            processed = self.frames_processed
+            return {
+                "decoded": self.frames_decoded,
+                "dropped": self.frames_dropped,
+                "processed": processed,
+                "faces": self.faces_seen,
+                "fps": processed / elapsed,
+                "latency_ms": self.latency_total / processed * 1000 if processed else 0.0,
+            }
+
+
+class CameraStream:
+    def __init__(self, stream_id, source, per_stream_inflight, live=None, realtime=False):
+        self.stream_id = stream_id
+        self.source = source
+        self.live = is_live_source(source) if live is None else live
+        self.realtime = realtime
+        self.slots = threading.BoundedSemaphore(per_stream_inflight)
+        self.stats = StreamStats()
+        self.finished = False
+        self.thread = None
+
+
+class IngestionService:
+    """
+    Decodes several video sources and recognizes faces on them with a shared worker pool.
+    `on_result(stream_id, frame_index, result)` is called for every processed frame.
+    """
+
+    def __init__(self, sources, workers=2, batch_frames=8, queue_size=32, per_stream_inflight=4,
+                 realtime=False, on_result=None):
+        self.streams = [CameraStream(stream_id, source, per_stream_inflight, realtime=realtime)
+                        for stream_id, source in sources.items()]
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.n_workers = workers
+        self.batch_frames = batch_frames
+        self.on_result = on_result or (lambda stream_id, frame_index, result: None)
+        self._stopping = threading.Event()
+        self._workers = []
+
+    # ---------- lifecycle ----------
+    def start(self):
+        model_registry.warm_up()
+        metrics.set_gauge("ingestion_queue_depth", self.queue.qsize)
+        for _ in range(self.n_workers):
+            worker = threading.Thread(target=self._work, name="ingestion-worker", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        for stream in self.streams:
+            stream.thread = threading.Thread(target=self._read, args=(stream,),
+                                             name=f"reader-{stream.stream_id}", daemon=True)
+            stream.thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        for stream in self.streams:
+            stream.thread.join()
+        for worker in self._workers:
+            worker.join()
+
+    def finished(self):
+        """True once every source reached its end and all queued frames were processed."""
+        return all(stream.finished for stream in self.streams) and self.queue.unfinished_tasks == 0
+
+    # ---------- decoding ----------
+    def _read(self, stream):
+        capture = cv.VideoCapture(int(stream.source) if stream.source.isdigit() else stream.source)
+        if not capture.isOpened():
+            print(f"[{stream.stream_id}] Cannot open source {stream.source}")
+            stream.finished = True
+            return
+        fps = capture.get(cv.CAP_PROP_FPS) or 30
+        frame_interval = 1.0 / fps
+        frame_index = 0
+        next_frame_at = time.perf_counter()
+        while not self._stopping.is_set():
+            success, frame = capture.read()
+            if not success:
+                break
+            with stream.stats.lock:
+                stream.stats.frames_decoded += 1
+            self._offer(stream, frame_index, frame)
+            frame_index += 1
+            if stream.realtime:
+                # Pace recorded files like a camera would deliver them
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        capture.release()
+        stream.finished = True
+
+    def _offer(self, stream, frame_index, frame):
+        drop = stream.live or stream.realtime
+        if drop:
+            if not stream.slots.acquire(blocking=False):
+                with stream.stats.lock:
+                    stream.stats.frames_dropped += 1
+                metrics.inc("frames_dropped")
+                return
+        else:
+            while not stream.slots.acquire(timeout=0.5):
+                if self._stopping.is_set():
+                    return
+        item = (stream, frame_index, frame, time.perf_counter())
+        while True:
+            try:
+                self.queue.put(item, block=not drop, timeout=None if drop else 0.5)
+                return
+            except queue.Full:
+                if drop or self._stopping.is_set():
+                    stream.slots.release()
+                    with stream.stats.lock:
+                        stream.stats.frames_dropped += 1
+                    metrics.inc("frames_dropped")
+                    return
+
+    # ---------- inference ----------
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                batch = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_frames:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"Ingestion worker error: {e}")
+            finally:
+                for stream, _, _, _ in batch:
+                    stream.slots.release()
+                    self.queue.task_done()
+
+    def _process(self, batch):
+        detector = model_registry.get("detector")
+        results = []
+        face_crops = []
+        for stream, frame_index, frame, _ in batch:
+            result = RecognitionResult()
+            start = time.perf_counter()
+            faces = detector.detect_faces(frame, color="BGR")
+            result.boxes = confident_face_boxes(faces)
+            result.timings["detect"] = time.perf_counter() - start
+            if len(faces) == 0:
+                result.message = "No face detected"
+            elif not result.boxes:
+                result.message = "No high-confidence face detected"
+            # Faces rejected by the quality gate keep their "Low quality" label and are not embedded
+            kept_crops, result.labels = gate_faces(crop_faces(frame, result.boxes, color="BGR"), result.boxes,
+                                                   face_keypoints(faces))
+            face_crops.extend(kept_crops)
+            results.append(result)
+
+        # One FaceNet pass and one classifier call for the faces of every frame in the batch
+        labels, scores = [], []
+        start = time.perf_counter()
+        if face_crops:
+            labels, scores = classify_embeddings(get_embeddings(face_crops))
+        batch_time = time.perf_counter() - start
+
+        offset = 0
+        for (stream, frame_index, _, queued_at), result in zip(batch, results):
+            n_embedded = result.labels.count(None)
+            result.labels, result.scores = fill_labels(result.labels, labels[offset:offset + n_embedded],
+                                                       scores[offset:offset + n_embedded])
+            result.timings["embed_classify_batch"] = batch_time
+            offset += n_embedded
+            with stream.stats.lock:
+                stream.stats.frames_processed += 1
+                stream.stats.faces_seen += len(result.boxes)
+                stream.stats.latency_total += time.perf_counter() - queued_at
+            metrics.record_result(result)
+            self.on_result(stream.stream_id, frame_index, result)
+
+    # ---------- metrics ----------
+    def metrics(self):
+        """Per-stream throughput counters plus the shared queue depth."""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "streams": {stream.stream_id: stream.stats.snapshot() for stream in self.streams},
+        }
+
+    def print_metrics(self):
+        metrics = self.metrics()
+        print(f"queue depth {metrics['queue_depth']}/{self.queue.maxsize}")
+        for stream_id, stats in metrics["streams"].items():
+            print(f"  [{stream_id}] decoded {stats['decoded']} processed {stats['processed']} "
+                  f"dropped {stats['dropped']} faces {stats['faces']} "
+                  f"{stats['fps']:.1f} fps latency {stats['latency_ms']:.0f} ms")
+
+
+def recognized_names(result):
+    """The student names of a result: faces labelled "Unknown" or rejected by the quality gate are left out."""
+    return [label for label in result.labels if label != "Unknown" and not face_quality.is_rejected(label)]
+
+
+def parse_sources(values):
+    """Turns "name=source" or bare "source" arguments into an ordered {stream_id: source} dict."""
+    sources = {}
+    for value in values:
+        name, sep, source = value.partition("=")
+        if not sep or "://" in name:
+            source = value
+            name = os.path.splitext(os.path.basename(value.rstrip("/")))[0] or value
+        sources[name] = source
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize faces on several classroom cameras or video files.")
+    parser.add_argument("sources", nargs="+", help="Video sources as name=source or source (RTSP URL, file, webcam index).")
+    parser.add_argument("--workers", type=int, default=2, help="Inference worker threads.")
+    parser.add_argument("--batch-frames", type=int, default=8, help="Max frames embedded together.")
+    parser.add_argument("--queue-size", type=int, default=32, help="Capacity of the shared inference queue.")
+    parser.add_argument("--per-stream-inflight", type=int, default=4, help="Max queued frames per stream.")
+    parser.add_argument("--realtime", action="store_true", help="Pace files at their frame rate and drop like live cameras.")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between metric reports.")
+    args = parser.parse_args()
+
+    seen = {}
+
+    def on_result(stream_id, frame_index, result):
+        for label in recognized_names(result):
+            if label not in seen.setdefault(stream_id, set()):
+                seen[stream_id].add(label)
+                print(f"[{stream_id}] frame {frame_index}: recognized {label}")
+
+    service = IngestionService(parse_sources(args.sources), workers=args.workers, batch_frames=args.batch_frames,
+                               queue_size=args.queue_size, per_stream_inflight=args.per_stream_inflight,
+                               realtime=args.realtime, on_result=on_result)
+    metrics.start()
+    service.start()
+    try:
+        while not service.finished():
+            time.sleep(args.report_every)
+            service.print_metrics()
+    except KeyboardInterrupt:
+        pass
+    service.stop()
+    service.print_metrics()
+    for stream_id, names in seen.items():
+        print(f"[{stream_id}] {len(names)} students recognized: {', '.join(sorted(names))}")
+
+
+if __name__ == "__main__":
+    main()
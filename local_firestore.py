@@ -0,0 +1,208 @@
+import copy
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# ----------------------------
+# Local Firestore Stand-in
+# ----------------------------
+# A small in-memory implementation of the parts of the google-cloud-firestore
+# client this project uses (collection/document get, set, add, get_all,
+# where/order_by/start_after/limit/stream, write batches, Increment,
+# DELETE_FIELD and SERVER_TIMESTAMP). It lets
+# the attendance queue, history and aggregate code be exercised without network
+# access or credentials. `fail_next_commits` makes the next N
+# write batches raise, to simulate an unreachable backend.
+
+
+class Increment:
+    """Numeric increment sentinel, like google.cloud.firestore.Increment."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Sentinel:
+    """Special field value, like the google.cloud.firestore sentinels."""
+
+    def __init__(self, description):
+        self.description = description
+
+
+DELETE_FIELD = Sentinel("Value used to delete a field in a document.")
+SERVER_TIMESTAMP = Sentinel("Value used to set a document field to the server timestamp.")
+
+
+def _apply(existing, data, commit_time):
+    # Resolves Increment, DELETE_FIELD and SERVER_TIMESTAMP sentinels (local or google-cloud-firestore
+    # ones) against the stored fields
+    merged = dict(existing)
+    for key, value in data.items():
+        if type(value).__name__ == "Increment":
+            merged[key] = (merged.get(key) or 0) + value.value
+        elif type(value).__name__ == "Sentinel" and "delete" in value.description:
+            merged.pop(key, None)
+        elif type(value).__name__ == "Sentinel" and "server timestamp" in value.description:
+            merged[key] = commit_time
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+class LocalSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class LocalDocument:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        with self._client.lock:
+            self._client.reads += 1
+            return LocalSnapshot(self.id, self._client.data.get(self._collection, {}).get(self.id))
+
+    def set(self, data, merge=False, commit_time=None):
+        with self._client.lock:
+            documents = self._client.data.setdefault(self._collection, {})
+            existing = documents.get(self.id, {}) if merge else {}
+            documents[self.id] = _apply(existing, data, commit_time or self._client.commit_time())
+            self._client.writes += 1
+
+    def delete(self):
+        with self._client.lock:
+            self._client.data.get(self._collection, {}).pop(self.id, None)
+
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+}
+
+
+class LocalQuery:
+    def __init__(self, client, collection, filters=(), limit=None, order=None, after=None):
+        self._client = client
+        self._collection = collection
+        self._filters = list(filters)
+        self._limit = limit
+        self._order = order
+        self._after = after
+
+    def _copy(self, **changes):
+        state = {"filters": self._filters, "limit": self._limit, "order": self._order, "after": self._after}
+        state.update(changes)
+        return LocalQuery(self._client, self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, **kwargs):
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(order=(field_path, direction))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, snapshot):
+        return self._copy(after=snapshot.id)
+
+    def stream(self):
+        with self._client.lock:
+            items = list(self._client.data.get(self._collection, {}).items())
+        matches = [(doc_id, data) for doc_id, data in items
+                   if all(_OPERATORS[op](data.get(field), value) for field, op, value in self._filters)]
+        if self._order is not None:
+            field, direction = self._order
+            matches.sort(key=lambda item: (item[1].get(field), item[0]), reverse=direction == "DESCENDING")
+        if self._after is not None:
+            ids = [doc_id for doc_id, _ in matches]
+            matches = matches[ids.index(self._after) + 1:] if self._after in ids else matches
+        if self._limit is not None:
+            matches = matches[:self._limit]
+        with self._client.lock:
+            self._client.reads += len(matches)
+        for doc_id, data in matches:
+            yield LocalSnapshot(doc_id, copy.deepcopy(data))
+
+
+class LocalCollection(LocalQuery):
+    def __init__(self, client, name):
+        super().__init__(client, name)
+
+    def document(self, doc_id=None):
+        return LocalDocument(self._client, self._collection, doc_id or uuid.uuid4().hex)
+
+    def add(self, data):
+        document = self.document()
+        document.set(data)
+        return None, document
+
+
+class LocalWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, document, data, merge=False):
+        self._writes.append((document, data, merge))
+
+    def commit(self):
+        with self._client.lock:
+            if self._client.fail_next_commits > 0:
+                self._client.fail_next_commits -= 1
+                raise ConnectionError("Local Firestore: simulated commit failure")
+            self._client.commits += 1
+            # Applied under the client lock, so readers see all of the batch or none of it, and
+            # with one commit time, as Firestore stamps SERVER_TIMESTAMP fields of a batch
+            commit_time = self._client.commit_time()
+            for document, data, merge in self._writes:
+                document.set(data, merge=merge, commit_time=commit_time)
+        self._writes = []
+
+
+class LocalFirestore:
+    """Thread-safe in-memory Firestore client with read, write and commit counters."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data = {}
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.fail_next_commits = 0
+        self._last_commit_time = None
+
+    def commit_time(self):
+        """A UTC commit time later than every earlier one, like Firestore's server timestamps."""
+        with self.lock:
+            now = datetime.now(timezone.utc)
+            if self._last_commit_time is not None and now <= self._last_commit_time:
+                now = self._last_commit_time + timedelta(microseconds=1)
+            self._last_commit_time = now
+            return now
+
+    def collection(self, name):
+        return LocalCollection(self, name)
+
+    def get_all(self, references):
+        for reference in references:
+            yield reference.get()
+
+    def batch(self):
+        return LocalWriteBatch(self)
@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_PORT, METRICS_LOG_PATH, METRICS_LOG_INTERVAL, METRICS_WINDOW
+
+# ----------------------------
+# Pipeline Metrics
+# ----------------------------
+# Process-wide latency histograms per pipeline stage (decode, convert, detect,
+# crop, embed, classify, draw, ...), counters for frames, faces, unknowns and
+# dropped frames, and gauges such as queue depths. RecognitionResult.timings
+# already holds the stage durations of every frame, so most call sites only pass
+# the result to record_result().
+#
+# With METRICS_ENABLED unset every recording function returns after one flag check.
+# start() serves the Prometheus text format on 127.0.0.1:METRICS_PORT/metrics and
+# optionally appends JSON snapshots to METRICS_LOG_PATH.
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+enabled = METRICS_ENABLED
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+_gauges = {}
+_started = False
+
+
+class Histogram:
+    """Count and sum of every observation, plus the last `window` samples for percentiles."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+# ---------- recording ----------
+def _observe(stage, seconds):
+    # Caller holds _lock
+    histogram = _stages.get(stage)
+    if histogram is None:
+        histogram = _stages[stage] = Histogram()
+    histogram.observe(seconds)
+
+
+def _inc(name, amount):
+    # Caller holds _lock
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(stage, seconds):
+    """Records one duration of a pipeline stage."""
+    if not enabled:
+        return
+    with _lock:
+        _observe(stage, seconds)
+
+
+@contextmanager
+def timer(stage):
+    """Times the enclosed block as `stage`."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def inc(name, amount=1):
+    """Adds to counter `name`."""
+    if not enabled:
+        return
+    with _lock:
+        _inc(name, amount)
+
+
+def set_gauge(name, value):
+    """Sets gauge `name` to a number, or to a callable evaluated on every scrape."""
+    with _lock:
+        _gauges[name] = value
+
+
+def record_result(result):
+    """Records the stage timings, faces and unknowns of one processed frame (a RecognitionResult)."""
+    if not enabled:
+        return
+    unknowns = sum(1 for label in result.labels if label == "Unknown")
+    with _lock:
+        for stage, seconds in result.timings.items():
+            _observe(stage, seconds)
+        _inc("frames_processed", 1)
+        _inc("faces_seen", len(result.labels))
+        _inc("faces_unknown", unknowns)
+
+
+# ---------- export ----------
+def snapshot():
+    """Returns all metrics as a JSON-serializable dict."""
+    with _lock:
+        stages = {stage: {"count": h.count, "sum": h.total, **{f"p{int(q * 100)}": v for q, v in h.quantiles().items()}}
+                  for stage, h in _stages.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    for name, value in gauges.items():
+        try:
+            gauges[name] = value() if callable(value) else value
+        except Exception as e:
+            print(f"Metrics gauge {name} failed: {e}")
+            gauges[name] = None
+    return {"time": time.time(), "stages": stages, "counters": counters, "gauges": gauges}
+
+
+def render_prometheus(data=None):
+    """Formats a snapshot in the Prometheus text exposition format."""
+    data = data or snapshot()
+    lines = ["# HELP recognition_stage_seconds Duration of each recognition pipeline stage.",
+             "# TYPE recognition_stage_seconds summary"]
+    for stage, stats in sorted(data["stages"].items()):
+        for q in QUANTILES:
+            lines.append(f'recognition_stage_seconds{{stage="{stage}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'recognition_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+        lines.append(f'recognition_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    for name, value in sorted(data["counters"].items()):
+        lines += [f"# TYPE recognition_{name}_total counter", f"recognition_{name}_total {value}"]
+    for name, value in sorted(data["gauges"].items()):
+        if value is not None:
+            lines += [f"# TYPE recognition_{name} gauge", f"recognition_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would flood the console
+
+
+def _write_log(path, interval):
+    while True:
+        time.sleep(interval)
+        with open(path, 'a') as f:
+            f.write(json.dumps(snapshot()) + "\n")
+
+
+def start(port=METRICS_PORT, log_path=METRICS_LOG_PATH, log_interval=METRICS_LOG_INTERVAL):
+    """Starts the HTTP endpoint and the JSON log once per process (no-op when metrics are disabled)."""
+    global _started
+    with _lock:
+        if not enabled or _started:
+            return
+        _started = True
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        except OSError as e:
+            print(f"Metrics endpoint not started on port {port}: {e}")
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+    if log_path:
+        threading.Thread(target=_write_log, args=(log_path, log_interval), name="metrics-log", daemon=True).start()
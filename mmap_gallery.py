@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+
+from gallery_index import l2_normalize
+
+# ----------------------------
+# Memory-Mapped Gallery Format
+# ----------------------------
+# The .npz galleries are zip archives: np.load has to read (and, for
+# savez_compressed, inflate) the whole embedding matrix into every process that
+# opens one. This format is a directory holding
+#
+#   header.json   {"format": 1, "count": N, "dim": 512, "dtype": "float32", "normalized": true, "names": [...]}
+#   vectors.f32   the (N, dim) float32 matrix, row-major, no header
+#   labels.i32    N int32 indexes into header["names"]
+#
+# vectors.f32 is opened with np.memmap, so loading is instant and every process
+# mapping the same file shares its pages through the OS page cache. The rows are
+# L2-normalized when they are written: the recognizers only compare directions,
+# and a float32 GalleryIndex or IVFIndex can then search the mapped rows as they
+# are instead of each process normalizing them into a private copy. Directories
+# can hold extra .npy arrays (e.g. the IVF lists), also opened memory-mapped.
+
+FORMAT_VERSION = 1
+HEADER_FILE = "header.json"
+VECTORS_FILE = "vectors.f32"
+LABELS_FILE = "labels.i32"
+
+
+def is_gallery(path):
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def read_header(path):
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported gallery format {header.get('format')} in {path}")
+    return header
+
+
+def save(path, embeddings, labels, extra=None):
+    """
+    Writes a gallery directory at `path`, replacing any existing one. The rows are stored
+    L2-normalized; `extra` maps file names to arrays saved next to them as .npy. The files are
+    written to a temporary directory first and renamed into place, so readers never see a
+    partial gallery.
+    """
+    embeddings = np.asarray(embeddings, dtype='float32')
+    embeddings = l2_normalize(embeddings if embeddings.ndim == 2 else embeddings.reshape(len(embeddings), -1))
+    names, label_ids = np.unique(np.asarray(labels).astype(str), return_inverse=True)
+    tmp_path = path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    embeddings.tofile(os.path.join(tmp_path, VECTORS_FILE))
+    label_ids.astype('<i4').tofile(os.path.join(tmp_path, LABELS_FILE))
+    for name, array in (extra or {}).items():
+        np.save(os.path.join(tmp_path, name), np.ascontiguousarray(array))
+    header = {"format": FORMAT_VERSION, "count": int(embeddings.shape[0]), "dim": int(embeddings.shape[1]),
+              "dtype": "float32", "normalized": True, "names": names.tolist()}
+    with open(os.path.join(tmp_path, HEADER_FILE), 'w') as f:
+        json.dump(header, f)
+    if os.path.isdir(path):
+        # A directory cannot be renamed over a non-empty one; processes still mapping the old
+        # files keep reading them until they reload
+        old_path = path.rstrip(os.sep) + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(tmp_path, path)
+    return path
+
+
+def remove(path):
+    """Deletes a gallery directory (or a file, like a legacy .npz) if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def load(path):
+    """Returns (embeddings, labels): a read-only float32 memmap of shape (count, dim) and the names per row."""
+    header = read_header(path)
+    count, dim = header["count"], header["dim"]
+    if count == 0:
+        return np.empty((0, dim), dtype='float32'), np.empty(0, dtype=str)
+    embeddings = np.memmap(os.path.join(path, VECTORS_FILE), dtype='<f4', mode='r', shape=(count, dim))
+    label_ids = np.fromfile(os.path.join(path, LABELS_FILE), dtype='<i4', count=count)
+    return embeddings, np.asarray(header["names"])[label_ids]
+
+
+def load_extra(path, name):
+    """Returns an extra array saved with the gallery, memory-mapped read-only."""
+    return np.load(os.path.join(path, name + ".npy"), mmap_mode='r')
+
+
+def load_embedding_file(path):
+    """Loads (embeddings, names) from a gallery directory or from an .npz with arr_0/arr_1."""
+    if is_gallery(path):
+        return load(path)
+    data = np.load(path)
+    return data['arr_0'], data['arr_1']
+
+
+def convert(npz_path, out_path):
+    """Converts an .npz (arr_0 embeddings, arr_1 names) into a gallery directory."""
+    embeddings, labels = load_embedding_file(npz_path)
+    return save(out_path, embeddings, labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert an embeddings .npz into a memory-mapped gallery.")
+    parser.add_argument("npz", help="Input .npz with embeddings in arr_0 and names in arr_1.")
+    parser.add_argument("out", nargs="?", help="Output gallery directory (default: the .npz path without extension).")
+    args = parser.parse_args()
+
+    out = args.out or os.path.splitext(args.npz)[0]
+    convert(args.npz, out)
+    header = read_header(out)
+    print(f"Wrote {header['count']} x {header['dim']} embeddings of {len(header['names'])} names to {out}")
+    print(f"Use it with EMBEDDING_FILE={out}")
+
+
+if __name__ == "__main__":
+    main()
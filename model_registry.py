@@ -0,0 +1,149 @@
+import os
+import pickle
+import threading
+import time
+
+from config import ANN_INDEX_PATH, MODEL_PATH, EMBEDDING_FILE, RECOGNIZER, DETECTOR_PROCESSES
+
+# ----------------------------
+# Lazy Model Registry
+# ----------------------------
+# Each recognition component is loaded the first time it is asked for and then
+# shared by the whole process (every Streamlit session, worker thread and service
+# using this module). Importing this module costs nothing: TensorFlow, MTCNN and
+# FaceNet (or ONNX Runtime) are only imported inside their loaders.
+
+_loaders = {}
+_components = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+# Seconds spent loading each component, in load order
+load_timings = {}
+
+# Version of the on-disk data a component was loaded from, where it has one
+# (the gallery version of "embeddings", see enrollment.reload_if_changed)
+versions = {}
+
+
+def loader(name):
+    """Registers the decorated function as the loader of component `name`."""
+    def register(fn):
+        _loaders[name] = fn
+        _locks[name] = threading.Lock()
+        return fn
+    return register
+
+
+def get(name):
+    """Returns component `name`, loading it on first use. Concurrent callers wait for one load."""
+    if name in _components:
+        return _components[name]
+    with _locks[name]:
+        if name not in _components:
+            start = time.perf_counter()
+            component = _loaders[name]()
+            load_timings[name] = time.perf_counter() - start
+            print(f"Loaded {name} in {load_timings[name]:.2f}s")
+            _components[name] = component
+    return _components[name]
+
+
+def is_loaded(name):
+    return name in _components
+
+
+def replace(name, component):
+    """Swaps in a new instance of an already registered component, e.g. a rebuilt gallery."""
+    with _locks[name]:
+        _components[name] = component
+
+
+def required_components():
+    """Names of the components the configured pipeline needs to recognize a face."""
+    recognizer = {"gallery": ["gallery"], "ann": ["ann_index"]}.get(RECOGNIZER, ["model", "encoder"])
+    return ["detector", "embedder"] + recognizer
+
+
+def warm_up(names=None, background=False):
+    """
+    Loads the given components (by default the ones required_components() lists) ahead of
+    the first frame and returns load_timings. With background=True the loads run on a daemon thread.
+    """
+    names = required_components() if names is None else list(names)
+    if background:
+        threading.Thread(target=warm_up, args=(names,), name="model-warm-up", daemon=True).start()
+        return load_timings
+    for name in names:
+        get(name)
+    return load_timings
+
+
+# ----------------------------
+# Component Loaders
+# ----------------------------
+@loader("model")
+def load_model():
+    with open(MODEL_PATH, 'rb') as f:
+        return pickle.load(f)
+
+
+@loader("training_embeddings")
+def load_training_embeddings():
+    # An .npz with two arrays (the embeddings and the corresponding names) or a memory-mapped gallery
+    from mmap_gallery import load_embedding_file
+    return load_embedding_file(EMBEDDING_FILE)
+
+
+@loader("embeddings")
+def load_embeddings():
+    # Active gallery version, including students enrolled after training
+    from gallery_store import GalleryStore
+    store = GalleryStore()
+    versions["embeddings"] = store.current_version()
+    return store.load()
+
+
+@loader("encoder")
+def load_encoder():
+    # Fitted on the names best_model.pkl was trained with, so its class indices line up
+    from sklearn.preprocessing import LabelEncoder
+    _, names = get("training_embeddings")
+    return LabelEncoder().fit(names)
+
+
+@loader("gallery")
+def load_gallery():
+    from gallery_index import GalleryIndex
+    # Exemplar float32 galleries search the memory-mapped rows of the gallery version directly
+    embeddings, names = get("embeddings")
+    return GalleryIndex.from_embeddings(embeddings, names)
+
+
+@loader("ann_index")
+def load_ann_index():
+    from ann_index import IVFIndex
+    if os.path.exists(ANN_INDEX_PATH):
+        return IVFIndex.load(ANN_INDEX_PATH)
+    index = IVFIndex.from_gallery(get("gallery"))
+    index.save(ANN_INDEX_PATH)
+    return index
+
+
+@loader("detector")
+def load_detector():
+    if DETECTOR_PROCESSES > 0:
+        # Same detect_faces() contract, executed on a pool of worker processes
+        from detector_pool import DetectorPool
+        pool = DetectorPool()
+        pool.warm_up()
+        return pool
+    from face_detectors import create_detector
+    return create_detector()
+
+
+@loader("embedder")
+def load_embedder():
+    # keras_facenet's FaceNet or its ONNX export, see face_embedders.py
+    from face_embedders import create_embedder
+    return create_embedder()
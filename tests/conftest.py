@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model_registry  # noqa: E402
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty model registry for one test; components are set with model_registry.replace()."""
+    monkeypatch.setattr(model_registry, "_components", {})
+    monkeypatch.setattr(model_registry, "versions", {})
+    return model_registry
+
+
+@pytest.fixture
+def color_pipeline(registry, monkeypatch):
+    """
+    Recognition with the test doubles of helpers.py: a blob detector, a mean-color embedder and a
+    gallery of the three colors. Returns the detector.
+    """
+    import classifier_model_for_testing
+    from gallery_index import GalleryIndex
+    from helpers import ColorBlobDetector, ColorEmbedder, NAMES, color_embeddings
+
+    detector = ColorBlobDetector()
+    registry.replace("detector", detector)
+    registry.replace("embedder", ColorEmbedder())
+    registry.replace("gallery", GalleryIndex(color_embeddings(list(NAMES)), list(NAMES), threshold=0.8))
+    monkeypatch.setattr(classifier_model_for_testing, "RECOGNIZER", "gallery")
+    monkeypatch.setattr(registry, "RECOGNIZER", "gallery")
+    return detector
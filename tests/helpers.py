@@ -0,0 +1,76 @@
+import cv2 as cv
+import numpy as np
+
+# ----------------------------
+# Test Doubles for the Recognition Pipeline
+# ----------------------------
+# Real detectors and FaceNet need model files, so the pipeline tests draw "faces" as
+# textured squares in one of three colors. ColorBlobDetector finds the squares,
+# ColorEmbedder embeds a crop as its mean RGB color, and color_gallery() maps the
+# three color directions to student names.
+
+NAMES = {"red": 0, "green": 1, "blue": 2}
+
+
+def draw_face(image, box, name, seed=0, color="RGB"):
+    """Paints a textured square whose dominant channel is the one of `name`, in place."""
+    x, y, w, h = box
+    rng = np.random.default_rng(seed)
+    face = rng.integers(0, 40, size=(h, w, 3))
+    face[..., NAMES[name]] = rng.integers(128, 256, size=(h, w))
+    if color == "BGR":
+        face = face[..., ::-1]
+    image[y:y+h, x:x+w] = face
+    return image
+
+
+def frame(faces, size=(240, 320), color="RGB"):
+    """A black frame with one square per (box, name, seed) in `faces`."""
+    image = np.zeros(size + (3,), dtype=np.uint8)
+    for box, name, seed in faces:
+        draw_face(image, box, name, seed, color)
+    return image
+
+
+class ColorBlobDetector:
+    """Finds the painted squares. Counts its calls; detect_faces is safe to call from many threads."""
+    name = "color"
+    scale = 1.0
+    thread_safe = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect_faces(self, image_np, color="RGB"):
+        self.calls += 1
+        mask = (image_np.max(axis=2) > 100).astype(np.uint8)
+        mask = cv.morphologyEx(mask, cv.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        boxes = sorted(cv.boundingRect(contour) for contour in contours)
+        return [{'box': list(box), 'confidence': 0.99, 'keypoints': {}} for box in boxes if min(box[2:]) >= 10]
+
+
+class ColorEmbedder:
+    """Embeds each RGB crop as its mean color. Counts the faces it embedded."""
+
+    def __init__(self):
+        self.faces = 0
+
+    def embeddings(self, faces):
+        self.faces += len(faces)
+        return np.asarray(faces, dtype='float32').mean(axis=(1, 2))
+
+
+def color_embeddings(names):
+    """Unit embeddings for a list of names, as ColorEmbedder would return for their faces."""
+    return np.eye(3, dtype='float32')[[NAMES[name] for name in names]]
+
+
+def clustered(n_identities=20, per_identity=10, dim=64, noise=0.1, seed=0):
+    """Random embeddings of n_identities students, per_identity noisy rows around each one's direction."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_identities, dim))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    embeddings = np.repeat(centers, per_identity, axis=0) + noise * rng.normal(size=(n_identities * per_identity, dim))
+    labels = np.repeat([f"student {i}" for i in range(n_identities)], per_identity)
+    return embeddings.astype('float32'), labels
@@ -0,0 +1,74 @@
+import numpy as np
+
+from ann_index import IVFIndex
+from gallery_index import GalleryIndex
+from helpers import clustered
+
+
+def recall(index, exact, queries):
+    found, _ = index.search(queries)
+    expected, _ = exact.search(queries)
+    return np.mean([a == b for a, b in zip(found, expected)])
+
+
+def test_full_probe_is_exact():
+    embeddings, labels = clustered(n_identities=50)
+    exact = GalleryIndex.from_embeddings(embeddings, labels, mode="exemplar", threshold=-1.0)
+    index = IVFIndex.build(embeddings, labels, n_lists=8, n_probe=8, threshold=-1.0)
+    queries = np.random.default_rng(2).normal(size=(40, embeddings.shape[1]))
+    assert recall(index, exact, queries) == 1.0
+
+
+def test_recall_with_few_probes():
+    embeddings, labels = clustered(n_identities=100, per_identity=5)
+    exact = GalleryIndex.from_embeddings(embeddings, labels, mode="exemplar", threshold=-1.0)
+    index = IVFIndex.build(embeddings, labels, n_lists=16, n_probe=4, threshold=-1.0)
+    queries = embeddings[::3] + 0.05 * np.random.default_rng(3).normal(size=embeddings[::3].shape)
+    assert recall(index, exact, queries) >= 0.95
+
+
+def test_add_and_remove_identities():
+    embeddings, labels = clustered(n_identities=20)
+    index = IVFIndex.build(embeddings[:190], labels[:190], n_lists=4, threshold=0.5)
+    index.add(embeddings[190:], labels[190:])
+    assert len(index) == 200
+    assert index.search(embeddings[195:])[0] == ["student 19"] * 5
+
+    assert index.remove("student 19") == 10
+    assert len(index) == 190
+    assert "student 19" not in index.search(embeddings[195:])[0]
+    assert sum(len(rows) for rows in index.lists) == 190
+
+
+def test_save_and_load(tmp_path):
+    embeddings, labels = clustered()
+    index = IVFIndex.build(embeddings, labels, n_lists=4)
+    path = str(tmp_path / "ann_index")
+    index.save(path)
+    index.save(path)  # Replaces the saved index
+
+    loaded = IVFIndex.load(path)
+    assert np.array_equal(loaded.assignment, index.assignment)
+    assert loaded.search(embeddings[:10])[0] == index.search(embeddings[:10])[0]
+
+
+def test_copy_leaves_the_original_unchanged():
+    embeddings, labels = clustered()
+    index = IVFIndex.build(embeddings, labels, n_lists=4)
+    lists = [rows.copy() for rows in index.lists]
+    changed = index.copy()
+    changed.remove("student 3")
+    changed.add(embeddings[:10], ["student 20"] * 10)
+    assert len(index) == 200
+    assert all(np.array_equal(a, b) for a, b in zip(index.lists, lists))
+
+
+def test_incremental_lists_match_a_rebuild():
+    embeddings, labels = clustered(n_identities=30)
+    index = IVFIndex.build(embeddings[:250], labels[:250], n_lists=6)
+    index.add(embeddings[250:], labels[250:])
+    index.remove("student 3")
+    index.remove("student 17")
+    rebuilt = IVFIndex(index.centroids, index.vectors, index.labels)
+    assert np.array_equal(index.assignment, rebuilt.assignment)
+    assert all(np.array_equal(a, b) for a, b in zip(index.lists, rebuilt.lists))
@@ -0,0 +1,121 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+
+from attendance_history import HistoryCache
+from attendance_queue import AttendanceQueue
+from attendance_slots import attendance_doc_id
+from local_firestore import LocalFirestore, SERVER_TIMESTAMP
+
+START = datetime(2026, 10, 18, 5, 0, tzinfo=pytz.utc)
+
+
+def mark(client, doc_id, timestamp, email="a@example.com", written=True):
+    record = {"user_email": email, "name": "A", "timestamp": timestamp}
+    if written:
+        record["written_at"] = SERVER_TIMESTAMP
+    client.collection("attendance").document(doc_id).set(record)
+
+
+def test_refresh_only_reads_records_written_after_the_high_water_mark():
+    client = LocalFirestore()
+    mark(client, "one", START)
+    mark(client, "two", START + timedelta(hours=1))
+    mark(client, "other", START, email="b@example.com")
+    cache = HistoryCache(client, ttl=0)
+
+    assert len(cache.get("a@example.com")) == 2
+    mark(client, "three", START + timedelta(hours=2))
+    reads = client.reads
+    history = cache.get("a@example.com")
+    assert client.reads - reads == 1
+    assert list(history["doc_id"]) == ["three", "two", "one"]
+
+
+def test_late_record_with_an_older_timestamp_is_picked_up(tmp_path):
+    client = LocalFirestore()
+    mark(client, "live", START + timedelta(hours=3))
+    cache = HistoryCache(client, ttl=0)
+    cache.get("a@example.com")
+
+    # A bulk record of an earlier lecture, committed by the queue after the live one was read
+    queue = AttendanceQueue(client, path=str(tmp_path / "queue.sqlite3"))
+    queue.enqueue("attendance", {"user_email": "a@example.com", "name": "A", "timestamp": START}, "bulk")
+    assert queue.flush() == 1
+    assert list(cache.get("a@example.com")["doc_id"]) == ["live", "bulk"]
+
+
+def test_records_without_written_at_are_read_once():
+    client = LocalFirestore()
+    mark(client, "old", START, written=False)
+    cache = HistoryCache(client, ttl=0)
+    assert len(cache.get("a@example.com")) == 1
+    reads = client.reads
+    mark(client, "new", START + timedelta(hours=1))
+    assert list(cache.get("a@example.com")["doc_id"]) == ["new", "old"]
+    assert client.reads - reads == 1
+
+
+def test_cached_within_ttl():
+    client = LocalFirestore()
+    mark(client, "one", START)
+    cache = HistoryCache(client, ttl=3600)
+    cache.get("a@example.com")
+    mark(client, "two", START + timedelta(hours=1))
+    assert len(cache.get("a@example.com")) == 1
+    cache.invalidate("a@example.com")
+    assert len(cache.get("a@example.com")) == 2
+
+
+def test_least_recently_viewed_users_are_dropped():
+    client = LocalFirestore()
+    cache = HistoryCache(client, ttl=3600, max_users=2)
+    cache.get("a@example.com")
+    cache.get("b@example.com")
+    cache.get("a@example.com")
+    cache.get("c@example.com")
+    assert list(cache._entries) == ["a@example.com", "c@example.com"]
+
+
+def test_concurrent_gets_fetch_once():
+    client = LocalFirestore()
+    mark(client, "one", START)
+    cache = HistoryCache(client, ttl=3600)
+    threads = [threading.Thread(target=cache.get, args=("a@example.com",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.reads == 1
+
+
+def test_pending_record_shown_once():
+    client = LocalFirestore()
+    mark(client, "one", START)
+    cache = HistoryCache(client, ttl=0)
+    cache.get("a@example.com")
+
+    record = {"user_email": "a@example.com", "name": "A", "timestamp": START + timedelta(hours=1)}
+    cache.add("two", record)
+    cache.add("one", record)  # Already recorded
+    assert list(cache._entries["a@example.com"].formatted["doc_id"]) == ["two", "one"]
+
+    mark(client, "two", record["timestamp"])
+    assert list(cache.get("a@example.com")["doc_id"]) == ["two", "one"]
+
+
+def test_repeated_submission_in_a_slot_is_one_row(tmp_path):
+    client = LocalFirestore()
+    cache = HistoryCache(client, ttl=0)
+    cache.get("a@example.com")
+    queue = AttendanceQueue(client, path=str(tmp_path / "queue.sqlite3"))
+    for minutes in (0, 10):
+        record = {"user_email": "a@example.com", "name": "A", "timestamp": START + timedelta(minutes=minutes)}
+        doc_id = attendance_doc_id("a@example.com", record["timestamp"])
+        queue.enqueue("attendance", record, doc_id)
+        cache.add(doc_id, record)
+        queue.flush()
+        history = cache.get("a@example.com")
+    assert len(history) == 1
+    assert history["timestamp"][0] == START
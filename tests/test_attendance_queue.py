@@ -0,0 +1,145 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+import attendance_aggregates
+from attendance_queue import AttendanceQueue, FIRESTORE_BATCH_LIMIT
+from attendance_slots import attendance_doc_id
+from local_firestore import LocalFirestore, LocalWriteBatch
+
+LECTURE = datetime(2026, 10, 18, 5, 30, tzinfo=pytz.utc)
+
+
+def record(email, timestamp=LECTURE, branch="CSE"):
+    return {"user_email": email, "name": email.split("@")[0], "branch": branch, "timestamp": timestamp}
+
+
+@pytest.fixture
+def client():
+    return LocalFirestore()
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue.sqlite3")
+
+
+def schedule(queue):
+    return queue._conn.execute("SELECT attempts, next_attempt FROM pending").fetchall()
+
+
+def test_failed_batch_is_retried_with_backoff(client, queue_path):
+    queue = AttendanceQueue(client, path=queue_path, flush_interval=10, max_backoff=15)
+    queue.enqueue("attendance", record("a@example.com"), attendance_doc_id("a@example.com", LECTURE))
+
+    client.fail_next_commits = 2
+    before = time.time()
+    assert queue.flush() == 0
+    (attempts, next_attempt), = schedule(queue)
+    assert attempts == 1
+    assert before + 5 <= next_attempt <= time.time() + 10  # flush_interval * 2**0, jittered by 0.5-1.0
+
+    queue._conn.execute("UPDATE pending SET next_attempt = 0")
+    assert queue.flush() == 0
+    (attempts, next_attempt), = schedule(queue)
+    assert attempts == 2
+    assert next_attempt <= time.time() + 15  # 20 s capped at max_backoff
+
+    queue._conn.execute("UPDATE pending SET next_attempt = 0")
+    assert queue.flush() == 1
+    assert queue.pending_count() == 0
+    assert queue.failed_batches == 2
+    assert len(client.data["attendance"]) == 1
+
+
+def test_records_not_due_are_not_flushed(client, queue_path):
+    queue = AttendanceQueue(client, path=queue_path, flush_interval=60)
+    queue.enqueue("attendance", record("a@example.com"))
+    client.fail_next_commits = 1
+    queue.flush()
+    assert queue.flush() == 0
+    assert queue.pending_count() == 1
+
+
+def test_batches_stay_within_the_firestore_limit(client, queue_path, monkeypatch):
+    sizes = []
+    commit = LocalWriteBatch.commit
+
+    def recording_commit(batch):
+        sizes.append(len(batch._writes))
+        commit(batch)
+
+    monkeypatch.setattr(LocalWriteBatch, "commit", recording_commit)
+    queue = AttendanceQueue(client, path=queue_path, batch_size=FIRESTORE_BATCH_LIMIT, aggregate=True)
+    emails = [f"student{i}@example.com" for i in range(300)]
+    queue.enqueue_many("attendance", [(record(email), attendance_doc_id(email, LECTURE)) for email in emails])
+
+    assert queue.flush() == len(emails)
+    assert len(sizes) > 1
+    assert max(sizes) <= FIRESTORE_BATCH_LIMIT
+    assert len(client.data["attendance"]) == len(emails)
+    lecture, = [doc for doc in client.data[attendance_aggregates.COLLECTION].values() if doc["kind"] == "lecture"]
+    assert lecture["count"] == len(emails)
+
+
+def test_batch_size_splits_pending_records(client, queue_path):
+    queue = AttendanceQueue(client, path=queue_path, batch_size=4)
+    queue.enqueue_many("attendance", [(record(f"s{i}@example.com"), None) for i in range(10)])
+    assert queue.flush() == 10
+    assert client.commits == 3
+
+
+def test_requeued_id_keeps_the_first_record(client, queue_path):
+    queue = AttendanceQueue(client, path=queue_path, aggregate=True)
+    doc_id = attendance_doc_id("a@example.com", LECTURE)
+    later = LECTURE + timedelta(minutes=5)
+    assert doc_id == attendance_doc_id("a@example.com", later)
+
+    queue.enqueue("attendance", record("a@example.com"), doc_id)
+    queue.enqueue("attendance", record("a@example.com", later), doc_id)
+    assert queue.pending_count() == 1
+    queue.flush()
+
+    queue.enqueue("attendance", record("a@example.com", later), doc_id)
+    assert queue.flush() == 1
+    assert client.data["attendance"][doc_id]["timestamp"] == LECTURE
+    counts = {doc["kind"]: doc["count"] for doc in client.data[attendance_aggregates.COLLECTION].values()}
+    assert set(counts.values()) == {1}
+
+
+def test_counters_are_committed_with_the_records(client, queue_path):
+    queue = AttendanceQueue(client, path=queue_path, aggregate=True)
+    next_day = LECTURE + timedelta(days=1)
+    queue.enqueue_many("attendance", [
+        (record("a@example.com"), attendance_doc_id("a@example.com", LECTURE)),
+        (record("b@example.com", branch="ECE"), attendance_doc_id("b@example.com", LECTURE)),
+        (record("a@example.com", next_day), attendance_doc_id("a@example.com", next_day)),
+    ])
+    queue.flush()
+    assert client.commits == 1
+
+    def count(kind, start, end, **fields):
+        rows = attendance_aggregates.report(client, kind, start, end)
+        return sum(row["count"] for row in rows if all(row.get(k) == v for k, v in fields.items()))
+
+    assert count("student_month", "2026-10", "2026-10", user_email="a@example.com") == 2
+    assert count("student_day", "2026-10-18", "2026-10-18", user_email="a@example.com") == 1
+    assert count("branch_day", "2026-10-18", "2026-10-18", branch="CSE") == 1
+    assert count("branch_month", "2026-10", "2026-10", branch="ECE") == 1
+    assert count("lecture", "2026-10-18", "2026-10-18") == 2
+
+
+def test_lectures_in_the_same_slot_keep_their_own_counters(client, queue_path):
+    queue = AttendanceQueue(client, path=queue_path, aggregate=True)
+    records = [({**record("a@example.com"), "lecture": "Physics"}, None),
+               ({**record("b@example.com"), "lecture": "Physics"}, None),
+               ({**record("c@example.com", branch="ECE"), "lecture": "Circuits"}, None),
+               (record("d@example.com"), None)]
+    queue.enqueue_many("attendance", records)
+    queue.flush()
+    lectures = attendance_aggregates.report(client, "lecture", "2026-10-18", "2026-10-18")
+    assert [(row.get("title"), row["branch"], row["count"]) for row in lectures] == [
+        (None, "CSE", 1), ("Physics", "CSE", 2), ("Circuits", "ECE", 1)]
+    assert {row["lecture"] for row in lectures} == {"2026-10-18 11:00"}
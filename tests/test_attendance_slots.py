@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from attendance_slots import RecentlyMarked, attendance_doc_id, slot_start, user_key
+
+KOLKATA = pytz.timezone("Asia/Kolkata")
+
+
+def test_slot_start_in_local_time():
+    timestamp = KOLKATA.localize(datetime(2026, 10, 18, 11, 45))
+    start = slot_start(timestamp.astimezone(pytz.utc), minutes=60, timezone="Asia/Kolkata")
+    assert start == KOLKATA.localize(datetime(2026, 10, 18, 11, 0))
+
+
+def test_same_slot_same_key():
+    timestamp = datetime(2026, 10, 18, 5, 31, tzinfo=pytz.utc)
+    assert attendance_doc_id("A@Example.com ", timestamp) == attendance_doc_id("a@example.com", timestamp + timedelta(minutes=10))
+    assert attendance_doc_id("a@example.com", timestamp) != attendance_doc_id("b@example.com", timestamp)
+
+
+def test_next_slot_new_key():
+    timestamp = datetime(2026, 10, 18, 5, 31, tzinfo=pytz.utc)
+    assert attendance_doc_id("a@example.com", timestamp) != attendance_doc_id("a@example.com", timestamp + timedelta(hours=1))
+
+
+def test_key_does_not_contain_the_email():
+    doc_id = attendance_doc_id("a@example.com", datetime(2026, 10, 18, 5, 31, tzinfo=pytz.utc))
+    assert "@" not in doc_id
+    assert doc_id.startswith(user_key("a@example.com"))
+
+
+def test_recently_marked_is_bounded():
+    recent = RecentlyMarked(max_entries=2)
+    assert recent.add("a")
+    assert not recent.add("a")
+    recent.add("b")
+    recent.add("c")
+    assert "a" not in recent
+    assert "c" in recent
@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime
+
+import cv2 as cv
+import pytest
+import pytz
+
+import bulk_attendance
+import model_registry
+from attendance_queue import AttendanceQueue
+from attendance_slots import RecentlyMarked, attendance_doc_id
+from bulk_attendance import BulkScan, Sighting, mark_present, sample_video, scan_frames, scan_photo, users_by_name
+from helpers import ColorBlobDetector, frame
+from local_firestore import LocalFirestore
+
+LECTURE = datetime(2026, 10, 18, 5, 30, tzinfo=pytz.utc)
+
+
+def bgr_frame(*faces):
+    return frame([(box, name, seed) for seed, (box, name) in enumerate(faces)], color="BGR")
+
+
+RED, BLUE = ((40, 50, 60, 60), "red"), ((200, 60, 60, 60), "blue")
+
+
+class PerThreadDetector(ColorBlobDetector):
+    """A detector that must not be shared between threads; records the threads that used it."""
+    thread_safe = False
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def detect_faces(self, image_np, color="RGB"):
+        self.threads.add(threading.get_ident())
+        return super().detect_faces(image_np, color)
+
+
+@pytest.fixture
+def per_thread_detectors(color_pipeline, registry, monkeypatch):
+    created = []
+
+    def create_detector(backend, scale):
+        assert (backend, scale) == ("color", 1.0)
+        created.append(PerThreadDetector())
+        return created[-1]
+
+    registry.replace("detector", PerThreadDetector())
+    monkeypatch.setattr(bulk_attendance, "create_detector", create_detector)
+    monkeypatch.setattr(bulk_attendance, "_spare_detectors", {})
+    return created
+
+
+def test_scan_photo(color_pipeline):
+    scan = scan_photo(bgr_frame(RED, BLUE))
+    assert scan.frames_scanned == 1 and scan.faces_seen == 2 and scan.unknown_faces == 0
+    assert scan.present() == ["blue", "red"]
+
+
+def test_identities_are_tallied_across_frames(color_pipeline):
+    frames = [(float(i), bgr_frame(RED, BLUE) if i < 4 else bgr_frame(RED)) for i in range(6)]
+    scan = scan_frames(frames, workers=3, batch_size=4)
+    assert scan.frames_scanned == 6 and scan.faces_seen == 10
+    assert (scan.sightings["red"].frames, scan.sightings["blue"].frames) == (6, 4)
+    assert (scan.sightings["blue"].first_seen, scan.sightings["blue"].last_seen) == (0.0, 3.0)
+    assert scan.present(min_frames=5) == ["red"]
+    assert scan.media_seconds == 5.0
+
+
+def test_present_caps_min_frames_at_frames_scanned():
+    scan = BulkScan(sightings={"red": Sighting(frames=1)}, frames_scanned=1)
+    assert scan.present(min_frames=3) == ["red"]
+
+
+def test_each_thread_detects_with_its_own_detector(per_thread_detectors):
+    frames = [(float(i), bgr_frame(RED, BLUE)) for i in range(12)]
+    assert scan_frames(frames, workers=3).present() == ["blue", "red"]
+    assert model_registry.get("detector").calls == 0
+    assert 1 <= len(per_thread_detectors) <= 3
+    assert all(len(detector.threads) == 1 for detector in per_thread_detectors)
+
+    # Later scans reuse the spare detectors instead of building new ones
+    created = len(per_thread_detectors)
+    scan_frames(frames[:2], workers=1)
+    assert len(per_thread_detectors) == created
+
+
+def test_thread_safe_detector_is_shared(color_pipeline):
+    scan_frames([(float(i), bgr_frame(RED)) for i in range(4)], workers=2)
+    assert color_pipeline.calls == 4
+    assert bulk_attendance._spare_detectors.get(("color", 1.0)) is None
+
+
+def test_sample_video(tmp_path):
+    path = str(tmp_path / "lecture.avi")
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"MJPG"), 10, (320, 240))
+    for _ in range(25):
+        writer.write(bgr_frame(RED))
+    writer.release()
+    assert [seconds for seconds, _ in sample_video(path, sample_fps=2)] == [0.0, 0.5, 1.0, 1.5, 2.0]
+
+
+def test_users_by_name_reads_only_matching_users():
+    db = LocalFirestore()
+    for first, middle, last in [("Asha", "", "Rao"), ("Asha", "K", "Rao"), ("Mary Ann", "", "Smith"),
+                                ("Ravi", "", "Kumar")] + [(f"Student{i}", "", "X") for i in range(40)]:
+        db.collection("users").add({"first_name": first, "middle_name": middle, "last_name": last,
+                                    "email": f"{first}.{middle}.{last}@example.com"})
+    names = ["Asha K Rao", "Mary Ann  Smith", "Nobody Here"] + [f"Student{i}  X" for i in range(35)]
+    db.reads = 0
+    users = users_by_name(db, names)
+    assert set(users) == set(names) - {"Nobody Here"}
+    assert users["Asha K Rao"]["email"] == "Asha.K.Rao@example.com"
+    assert db.reads == 38  # Not the 44 users of the collection
+
+
+def test_mark_present(tmp_path):
+    queue = AttendanceQueue(LocalFirestore(), path=str(tmp_path / "queue.sqlite3"))
+    users = {"Asha Rao": {"email": "asha@example.com", "branch": "CSE"}}
+    recent = RecentlyMarked()
+    doc_ids, unmatched = mark_present(queue, ["Asha Rao", "Nobody"], users, "Physics", LECTURE, recent)
+    assert doc_ids == [attendance_doc_id("asha@example.com", LECTURE)]
+    assert unmatched == ["Nobody"]
+    assert mark_present(queue, ["Asha Rao"], users, "Physics", LECTURE, recent) == ([], [])
+    assert queue.flush() == 1
+    record = queue.client.collection("attendance").document(doc_ids[0]).get().to_dict()
+    assert (record["name"], record["lecture"], record["source"]) == ("Asha Rao", "Physics", "bulk")
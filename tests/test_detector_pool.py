@@ -0,0 +1,72 @@
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+import detector_pool
+from detector_pool import DetectorPool
+from face_detectors import HaarCascadeDetector
+from helpers import ColorBlobDetector, frame
+
+FACES = [((40, 50, 60, 60), "red", 1), ((200, 60, 50, 50), "blue", 2)]
+
+
+def shared_copy(image_np):
+    shm = shared_memory.SharedMemory(create=True, size=image_np.nbytes)
+    np.ndarray(image_np.shape, dtype=image_np.dtype, buffer=shm.buf)[...] = image_np
+    return shm
+
+
+def test_worker_reads_frames_from_shared_memory(monkeypatch):
+    monkeypatch.setattr(detector_pool, "_detector", ColorBlobDetector())
+    monkeypatch.setattr(detector_pool, "_attached", {})
+    small, large = frame(FACES), frame(FACES, size=(480, 640))
+    first, second = shared_copy(small), shared_copy(large)
+    try:
+        faces = detector_pool._detect_shared(0, first.name, small.shape, small.dtype.str, "RGB")
+        assert sorted(face['box'][0] for face in faces) == [40, 200]
+        assert detector_pool._attached[0].name == first.name
+        # The parent replaced slot 0 with a larger segment
+        faces = detector_pool._detect_shared(0, second.name, large.shape, large.dtype.str, "RGB")
+        assert len(faces) == 2
+        assert detector_pool._attached[0].name == second.name
+    finally:
+        for shm in (first, second, *detector_pool._attached.values()):
+            shm.close()
+        first.unlink()
+        second.unlink()
+
+
+def test_warm_up_fails_when_a_worker_cannot_load_its_detector():
+    pool = DetectorPool(workers=1, threads_per_worker=1, backend="no-such-backend")
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.warm_up(timeout=60)
+    finally:
+        pool.close()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    if not hasattr(cv, "CascadeClassifier"):
+        pytest.skip("OpenCV build without Haar cascades")
+    pool = DetectorPool(workers=2, threads_per_worker=1, backend="haar", scale=1.0, slots=2)
+    pool.warm_up(timeout=120)
+    yield pool
+    pool.close()
+
+
+def test_pool_matches_the_in_process_detector(pool):
+    detector = HaarCascadeDetector()
+    for image_np in (frame(FACES), frame(FACES, size=(480, 640)), frame(FACES, color="BGR")):
+        assert pool.detect_faces(image_np) == detector.detect_faces(image_np)
+
+
+def test_slots_grow_and_are_returned(pool):
+    futures = [pool.submit(frame(FACES, size=(480, 640))) for _ in range(4)]
+    for future in futures:
+        future.result()
+    assert all(shm.size >= 480 * 640 * 3 for shm in pool._slots)
+    assert pool._free.qsize() == 2
@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+
+import enrollment
+from gallery_store import GalleryStore
+from helpers import color_embeddings, frame
+
+
+@pytest.fixture
+def store(tmp_path):
+    seed = str(tmp_path / "seed.npz")
+    np.savez(seed, color_embeddings(["red", "red", "blue"]), np.array(["Ravi", "Ravi", "Bela"]))
+    return GalleryStore(root=str(tmp_path / "gallery"), seed_file=seed)
+
+
+@pytest.fixture
+def gallery_pipeline(color_pipeline, registry, store, tmp_path, monkeypatch):
+    monkeypatch.setattr(enrollment, "ANN_INDEX_PATH", str(tmp_path / "ann_index"))
+    from gallery_index import GalleryIndex
+    registry.replace("embeddings", store.load())
+    registry.replace("gallery", GalleryIndex.from_embeddings(*store.load()))
+    return registry
+
+
+def photo(name, seed=0):
+    return frame([((60, 40, 120, 120), name, seed)], size=(240, 240))
+
+
+def test_seed_until_first_commit(store):
+    embeddings, labels = store.load()
+    assert store.current_version() is None
+    assert list(labels) == ["Ravi", "Ravi", "Bela"]
+
+
+def test_enrolled_student_is_recognized(gallery_pipeline, store):
+    version, faces = enrollment.enroll_student("Gita", [photo("green")], store=store)
+    assert (version, faces) == ("v000001", 1)
+    assert store.current_version() == version
+
+    embeddings, labels = store.load()
+    assert np.sum(labels == "Gita") == 7  # The face and its six augmentations
+    assert gallery_pipeline.get("gallery").search(color_embeddings(["green", "red"]))[0] == ["Gita", "Ravi"]
+
+
+def test_swap_reopens_the_committed_version(gallery_pipeline, store):
+    enrollment.enroll_student("Gita", [photo("green")], store=store)
+    embeddings, _ = gallery_pipeline.get("embeddings")
+    assert isinstance(embeddings, np.memmap)
+    assert gallery_pipeline.versions["embeddings"] == "v000001"
+
+
+def test_no_face_raises(gallery_pipeline, store):
+    with pytest.raises(ValueError):
+        enrollment.enroll_student("Nobody", [np.zeros((200, 200, 3), dtype=np.uint8)], store=store)
+    assert store.current_version() is None
+
+
+def test_remove_student(gallery_pipeline, store):
+    assert enrollment.remove_student("Ravi", store=store) == "v000001"
+    assert enrollment.remove_student("Ravi", store=store) is None
+    assert gallery_pipeline.get("gallery").search(color_embeddings(["red"]))[0] == ["Unknown"]
+
+
+def test_orphaned_versions_are_replaced(store):
+    os.makedirs(os.path.join(store.root, "v000007"))  # Left by a commit that crashed before CURRENT
+    embeddings, labels = store.load()
+    assert store.commit(embeddings, labels) == "v000001"
+    assert not os.path.exists(os.path.join(store.root, "v000007"))
+    assert store.commit(embeddings, labels) == "v000002"
+
+
+def test_changes_of_other_processes_are_reloaded(gallery_pipeline, store):
+    other = GalleryStore(root=store.root, seed_file=store.seed_file)
+    assert not enrollment.reload_if_changed(store)
+    embeddings, labels = other.load()
+    with other.locked():
+        other.commit(embeddings[labels != "Bela"], labels[labels != "Bela"])
+
+    assert enrollment.reload_if_changed(store)
+    assert not enrollment.reload_if_changed(store)
+    assert gallery_pipeline.get("gallery").search(color_embeddings(["blue"]))[0] == ["Unknown"]
+
+
+def test_ann_index_is_updated_incrementally(gallery_pipeline, store, monkeypatch):
+    from ann_index import IVFIndex
+
+    index = IVFIndex.from_gallery(gallery_pipeline.get("gallery"), n_lists=2, n_probe=2)
+    gallery_pipeline.replace("ann_index", index)
+    rebuilds = []
+    monkeypatch.setattr(IVFIndex, "_assign_lists", lambda self: rebuilds.append(self))
+
+    enrollment.enroll_student("Gita", [photo("green")], store=store)
+    updated = gallery_pipeline.get("ann_index")
+    assert updated is not index
+    assert not rebuilds  # No full reassignment
+    assert list(index.labels) == ["Bela", "Ravi"]  # Searches on the old index were not disturbed
+    assert updated.search(color_embeddings(["green", "blue"]))[0] == ["Gita", "Bela"]
+
+    enrollment.remove_student("Bela", store=store)
+    assert gallery_pipeline.get("ann_index").search(color_embeddings(["blue"]))[0] == ["Unknown"]
+    assert not rebuilds
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import face_quality
+import metrics
+from classifier_model_for_testing import RecognitionResult
+from helpers import frame
+from ingestion_service import recognized_names
+
+
+def crop(brightness=128, texture=60, seed=0):
+    rng = np.random.default_rng(seed)
+    values = brightness + rng.integers(-texture, texture + 1, size=(160, 160, 1)) if texture else np.full((160, 160, 1), brightness)
+    return np.clip(np.repeat(values, 3, axis=2), 0, 255).astype(np.uint8)
+
+
+FRONTAL = {'left_eye': (50, 60), 'right_eye': (110, 60), 'nose': (80, 90)}
+PROFILE = {'left_eye': (50, 60), 'right_eye': (110, 60), 'nose': (108, 90)}
+
+
+def test_reasons():
+    crops = [crop(), crop(), crop(brightness=10, texture=5), crop(brightness=245, texture=5), crop(texture=0), crop()]
+    boxes = [(0, 0, 100, 100), (0, 0, 20, 20)] + [(0, 0, 100, 100)] * 4
+    keypoints = [FRONTAL] * 5 + [PROFILE]
+    assert face_quality.assess(crops, boxes, keypoints) == [None, "too small", "too dark", "too bright", "blurry",
+                                                            "turned away"]
+
+
+def test_yaw_needs_keypoints():
+    assert face_quality.yaw(FRONTAL) == 0.0
+    assert face_quality.yaw({}) is None
+    assert face_quality.assess([crop()], [(0, 0, 100, 100)], [{}]) == [None]
+
+
+def test_sharpness_of_flat_crops_is_zero():
+    assert np.allclose(face_quality.sharpness(np.full((2, 20, 20), 80.0)), 0.0)
+
+
+def test_gate_counts_rejections(monkeypatch):
+    monkeypatch.setattr(face_quality, "enabled", True)
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "_counters", {})
+    reasons = face_quality.gate([crop(), crop(texture=0)], [(0, 0, 100, 100)] * 2)
+    assert reasons == [None, "blurry"]
+    assert metrics.snapshot()["counters"] == {"faces_quality_checked": 2, "embeddings_skipped": 1,
+                                              "faces_rejected_blurry": 1}
+
+
+def test_disabled_gate_passes_everything(monkeypatch):
+    monkeypatch.setattr(face_quality, "enabled", False)
+    assert face_quality.gate([crop(texture=0)], [(0, 0, 5, 5)]) == [None]
+
+
+def test_rejected_faces_are_not_embedded(color_pipeline, registry, monkeypatch):
+    from classifier_model_for_testing import classify_faces
+    monkeypatch.setattr(face_quality, "enabled", True)
+    image = frame([((40, 50, 60, 60), "red", 1), ((200, 60, 30, 30), "blue", 2)])
+    labels, scores = classify_faces(image, [(40, 50, 60, 60), (200, 60, 30, 30)])
+    assert labels == ["red", face_quality.rejected_label("too small")]
+    assert scores[1] == 0.0
+    assert registry.get("embedder").faces == 1
+
+
+def test_rejected_faces_are_not_reported_as_students():
+    result = RecognitionResult(labels=["Asha", "Unknown", face_quality.rejected_label("blurry")])
+    assert recognized_names(result) == ["Asha"]
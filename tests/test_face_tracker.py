@@ -0,0 +1,58 @@
+import numpy as np
+
+from face_tracker import FaceTracker, clip_box, iou_matrix
+from helpers import frame
+
+
+def test_iou_matrix():
+    ious = iou_matrix([(0, 0, 10, 10), (100, 100, 10, 10)], [(0, 0, 10, 10), (5, 0, 10, 10)])
+    assert np.allclose(ious, [[1.0, 50 / 150], [0.0, 0.0]])
+
+
+def test_clip_box():
+    assert clip_box((-5, 10, 20, 20), (25, 100)) == (0, 10, 15, 15)
+
+
+def test_faces_are_followed_between_detections(color_pipeline, registry):
+    tracker = FaceTracker(detect_every=5, reverify_every=100)
+    for step in range(5):
+        result = tracker.update(frame([((40 + 3 * step, 50, 60, 60), "red", 1), ((200, 60, 60, 60), "blue", 2)]))
+        assert result.labels == ["red", "blue"]
+    assert color_pipeline.calls == 1
+    assert result.boxes[0] == (52, 50, 60, 60)  # Moved with the face
+    assert registry.get("embedder").faces == 2
+
+
+def test_known_tracks_are_not_classified_again(color_pipeline, registry):
+    tracker = FaceTracker(detect_every=2, reverify_every=100)
+    for step in range(6):
+        tracker.update(frame([((40, 50, 60, 60), "green", 1)]))
+    assert tracker.detections_run == 3
+    assert tracker.faces_classified == 1
+
+    tracker.update(frame([((40, 50, 60, 60), "green", 1), ((200, 60, 60, 60), "red", 2)]))
+    result = tracker.update(frame([((40, 50, 60, 60), "green", 1), ((200, 60, 60, 60), "red", 2)]))
+    assert result.labels == ["green", "red"]
+    assert tracker.faces_classified == 2  # Only the new face went through the embedder
+
+
+def test_tracks_are_reverified(color_pipeline):
+    tracker = FaceTracker(detect_every=1, reverify_every=3)
+    for _ in range(7):
+        tracker.update(frame([((40, 50, 60, 60), "red", 1)]))
+    assert tracker.faces_classified == 3  # Frames 0, 3 and 6
+
+
+def test_lost_track_triggers_detection(color_pipeline):
+    tracker = FaceTracker(detect_every=10)
+    tracker.update(frame([((40, 50, 60, 60), "red", 1)]))
+    result = tracker.update(frame([]))
+    assert color_pipeline.calls == 2
+    assert result.labels == []
+    assert result.message == "No face detected"
+
+
+def test_bgr_frames(color_pipeline):
+    tracker = FaceTracker()
+    result = tracker.update(frame([((40, 50, 60, 60), "red", 1)], color="BGR"), color="BGR")
+    assert result.labels == ["red"]
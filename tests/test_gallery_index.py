@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import gallery_index
+from gallery_index import GalleryIndex, dequantize, l2_normalize, quantize
+from helpers import clustered
+
+
+@pytest.mark.parametrize("dtype", ["int16", "int8"])
+def test_quantized_rows_round_trip(dtype):
+    vectors = l2_normalize(np.random.default_rng(1).normal(size=(50, 64)))
+    data, scales = quantize(vectors, dtype)
+    assert data.dtype == dtype and scales.dtype == np.float32
+    assert np.abs(dequantize(data, scales) - vectors).max() < (1e-4 if dtype == "int16" else 0.01)
+
+
+def test_float16_means_int16():
+    gallery = GalleryIndex(*clustered(), dtype="float16")
+    assert gallery.dtype == "int16" and gallery.vectors.dtype == np.int16
+    with pytest.raises(ValueError):
+        quantize(np.ones((2, 4)), "bfloat16")
+
+
+@pytest.mark.parametrize("dtype", ["int16", "int8"])
+def test_quantized_gallery_matches_float32(dtype, monkeypatch):
+    monkeypatch.setattr(gallery_index, "SEARCH_BLOCK_ROWS", 64)  # Several blocks, the last one partial
+    embeddings, labels = clustered()
+    queries = embeddings[::7] + 0.05
+    exact = GalleryIndex.from_embeddings(embeddings, labels, mode="exemplar", threshold=0.0, dtype="float32")
+    reduced = GalleryIndex.from_embeddings(embeddings, labels, mode="exemplar", threshold=0.0, dtype=dtype)
+
+    exact_labels, exact_scores = exact.search(queries)
+    reduced_labels, reduced_scores = reduced.search(queries)
+    assert reduced_labels == exact_labels
+    assert np.allclose(reduced_scores, exact_scores, atol=1e-3 if dtype == "int16" else 0.02)
+    assert np.allclose(reduced.similarities(queries), exact.similarities(queries), atol=0.02)
+    assert reduced.nbytes < exact.nbytes
+
+
+def test_unknown_below_threshold():
+    embeddings, labels = clustered()
+    gallery = GalleryIndex.from_embeddings(embeddings, labels, threshold=0.99)
+    found, _ = gallery.search(-embeddings[:3])
+    assert found == ["Unknown"] * 3
+
+
+def test_rows_of():
+    embeddings, labels = clustered(n_identities=3, per_identity=2)
+    gallery = GalleryIndex(embeddings, labels, dtype="int8")
+    rows, names = gallery.rows_of({"student 1"})
+    assert list(names) == ["student 1", "student 1"]
+    assert np.allclose(rows, l2_normalize(embeddings[2:4]), atol=0.02)
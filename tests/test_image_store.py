@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import local_firestore
+from image_store import ImageStore, migrate_user_images
+from local_firestore import LocalFirestore
+
+
+def photo(seed=0, size=(400, 300), mode="RGB"):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)).convert(mode)
+
+
+def jpeg_base64(image):
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(root=str(tmp_path / "images"), thumb_size=64, cache_entries=2)
+
+
+def test_put_is_content_addressed(store):
+    image_hash = store.put(photo())
+    assert image_hash == hashlib.sha256(store.get(image_hash)).hexdigest()
+    assert store.put(photo()) == image_hash
+    assert store.put(photo(seed=1)) != image_hash
+    assert sorted(os.listdir(os.path.join(store.root, image_hash[:2]))) == [image_hash + ".jpg", image_hash + "_thumb.jpg"]
+
+
+def test_thumbnail_keeps_the_aspect_ratio(store):
+    image_hash = store.put(photo(mode="RGBA"))
+    assert Image.open(io.BytesIO(store.get(image_hash))).size == (400, 300)
+    assert Image.open(io.BytesIO(store.get(image_hash, thumbnail=True))).size == (64, 48)
+
+
+def test_data_uri_is_cached(store, monkeypatch):
+    hashes = [store.put(photo(seed)) for seed in range(3)]
+    uri = store.data_uri(hashes[0])
+    assert uri == "data:image/jpeg;base64," + base64.b64encode(store.get(hashes[0], thumbnail=True)).decode("utf-8")
+    reads = []
+    original_get = store.get
+    monkeypatch.setattr(store, "get", lambda *args: reads.append(args) or original_get(*args))
+    assert store.data_uri(hashes[0]) == uri
+    assert reads == []
+    store.data_uri(hashes[1])
+    store.data_uri(hashes[2])
+    assert list(store._cache) == [(hashes[1], True), (hashes[2], True)]
+
+
+def test_migrate_user_images(store):
+    db = LocalFirestore()
+    db.collection("users").document("asha").set({"first_name": "Asha", "profile_image": jpeg_base64(photo())})
+    db.collection("users").document("ravi").set({"first_name": "Ravi", "profile_image_hash": "abc"})
+    assert migrate_user_images(db, store, local_firestore.DELETE_FIELD) == 1
+    asha = db.collection("users").document("asha").get().to_dict()
+    assert set(asha) == {"first_name", "profile_image_hash"}
+    assert Image.open(io.BytesIO(store.get(asha["profile_image_hash"]))).size == (400, 300)
+    assert db.collection("users").document("ravi").get().to_dict() == {"first_name": "Ravi", "profile_image_hash": "abc"}
+    assert migrate_user_images(db, store, local_firestore.DELETE_FIELD) == 0
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import cv2 as cv
+import pytest
+
+from helpers import frame
+from ingestion_service import CameraStream, IngestionService, is_live_source, parse_sources
+
+FACES = [((40, 50, 60, 60), "red", 1), ((200, 60, 60, 60), "blue", 2)]
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A 12-frame MJPG recording of two faces, written as BGR like a camera file."""
+    path = str(tmp_path / "lecture.avi")
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"MJPG"), 10, (320, 240))
+    for _ in range(12):
+        writer.write(frame(FACES, color="BGR"))
+    writer.release()
+    return path
+
+
+def run(service, timeout=30):
+    service.start()
+    deadline = time.monotonic() + timeout
+    while not service.finished() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    service.stop()
+
+
+def test_source_kinds():
+    assert is_live_source("0")
+    assert is_live_source("rtsp://camera-1/stream")
+    assert not is_live_source("recordings/lecture.mp4")
+    assert parse_sources(["front=rtsp://10.0.0.5/live", "recordings/back.mp4"]) == {
+        "front": "rtsp://10.0.0.5/live", "back": "recordings/back.mp4"}
+
+
+def test_every_frame_of_a_file_is_recognized(color_pipeline, recording):
+    results = {}
+    lock = threading.Lock()
+
+    def on_result(stream_id, frame_index, result):
+        with lock:
+            results[(stream_id, frame_index)] = result.labels
+
+    service = IngestionService({"a": recording, "b": recording}, workers=2, batch_frames=4, per_stream_inflight=2,
+                               on_result=on_result)
+    run(service)
+    assert sorted(results) == [(stream_id, index) for stream_id in "ab" for index in range(12)]
+    assert all(labels == ["red", "blue"] for labels in results.values())
+    stats = service.metrics()["streams"]
+    assert stats["a"]["processed"] == 12 and stats["a"]["dropped"] == 0
+    assert stats["b"]["faces"] == 24
+
+
+def test_live_streams_drop_frames_beyond_their_slots():
+    service = IngestionService({}, queue_size=8)
+    stream = CameraStream("door", "rtsp://camera/door", per_stream_inflight=2)
+    for index in range(5):
+        service._offer(stream, index, None)
+    assert service.queue.qsize() == 2
+    assert stream.stats.frames_dropped == 3
@@ -0,0 +1,94 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+from classifier_model_for_testing import RecognitionResult, predict_frame
+from helpers import frame
+
+
+@pytest.fixture
+def recording(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "_stages", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+    monkeypatch.setattr(metrics, "_stages", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    metrics.inc("frames_processed")
+    with metrics.timer("detect"):
+        pass
+    metrics.record_result(RecognitionResult(labels=["Unknown"], timings={"detect": 0.1}))
+    assert metrics._stages == {} and metrics._counters == {}
+
+
+def test_histogram_quantiles_use_the_window():
+    histogram = metrics.Histogram(window=100)
+    for value in range(1, 201):
+        histogram.observe(value / 1000)
+    assert histogram.count == 200
+    assert histogram.total == pytest.approx(20.1)
+    assert histogram.quantiles() == {0.5: 0.151, 0.95: 0.196, 0.99: 0.2}
+    assert metrics.Histogram().quantiles() == {q: 0.0 for q in metrics.QUANTILES}
+
+
+def test_record_result(recording):
+    metrics.record_result(RecognitionResult(labels=["Asha", "Unknown"], timings={"detect": 0.02, "embed": 0.05}))
+    metrics.record_result(RecognitionResult(labels=["Unknown"], timings={"detect": 0.04}))
+    data = metrics.snapshot()
+    assert data["counters"] == {"frames_processed": 2, "faces_seen": 3, "faces_unknown": 2}
+    assert data["stages"]["detect"]["count"] == 2
+    assert data["stages"]["detect"]["sum"] == pytest.approx(0.06)
+    assert data["stages"]["embed"]["p50"] == 0.05
+    json.dumps(data)
+
+
+def test_predict_frame_records_its_stages(recording, color_pipeline):
+    predict_frame(frame([((40, 50, 60, 60), "red", 1)], color="BGR"))
+    data = metrics.snapshot()
+    assert data["counters"]["frames_processed"] == 1
+    assert {"detect", "embed", "draw"} <= set(data["stages"])
+
+
+def test_gauges_are_evaluated_on_snapshot(recording):
+    depth = [3]
+    metrics.set_gauge("queue_depth", lambda: depth[0])
+    metrics.set_gauge("workers", 4)
+    metrics.set_gauge("broken", lambda: 1 / 0)
+    assert metrics.snapshot()["gauges"] == {"queue_depth": 3, "workers": 4, "broken": None}
+    depth[0] = 7
+    assert metrics.snapshot()["gauges"]["queue_depth"] == 7
+
+
+def test_render_prometheus(recording):
+    metrics.observe("detect", 0.25)
+    metrics.inc("frames_dropped", 2)
+    metrics.set_gauge("queue_depth", 5)
+    text = metrics.render_prometheus()
+    assert 'recognition_stage_seconds{stage="detect",quantile="0.5"} 0.250000' in text
+    assert 'recognition_stage_seconds_count{stage="detect"} 1' in text
+    assert "recognition_frames_dropped_total 2" in text
+    assert "recognition_queue_depth 5" in text
+    assert text.endswith("\n")
+
+
+def test_handler_serves_metrics(recording):
+    server = metrics.ThreadingHTTPServer(("127.0.0.1", 0), metrics._Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        metrics.inc("frames_processed")
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert "recognition_frames_processed_total 1" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other")
+    finally:
+        server.shutdown()
+        server.server_close()
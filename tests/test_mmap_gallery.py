@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+import mmap_gallery
+from gallery_index import GalleryIndex, l2_normalize
+from helpers import clustered
+
+
+def test_save_and_load_round_trip(tmp_path):
+    embeddings, labels = clustered()
+    path = mmap_gallery.save(str(tmp_path / "gallery"), embeddings, labels, extra={"centroids": embeddings[:4]})
+    vectors, names = mmap_gallery.load(path)
+    assert isinstance(vectors, np.memmap) and not vectors.flags.writeable
+    assert np.allclose(vectors, l2_normalize(embeddings), atol=1e-6)
+    assert list(names) == list(labels)
+    assert np.array_equal(mmap_gallery.load_extra(path, "centroids"), embeddings[:4])
+    assert mmap_gallery.read_header(path)["names"] == sorted(set(labels))
+
+
+def test_save_replaces_an_existing_gallery(tmp_path):
+    path = str(tmp_path / "gallery")
+    mmap_gallery.save(path, *clustered(n_identities=2))
+    mmap_gallery.save(path, *clustered(n_identities=3, per_identity=1))
+    assert len(mmap_gallery.load(path)[0]) == 3
+    assert os.listdir(tmp_path) == ["gallery"]
+
+
+def test_empty_gallery(tmp_path):
+    path = mmap_gallery.save(str(tmp_path / "gallery"), np.empty((0, 8)), [])
+    vectors, names = mmap_gallery.load(path)
+    assert vectors.shape == (0, 8) and len(names) == 0
+
+
+def test_npz_is_converted(tmp_path):
+    embeddings, labels = clustered()
+    npz = str(tmp_path / "embeddings.npz")
+    np.savez(npz, embeddings, labels)
+    out = mmap_gallery.convert(npz, str(tmp_path / "gallery"))
+    assert mmap_gallery.is_gallery(out) and not mmap_gallery.is_gallery(npz)
+    assert list(mmap_gallery.load_embedding_file(out)[1]) == list(mmap_gallery.load_embedding_file(npz)[1])
+
+
+def test_unsupported_format_is_rejected(tmp_path):
+    path = mmap_gallery.save(str(tmp_path / "gallery"), *clustered(n_identities=1))
+    with open(os.path.join(path, mmap_gallery.HEADER_FILE), 'w') as f:
+        f.write('{"format": 99}')
+    with pytest.raises(ValueError):
+        mmap_gallery.load(path)
+
+
+def test_memory_mapped_gallery_is_searched_in_place(tmp_path):
+    embeddings, labels = clustered()
+    mmap_gallery.save(str(tmp_path / "gallery"), embeddings, labels)
+    vectors, names = mmap_gallery.load(str(tmp_path / "gallery"))
+
+    gallery = GalleryIndex.from_embeddings(vectors, names, mode="exemplar", dtype="float32")
+    assert np.shares_memory(gallery.vectors, vectors)
+    assert gallery.search(embeddings[:5])[0] == list(labels[:5])
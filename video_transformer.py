@@ -0,0 +1,87 @@
+import threading
+import av
+import cv2 as cv
+import numpy as np
+from streamlit_webrtc import VideoTransformerBase
+
+import metrics
+from classifier_model_for_testing import RecognitionResult, recognize_faces, draw_predictions
+from inference_worker import LatestFrameWorker
+from face_tracker import FaceTracker
+from config import INFERENCE_MODE, INFERENCE_EVERY_N_FRAMES, INFERENCE_TARGET_FPS, TRACKING_ENABLED
+
+# ------------------- Live Video Transformer -------------------
+# Kept out of app.py so the live video path can be driven without running the
+# Streamlit script, e.g. by benchmark_pipeline.py with synthetic av.VideoFrames.
+
+class FaceDetectionTransformer(VideoTransformerBase):
+    def __init__(self, inference_mode=INFERENCE_MODE, tracking=TRACKING_ENABLED):
+        # Each stream owns its latest result; the WebRTC thread writes it while the
+        # Streamlit script thread reads it, so access goes through a lock
+        self._result_lock = threading.Lock()
+        self._result = RecognitionResult(message="No face detected")
+        self.frame_count = 0
+        # Follow faces between detections instead of re-running MTCNN and FaceNet every frame
+        self.tracker = FaceTracker() if tracking else None
+        # In async mode recognition runs on a background worker, see inference_worker.py
+        self.worker = None
+        if inference_mode == "async":
+            self.worker = LatestFrameWorker(self.recognize, target_fps=INFERENCE_TARGET_FPS)
+    
+    @property
+    def result(self):
+        with self._result_lock:
+            return self._result
+    
+    @property
+    def all_predictions(self):
+        # All recognized faces of the latest result
+        return list(self.result.labels)
+    
+    @property
+    def current_prediction(self):
+        result = self.result
+        if result.message is not None:
+            return result.message
+        return result.labels[0] if result.labels else "Unknown"  # Default to first face
+    
+    def recognize(self, img):
+        # The BGR frame goes in as is; only the face crops are converted to RGB for FaceNet
+        result = self.tracker.update(img, color="BGR") if self.tracker is not None else recognize_faces(img, color="BGR")
+        metrics.record_result(result)
+        return result
+    
+    def transform(self, frame: av.VideoFrame) -> np.ndarray:
+        # Get frame as numpy array in BGR format
+        with metrics.timer("decode"):
+            img = frame.to_ndarray(format="bgr24")
+        if self.worker is not None:
+            return self.transform_async(img)
+        return self.show_result(img, self.recognize(img))
+    
+    def show_result(self, img, result):
+        with self._result_lock:
+            self._result = result
+        
+        # If nothing was recognized, overlay the message on the original frame
+        if result.message is not None:
+            cv.putText(img, result.message, (10, 30), cv.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            return img
+        with metrics.timer("draw"):
+            return draw_predictions(img, result.boxes, result.labels)
+    
+    def transform_async(self, img):
+        # Offer every N-th frame to the worker; it keeps only the newest one
+        if self.frame_count % INFERENCE_EVERY_N_FRAMES == 0:
+            self.worker.submit(img.copy())
+        self.frame_count += 1
+        
+        # Draw the last known result on the current frame and return immediately
+        result = self.worker.latest()
+        if result is None:
+            return img
+        return self.show_result(img, result)
+    
+    def on_ended(self):
+        if self.worker is not None:
+            self.worker.stop()